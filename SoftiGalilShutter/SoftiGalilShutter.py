@@ -28,10 +28,60 @@ from threading import Thread
 import numpy
 import sys
 import string
+import json
+from collections import namedtuple
+from threading import Condition, Event
+try:
+    from tango.server import pipe
+except ImportError: # pipes were removed in PyTango 10
+    pipe = None
 if __name__ == '__main__':
+    import autotune
+    import emulator
+    import firmware
     import gclib
+    import interrupts
+    import latch
+    import metrics
+    import motion
+    import positions
+    import querycache
+    import recording
+    import replay
+    import scheduler
+    import shmstatus
+    import tracing
 else:
+    import SoftiGalilShutter.autotune as autotune
+    import SoftiGalilShutter.emulator as emulator
+    import SoftiGalilShutter.firmware as firmware
     import SoftiGalilShutter.gclib as gclib
+    import SoftiGalilShutter.interrupts as interrupts
+    import SoftiGalilShutter.latch as latch
+    import SoftiGalilShutter.metrics as metrics
+    import SoftiGalilShutter.motion as motion
+    import SoftiGalilShutter.positions as positions
+    import SoftiGalilShutter.querycache as querycache
+    import SoftiGalilShutter.recording as recording
+    import SoftiGalilShutter.replay as replay
+    import SoftiGalilShutter.scheduler as scheduler
+    import SoftiGalilShutter.shmstatus as shmstatus
+    import SoftiGalilShutter.tracing as tracing
+
+# One batched read of everything the device needs per read cycle
+STATUS_QUERY = 'MG _TPA,_TSA,_BGA,_MOA,@IN[1],_SCA'
+ControllerStatus = namedtuple('ControllerStatus', 'position switches moving motor_off input1 stop_code')
+
+COUNTS_PER_REV = 4000 # Encoder counts per shutter revolution
+# States of the named positions, the device is ON at any other one
+POSITION_STATES = {'open': DevState.OPEN, 'close': DevState.CLOSE}
+# Attributes whose memorized values are needed before the controller is programmed
+MEMORIZED = ('open_value', 'close_value', 'closing_tolerance',
+             'acceleration', 'deceleration', 'speed', 'smoothing')
+# A queued move fails when it takes this long (s) beyond twice the predicted time
+MOVE_TIMEOUT_MARGIN = 1.0
+# Attributes served by one upload of the latched crossings per read cycle
+LATCH_ATTRIBUTES = ('latch_times', 'latch_positions', 'latch_sources')
 
 # PROTECTED REGION END #    //  SoftiGalilShutter.additionnal_import
 
@@ -45,26 +95,130 @@ class SoftiGalilShutter(Device):
 
     - Device Property
         host
-            - Galil host name or ip.
+            - Galil host name or ip, replay:<path> to serve a recorded traffic log or emulator[:<latency ms>].
             - Type:'DevString'
         port
             - Galil port number.
             - Type:'DevShort'
+        metrics_port
+            - HTTP port of the OpenMetrics endpoint, 0 disables it.
+            - Type:'DevShort'
+        trace_buffer_size
+            - Number of spans kept by the trace ring buffer.
+            - Type:'DevLong'
+        query_cache_ttl
+            - Time during which a status query response is reused, in ms.
+            - Type:'DevDouble'
+        calibration
+            - Calibration record (offset and encoder reference token), written by the device.
+            - Type:'DevString'
+        home_on_startup
+            - Run FindIndex at startup when the calibration record is not consistent.
+            - Type:'DevBoolean'
+        max_acceleration
+            - Upper bound for acceleration and deceleration, in counts/s^2.
+            - Type:'DevLong'
+        max_speed
+            - Upper bound for the slew speed, in counts/s.
+            - Type:'DevLong'
+        autotune_accelerations
+            - Accelerations tried by AutoTune.
+            - Type:'DevVarLongArray'
+        autotune_decelerations
+            - Decelerations tried by AutoTune.
+            - Type:'DevVarLongArray'
+        autotune_speeds
+            - Slew speeds tried by AutoTune.
+            - Type:'DevVarLongArray'
+        autotune_smoothing
+            - IT smoothing constants tried by AutoTune (1 means no smoothing).
+            - Type:'DevVarDoubleArray'
+        autotune_repeats
+            - Open/close cycles per profile.
+            - Type:'DevShort'
+        autotune_settle_window
+            - Time the position has to stay within closing_tolerance to count as settled, in ms.
+            - Type:'DevDouble'
+        latch_thresholds
+            - Aperture threshold positions whose crossings are timestamped on the controller.
+            - Type:'DevVarLongArray'
+        latch_input
+            - Also record the position latch (AL) captures of the latch input.
+            - Type:'DevBoolean'
+        latch_buffer
+            - Size of the crossing ring on the controller.
+            - Type:'DevShort'
+        latch_history
+            - Number of crossings kept by the device.
+            - Type:'DevLong'
+        record_moves
+            - Record the trajectory of every Open/Close on the controller (RA/RD/RC).
+            - Type:'DevBoolean'
+        record_rate
+            - RC rate exponent from 1 to 8, one sample every 2^n servo samples (RC 0 would stop recording).
+            - Type:'DevShort'
+        record_samples
+            - Number of samples recorded per move.
+            - Type:'DevShort'
+        record_error
+            - Also record the position error.
+            - Type:'DevBoolean'
+        record_velocity
+            - Also record the velocity.
+            - Type:'DevBoolean'
+        record_history
+            - Number of trajectories kept by the device.
+            - Type:'DevShort'
+        shm_path
+            - File the status is published to for local readers, e.g. /dev/shm/galil_shutter. Empty disables it.
+            - Type:'DevString'
+        shm_history
+            - Number of position samples kept in the shared-memory history.
+            - Type:'DevLong'
+        shm_period
+            - Status read period of the shared-memory publisher, in ms.
+            - Type:'DevDouble'
+        traffic_log
+            - File every controller transaction is recorded to. Empty disables recording.
+            - Type:'DevString'
+        replay_time_scale
+            - Factor applied to the recorded latencies when replaying, 0 answers immediately.
+            - Type:'DevDouble'
+        settle_time
+            - Time from the end of the profile until the position is settled, in ms. AutoTune replaces it when applying a profile.
+            - Type:'DevDouble'
+        positions
+            - Further named positions as name:position[:tolerance], next to open and close. The tolerance defaults to closing_tolerance.
+            - Type:'DevVarStringArray'
+        queue_size
+            - Number of pending Open/Close/MoveTo requests.
+            - Type:'DevShort'
+        queue_mode
+            - latest: a request replaces the pending ones, fifo: requests run in order, those beyond queue_size are dropped.
+            - Type:'DevString'
+        adaptive_timeouts
+            - Derive the library timeout of every transaction class from its measured round-trip times.
+            - Type:'DevBoolean'
+        probe_period
+            - Period of the controller health probe, in ms. 0 disables it.
+            - Type:'DevDouble'
+        enable_interrupts
+            - Listen to the controller interrupts (EI) for motion complete, input 1 and the limit switches.
+            - Type:'DevBoolean'
+        interrupt_port
+            - Local UDP port the interrupt status bytes are received on instead of the controller, 0 uses GInterrupt.
+            - Type:'DevLong'
     """
     # PROTECTED REGION ID(SoftiGalilShutter.class_variable) ENABLED START #
     @DebugIt()
+    @tracing.traced
     def _switch_to_ext_ctrl(self, close_pos=7500, open_pos=7000):
         try:
             print('Calling _switch_to_ext_ctrl..')
             o_pos = int(open_pos)
             c_pos = int(close_pos)
-            # self.program = '#A;JS#B,@IN[1]=0;JS#C,@IN[1]=1;JP#A;\n#B;PA7000;BGA;AMA;EN;\n#C;PA7500;BGA;AMA;EN'
-            self._init_motor()
-            print('Initializing the motor, please wait..')
-            program = f'#A;JS#B,@IN[1]=0;JS#C,@IN[1]=1;JP#A;\n#B;PA{o_pos};BGA;AMA;EN;\n#C;PA{c_pos};BGA;AMA;EN' # Enables OPEN/CLOSE via DI1
-            self.g.GProgramDownload(program, '--max 3')
-            self.g.GCommand('XQ')
-            # time.sleep(2)
+            # #EXT of the resident program follows DI1, epos=0 makes it go where the input asks
+            self._command(f'cls={c_pos};opn={o_pos};SH A;epos=0;mode=1') # Enables OPEN/CLOSE via DI1
             self.set_state(DevState.INSERT)
             self._external_control = True
         except Exception as e:
@@ -74,41 +228,617 @@ class SoftiGalilShutter(Device):
 
     def _init_motor(self):
         try:
-            program = '#A;ACA= 1000000;DCA= 1000000;SPA= 200000;SH A;EN' # Setting up the parameters and turning ON
-            self.g.GProgramDownload(program, '--max 3')
-            self.g.GCommand('XQ')
+            # Leaving external control once its move is done, setting up the parameters and turning ON
+            self._command(f'mode=0;AM A;{self._profile_variables()};ACA=acc;DCA=dec;SPA=spd;ITA=its;SH A')
             self.set_state(DevState.ON)
         except Exception as e:
             print(f'Error in _init_motor(): {e}')
             self.set_state(DevState.FAULT)
             self.g.GClose()
 
+    def _profile_variables(self):
+        return f'acc={self._acceleration};dec={self._deceleration};spd={self._speed};its={self._smoothing}'
+
+    def _load_firmware(self):
+        """Downloads the resident program unless the controller already holds this version, then starts it."""
+        try:
+            loaded = int(float(self.g.GCommand('MG fwver'))) == firmware.VERSION
+        except gclib.GclibError:
+            loaded = False # variable not defined since the last reset
+        if not loaded:
+            print('Downloading the controller program..')
+            self._command('HX') # Halt all threads, programs can not be downloaded while running
+            self.g.GProgramDownload(firmware.PROGRAM, '--max 3')
+            self._command(f'fwver={firmware.VERSION}')
+        self._command(f'mode=0;opn={self._open_value};cls={self._close_value};{self._profile_variables()}')
+        self._command(f'XQ#INIT,{firmware.SUPERVISOR_THREAD}')
+        self._start_latch()
+
     def _stop_all(self):
-        self.g.GCommand('AB 0') #Abort motion and program operation
+        self._command('mode=0;AB 1') #Abort motion, the resident program keeps running
         #self.g.GCommand('ST A')
 
     def _open_shutter(self):
-        if self.get_state() not in [DevState.MOVING, DevState.OPEN]:
+        self._move_to('open')
+
+    def _close_shutter(self):
+        self._move_to('close')
+
+    def _move_to(self, name):
+        """Moves to a named position, or to the target of an abs_position write (a number)."""
+        if self.get_state() not in [DevState.MOVING, POSITION_STATES.get(name)]:
             try:
                 self.set_state(DevState.MOVING)
-                #self.g.GCommand('PA4500')
-                self.g.GCommand('PA'+str(self._open_value))
-                self.g.GCommand('BG A')
+                if isinstance(name, str):
+                    self._start_move(self._positions.targets[name], self._positions.commands[name])
+                else:
+                    self._start_move(name)
             except Exception as e:
                 #self.g.GClose()
                 self.set_state(DevState.FAULT)
-                print('Error in Open():', e)
+                print(f'Error in MoveTo({name}):', e)
+
+    def _move_command(self, target):
+        """Returns the command sending the target and beginning the move, arming the trajectory recording if enabled."""
+        if self.record_moves:
+            return f'PA{target};RC {self.record_rate};BG A'
+        return f'PA{target};BG A'
+
+    def _start_move(self, target, command=None):
+        self._opened.clear()
+        self._command(command or self._move_command(target))
+        self._move_pending = True # the next status read without motion ends it
+        self._predict(target)
+        if self._interrupts_on: # the motion complete interrupt pushes the end of the move
+            self.set_state(DevState.MOVING)
+            self.push_change_event('State', DevState.MOVING)
+
+    def _submit(self, name):
+        if self._queue is None:
+            raise RuntimeError('No command queue, the device did not initialise')
+        self._last_submitted = self._queue.submit(name)
+        return self._last_submitted
+
+    def _set_opened(self):
+        """Marks the aperture open for the request whose move is the current one."""
+        with self._open_condition:
+            self._opened.set()
+            self._open_condition.notify_all()
+
+    def _execute_move(self, name):
+        """
+        Runs a queued move on the scheduler thread and returns True once the position is reached.
+        The move fails if it is not done within twice the time the motion model predicts plus
+        MOVE_TIMEOUT_MARGIN.
+        """
+        start = time.time()
+        with tango.AutoTangoMonitor(self):
+            if self._external_control or self._tuning:
+                return False
+            self._motion_complete.clear()
+            with self._open_condition:
+                self._move_request = self._running_request
+                self._open_condition.notify_all()
+            self._move_to(name)
+        predicted = max(0.0, self._settle_eta - start) # 0 if no move was needed
+        deadline = start + 2 * predicted + MOVE_TIMEOUT_MARGIN
+        time.sleep(max(0.0, self._settle_eta - time.time()))
+        while True:
+            with tango.AutoTangoMonitor(self):
+                self._update_state()
+                state = self.get_state()
+                stopped = self._status is not None and not self._status.moving
+            if not isinstance(name, str): # abs_position target, possibly off every named position
+                if stopped:
+                    return abs(self.current_position - name) <= self._closing_tolerance
+            elif state != DevState.MOVING:
+                return self._position_name == name
+            if time.time() > deadline:
+                return False
+            self._motion_complete.wait(0.005) # returns at once on the motion complete interrupt
+
+    def _on_request(self, request_id, name, state):
+        if state == scheduler.RUNNING: # called on the scheduler thread right before _execute_move
+            self._running_request = request_id
+        self._last_request = json.dumps({'id': request_id, 'name': name, 'state': state})
+        self.push_change_event('last_request', self._last_request)
+        self.push_change_event('queue_depth', self._queue.depth)
+        if state == scheduler.DROPPED:
+            self.push_change_event('queue_drops', self._queue.drops)
+        elif state == scheduler.COALESCED:
+            self.push_change_event('queue_coalesced', self._queue.coalesced)
+        elif state in (scheduler.DONE, scheduler.FAILED):
+            self._completed_request = request_id
+            self.push_change_event('completed_request', request_id)
+
+    def _position_table(self, open_value=None, close_value=None, tolerance=None):
+        """Builds the table of the named positions, with open and close from the set points."""
+        tolerance = self._closing_tolerance if tolerance is None else tolerance
+        entries = positions.parse(self.positions, tolerance) + [
+            ('open', self._open_value if open_value is None else open_value, tolerance),
+            ('close', self._close_value if close_value is None else close_value, tolerance),
+        ]
+        return positions.PositionTable(entries, self._move_command)
+
+    def _predict(self, target):
+        """Predicts from the AC/DC/SP profile when the move reaches the target window and settles."""
+        now = time.time()
+        distance = abs(target - self.current_position)
+        profile = (distance, self._acceleration, self._deceleration, self._speed)
+        self._settle_eta = now + sum(motion.trapezoid(*profile)) + self._settle_margin
+        if target == self._open_value:
+            self._open_eta = now + motion.time_at(distance - self._closing_tolerance, *profile)
+        else:
+            self._open_eta = float('nan')
+        self._move_id += 1
+        self.push_change_event('open_eta', self._open_eta)
+        self.push_change_event('settle_eta', self._settle_eta)
+        self.push_change_event('open_ready', False)
+        if target == self._open_value:
+            t = Thread(target=self._watch_open, args=(self._move_id,))
+            t.daemon = True
+            t.start()
+
+    def _in_open_window(self, status):
+        return abs(status.position - self._open_value) < self._closing_tolerance
+
+    def _watch_open(self, move_id):
+        """Confirms the predicted opening on the controller and signals it."""
+        time.sleep(max(0.0, self._open_eta - time.time()))
+        deadline = self._settle_eta + 1.0
+        try:
+            while self._move_id == move_id and time.time() < deadline:
+                # past the cache, which would hold the status for query_cache_ttl
+                if self._in_open_window(self._read_status(fresh=True)):
+                    self._set_opened()
+                    self.push_change_event('open_ready', True)
+                    return
+                time.sleep(0.002)
+        except Exception as e:
+            print(f'Error while confirming the opening: {e}')
 
-    def _close_shutter(self):
-        if self.get_state() not in [DevState.MOVING, DevState.CLOSE]:
+    def _on_move_done(self):
+        """Uploads what the controller recorded during the move; a failed upload only loses that data."""
+        if self._latching:
             try:
-                self.set_state(DevState.MOVING)
-                self.g.GCommand('PA'+str(self._close_value))
-                self.g.GCommand('BG A')
+                self._drain_latches()
             except Exception as e:
-                #self.g.GClose()
-                self.set_state(DevState.FAULT)
-                print('Error in Close()', e)
+                print(f'Could not upload the latched crossings: {e}')
+        if self.record_moves:
+            try:
+                self._upload_trajectory()
+            except Exception as e:
+                print(f'Could not upload the trajectory: {e}')
+
+    def _query(self, query):
+        response = self.g.GCommand(query)
+        shm = self._shm
+        if query == STATUS_QUERY and shm is not None:
+            status = ControllerStatus(*[int(float(v)) for v in response.split()])
+            state = self._classify(status) or self.get_state()
+            shm.publish(time.time(), status.position, int(state), status.switches,
+                              status.input1, status.moving, status.motor_off)
+        return response
+
+    def _command(self, command):
+        """Sends a command that may change the controller state and drops the cached queries."""
+        try:
+            return self.g.GCommand(command)
+        finally:
+            self._cache.invalidate()
+
+    def _read_status(self, fresh=False):
+        """Returns the controller status, fetched at most once per query_cache_ttl unless fresh."""
+        response = self._query(STATUS_QUERY) if fresh else self._cache.get(STATUS_QUERY)
+        values = [int(float(v)) for v in response.split()]
+        return ControllerStatus(*values)
+
+    def _classify(self, status):
+        """Returns the state the status corresponds to, or None if it does not change the state."""
+        if status.moving and not self._external_control:
+            return DevState.MOVING
+        name = self._positions.lookup(status.position)
+        if name is None:
+            return None
+        elif self._external_control:
+            return DevState.INSERT
+        return POSITION_STATES.get(name, DevState.ON)
+
+    def _update_state(self):
+        if self.g is None:
+            return # init_device could not create the connection, the device stays in FAULT
+        try:
+            status = self._read_status()
+            was_moving = self._move_pending or (self._status is not None and self._status.moving)
+            if was_moving and not status.moving:
+                self._move_pending = False
+                self._on_move_done()
+            self._status = status
+            self._status_time = time.time()
+            self.current_position = status.position
+            self._position_name = self._positions.lookup(status.position) or ''
+            state = self._classify(status)
+            if state is not None:
+                self.set_state(state)
+            if state == DevState.OPEN:
+                self._set_opened()
+        except Exception as e:
+            print(f'There was an exception in _update_state: {e}')
+            self.g.GClose()
+            time.sleep(1)
+            print('Reopenning of the connection to the controller..')
+            self._reconnects += 1
+            self.g.GOpen(self._address())
+            self.set_state(DevState.FAULT)
+
+    def _load_memorized(self):
+        """Restores the memorized set points before the controller is programmed."""
+        try:
+            db = tango.Util.instance().get_database()
+            props = db.get_device_attribute_property(self.get_name(), list(MEMORIZED))
+            for name in MEMORIZED:
+                value = props.get(name, {}).get('__value')
+                if value:
+                    current = getattr(self, '_' + name)
+                    setattr(self, '_' + name, type(current)(float(value[0])))
+        except Exception as e:
+            print(f'Could not restore the memorized values: {e}')
+
+    def _save_memorized(self, names):
+        """Stores the current values of memorized attributes like a client write would."""
+        try:
+            db = tango.Util.instance().get_database()
+            db.put_device_attribute_property(
+                self.get_name(), {name: {'__value': [str(getattr(self, '_' + name))]} for name in names})
+        except Exception as e:
+            print(f'Could not store the memorized values: {e}')
+
+    def _save_settle_time(self):
+        try:
+            db = tango.Util.instance().get_database()
+            db.put_device_property(self.get_name(), {'settle_time': [str(self._settle_margin * 1000.0)]})
+        except Exception as e:
+            print(f'Could not store the settle time: {e}')
+
+    def _save_calibration(self):
+        try:
+            db = tango.Util.instance().get_database()
+            db.put_device_property(self.get_name(), {'calibration': [json.dumps(self._calibration)]})
+        except Exception as e:
+            print(f'Could not store the calibration record: {e}')
+
+    def _restore_calibration(self):
+        """
+        Returns True if the stored calibration still matches the controller.
+        The reference token is a controller variable written when the index is found,
+        it is lost on reset or power cycle, i.e. whenever the encoder reference is.
+        """
+        try:
+            record = json.loads(self.calibration) if self.calibration else {}
+        except ValueError as e:
+            print(f'Invalid calibration record: {e}')
+            record = {}
+        self._calibration = record
+        self._offset = record.get('offset', 0)
+        if 'token' not in record:
+            return False
+        try:
+            token = int(float(self.g.GCommand('MG calref')))
+        except gclib.GclibError:
+            return False # variable not defined since the last reset
+        position = int(self.g.GCommand('TP'))
+        return token == record['token'] and abs(position - record.get('position', position)) < COUNTS_PER_REV
+
+    def _find_index(self):
+        """Starts #INDEX and returns the reference token it writes once the index is found."""
+        self._stop_all()
+        self._external_control = False
+        self._calibrated = False
+        # Counts the homings, deterministic so that a recorded session replays
+        token = self._calibration.get('token', 0) % 2**30 + 1
+        # #INDEX of the resident program, the index is at -offset once it is done
+        self._command(f'ioff={self._offset};itok={token};idone=0')
+        print('FindIndex(): ', self._command(f'XQ#INDEX,{firmware.ROUTINE_THREAD}'))
+        return token
+
+    def _wait_index(self, token, timeout=60):
+        """Waits for #INDEX and stores the calibration record if it found the index."""
+        deadline = time.monotonic() + timeout
+        while True:
+            done = int(float(self.g.GCommand('MG idone')))
+            if done == 1:
+                break
+            if done == -1:
+                raise RuntimeError('#INDEX was stopped before the index was found')
+            if time.monotonic() > deadline:
+                raise RuntimeError('#INDEX did not finish')
+            time.sleep(0.05)
+        self._calibration = {'token': token, 'offset': self._offset, 'position': -self._offset}
+        self._save_calibration()
+        self._calibrated = True
+
+    def _complete_index(self, token):
+        try:
+            self._wait_index(token)
+        except Exception as e:
+            print(f'Error in FindIndex(): {e}')
+
+    def _tune_move(self, profile, target, direction, window, limit):
+        """Runs #TUNE once and returns its travel time, settle time and overshoot."""
+        self._command(
+            f'acc={profile.acceleration};dec={profile.deceleration};spd={profile.speed};'
+            f'its={profile.smoothing};tgt={target};dir={direction};tol={self._closing_tolerance};'
+            f'win={window};tmax={limit};done=0'
+        )
+        self._command(f'XQ#TUNE,{firmware.ROUTINE_THREAD}')
+        deadline = time.monotonic() + 10
+        while int(float(self.g.GCommand('MG done'))) != 1:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'no response from #TUNE for {profile}')
+            time.sleep(0.005)
+        return [float(v) for v in self.g.GCommand('MG ttr,tst,ov').split()]
+
+    def _autotune(self, profiles, apply):
+        results = []
+        try:
+            sample_ms = float(self.g.GCommand('MG _TM')) / 1000.0 # TIME ticks once per servo sample
+            window = max(1, int(self.autotune_settle_window / sample_ms))
+            limit = int(1000 / sample_ms)
+            direction = 1 if self._open_value > self._close_value else -1
+            for i, profile in enumerate(profiles):
+                if self._autotune_abort.is_set():
+                    break
+                self._autotune_status = f'Testing {profile}'
+                moves = []
+                for _ in range(self.autotune_repeats):
+                    moves.append(self._tune_move(profile, self._open_value, direction, window, limit))
+                    moves.append(self._tune_move(profile, self._close_value, -direction, window, limit))
+                results.append(dict(
+                    profile._asdict(),
+                    travel_time=sum(m[0] for m in moves) / len(moves) * sample_ms,
+                    settle_time=sum(m[1] for m in moves) / len(moves) * sample_ms,
+                    overshoot=max(m[2] for m in moves),
+                    settled=all(m[1] + window <= m[0] + limit for m in moves),
+                ))
+                self._autotune_progress = 100.0 * (i + 1) / len(profiles)
+            best = autotune.fastest(results, self._closing_tolerance)
+            self._autotune_result = json.dumps({'best': best, 'results': results})
+            if self._autotune_abort.is_set():
+                self._autotune_status = 'Aborted'
+            elif best is None:
+                self._autotune_status = 'No profile settled within the closing tolerance'
+            else:
+                self._autotune_status = f'Fastest profile settles in {best["settle_time"]:.1f} ms'
+                if apply:
+                    self._acceleration = best['acceleration']
+                    self._deceleration = best['deceleration']
+                    self._speed = best['speed']
+                    self._smoothing = best['smoothing']
+                    self._settle_margin = max(0.0, best['settle_time'] - best['travel_time']) / 1000.0
+                    self._save_memorized(('acceleration', 'deceleration', 'speed', 'smoothing'))
+                    self._save_settle_time()
+                    self._autotune_status += ', applied'
+        except Exception as e:
+            self._autotune_status = f'Failed: {e}'
+            print(f'Error in AutoTune: {e}')
+        finally:
+            self._tuning = False
+            self._init_motor()
+
+    def _start_latch(self):
+        if self._latching:
+            self._command(f'XQ#LATCH,{latch.LATCH_THREAD}')
+
+    def _setup_latch(self):
+        """Allocates the crossing ring and the thresholds on the controller."""
+        thresholds = list(self.latch_thresholds)
+        size = self.latch_buffer
+        try:
+            self._command('DA lt[],lp[],lk[],lth[]')
+        except gclib.GclibError:
+            pass # not allocated yet
+        self._command(f'DM lt[{size}],lp[{size}],lk[{size}],lth[{max(len(thresholds), 1)}]')
+        if thresholds:
+            self.g.GArrayDownload('lth', 0, len(thresholds) - 1, thresholds)
+        self._command(f'lsz={size};lnt={len(thresholds)};lal={int(self.latch_input)};ln=0;lcount=0')
+        self._latch_seen = 0
+        self._latch_tick = float(self.g.GCommand('MG _TM')) / 1e6 # seconds per TIME tick
+
+    def _drain_latches(self):
+        """Uploads the crossings recorded since the last call and pushes them as events."""
+        before = time.time()
+        count, next_slot, ticks = (float(v) for v in self.g.GCommand('MG lcount,ln,TIME').split())
+        now = (before + time.time()) / 2
+        count = int(count)
+        if count == self._latch_seen:
+            return
+        size = self.latch_buffer
+        slots = latch.ring_order(count, self._latch_seen, int(next_slot), size)
+        times = numpy.array(self.g.GArrayUpload('lt', 0, size - 1))[slots]
+        positions = numpy.array(self.g.GArrayUpload('lp', 0, size - 1), dtype=numpy.int64)[slots]
+        sources = numpy.array(self.g.GArrayUpload('lk', 0, size - 1), dtype=numpy.int16)[slots]
+        self._latch_seen = count
+        self._latches.extend(now + (times - ticks) * self._latch_tick, positions, sources)
+        self.push_change_event('latch_times', self._latches.times)
+        self.push_change_event('latch_positions', self._latches.positions)
+        self.push_change_event('latch_sources', self._latches.sources)
+
+    def _setup_recording(self):
+        """Allocates the record arrays and selects the recorded operands."""
+        if not 1 <= self.record_rate <= 8:
+            raise ValueError(f'record_rate must be from 1 to 8, not {self.record_rate}')
+        names = ','.join(f'{array}[]' for array, _ in self._record_signals.values())
+        try:
+            self._command(f'DA {names}')
+        except gclib.GclibError:
+            pass # not allocated yet
+        size = self.record_samples
+        self._command('DM ' + ','.join(f'{array}[{size}]' for array, _ in self._record_signals.values()))
+        self._command(f'RA {names}')
+        self._command('RD ' + ','.join(operand for _, operand in self._record_signals.values()))
+
+    def _upload_trajectory(self):
+        """Uploads the samples recorded during the last move, one GArrayUpload per signal."""
+        recording_on, next_sample = (int(float(v)) for v in self.g.GCommand('MG _RC,_RD').split())
+        count = next_sample if recording_on else self.record_samples
+        if count <= 0:
+            return
+        for signal, (array, _) in self._record_signals.items():
+            self._trajectories.append(signal, numpy.array(self.g.GArrayUpload(array, 0, count - 1)))
+
+    def _publish_status(self):
+        """
+        Keeps the shared-memory status fresh while no client reads the device.
+        Bypasses the query cache, which would hold the file for query_cache_ttl.
+        """
+        failing = False
+        while not self._shm_stop.wait(self.shm_period / 1000.0):
+            try:
+                self._query(STATUS_QUERY)
+                failing = False
+            except Exception as e:
+                if not failing:
+                    print(f'Error in the status publisher: {e}')
+                failing = True
+
+    def _probe(self):
+        """Measures the round-trip time of a minimal query so that a dead link is seen within a period."""
+        while not self._shm_stop.wait(self.probe_period / 1000.0):
+            try:
+                with self.g._lock: # time the link, not the wait for the transactions of other threads
+                    start = time.perf_counter()
+                    self.g.GCommand('MG TIME')
+                    self._rtt = (time.perf_counter() - start) * 1000
+                if self._probe_failing:
+                    print('The health probe succeeds again.')
+                    with tango.AutoTangoMonitor(self):
+                        self.set_status(tango.constants.StatusNotSet) # back to the status of the state
+                        self._update_state()
+                self._probe_failing = False
+            except Exception as e:
+                self._rtt = float('nan')
+                if not self._probe_failing:
+                    print(f'The health probe failed: {e}')
+                    with tango.AutoTangoMonitor(self):
+                        self.set_state(DevState.FAULT)
+                        self.set_status(f'The controller does not answer: {e}')
+                self._probe_failing = True
+            self.push_change_event('rtt', self._rtt)
+
+    def _address(self):
+        """Returns the GOpen address of the main connection, which leaves the interrupts to the listener."""
+        subscription = 'MG' if self.enable_interrupts else 'ALL'
+        return f'{self.host} --direct -s {subscription}'
+
+    def _start_interrupts(self):
+        """Enables the controller interrupts and starts their listener; State and abs_position events are then pushed."""
+        try:
+            if self.interrupt_port > 0:
+                listener = interrupts.UdpListener(self.interrupt_port)
+            elif isinstance(self.g, emulator.EmulatedController):
+                listener = interrupts.UdpListener()
+                self.g.interrupt_address = listener.address
+            else:
+                listener = interrupts.GclibListener(self.host)
+            self._command(interrupts.ei_command())
+        except Exception as e:
+            self.warn_stream(f'Interrupts are not available, polling only: {e}')
+            return
+        for name in ('State', 'abs_position'):
+            self.set_change_event(name, True, False)
+        self._interrupts_on = True
+        self._interrupt_listener = listener
+        self._interrupt_stop = Event() # one per listener, init_device starts a new one
+        self._interrupt_thread = Thread(target=self._listen_interrupts, args=(listener, self._interrupt_stop))
+        self._interrupt_thread.daemon = True
+        self._interrupt_thread.start()
+
+    def _stop_interrupts(self):
+        """Stops the interrupt listener and closes its connection."""
+        if self._interrupt_listener is None:
+            return
+        listener, self._interrupt_listener = self._interrupt_listener, None
+        self._interrupt_stop.set()
+        self._interrupt_thread.join(1.0) # wait() returns within the listener timeout
+        listener.close()
+
+    def _listen_interrupts(self, listener, stop):
+        while not stop.is_set():
+            try:
+                status = listener.wait()
+            except Exception as e:
+                if stop.is_set():
+                    break
+                print(f'Error in the interrupt listener: {e}')
+                stop.wait(1.0)
+                continue
+            if status is not None:
+                self._dispatch_interrupt(status, stop)
+
+    def _dispatch_interrupt(self, status, stop):
+        """Reads the status the interrupt announces and pushes the events."""
+        with tango.AutoTangoMonitor(self):
+            if stop.is_set(): # came in while delete_device held the monitor
+                return
+            self._interrupt_count += 1
+            self._last_interrupt = interrupts.describe(status)
+            try:
+                if interrupts.INPUT < status <= interrupts.INPUT + 8: # fired inputs are disarmed
+                    self._command(interrupts.ei_command())
+                self._cache.invalidate()
+                self._update_state()
+            except Exception as e:
+                print(f'Error handling the interrupt {self._last_interrupt}: {e}')
+            if status in (interrupts.MOTION_COMPLETE, interrupts.ALL_COMPLETE):
+                self._motion_complete.set()
+            self.push_change_event('interrupt_count', self._interrupt_count)
+            self.push_change_event('last_interrupt', self._last_interrupt)
+            self.push_change_event('State', self.get_state())
+            self.push_change_event('abs_position', self.current_position)
+
+    def _connection(self):
+        if self.host.startswith('replay:'):
+            return replay.ReplayConnection(self.host[len('replay:'):], self.replay_time_scale)
+        if self.host.split(':')[0] == 'emulator':
+            try:
+                latency = float(self.host.partition(':')[2] or 0)
+            except ValueError:
+                latency = float('nan')
+            if not latency >= 0: # also rejects nan
+                raise ValueError(f'host {self.host}: the emulator latency must be a number of ms >= 0')
+            return emulator.EmulatedController(latency / 1000.0)
+        return gclib.py()
+
+    def _snapshot(self):
+        """Returns the device and controller status of the last status read."""
+        status = self._status
+        if status is None:
+            raise RuntimeError('The controller status has not been read yet')
+        return {
+            'timestamp': self._status_time,
+            'state': str(self.get_state()),
+            'abs_position': status.position,
+            'external_control': self._external_control,
+            'open_value': self._open_value,
+            'close_value': self._close_value,
+            'closing_tolerance': self._closing_tolerance,
+            'offset': self._offset,
+            'position_name': self._position_name,
+            'switches': status.switches,
+            'moving': bool(status.moving),
+            'motor_off': bool(status.motor_off),
+            'input1': bool(status.input1),
+            'stop_code': status.stop_code,
+        }
+
+    def _metrics_text(self):
+        return metrics.render(
+            self.g.stats.snapshot(),
+            gclib.GclibStats.buckets,
+            reconnects=self._reconnects,
+            hook_seconds=self._hook_time,
+            hook_calls=self._hook_calls,
+        )
         
     # PROTECTED REGION END #    //  SoftiGalilShutter.class_variable
 
@@ -126,6 +856,186 @@ class SoftiGalilShutter(Device):
         default_value=23
     )
 
+    metrics_port = device_property(
+        dtype='DevShort',
+        default_value=0
+    )
+
+    trace_buffer_size = device_property(
+        dtype='DevLong',
+        default_value=65536
+    )
+
+    query_cache_ttl = device_property(
+        dtype='DevDouble',
+        default_value=20.0
+    )
+
+    calibration = device_property(
+        dtype='DevString',
+        default_value=""
+    )
+
+    home_on_startup = device_property(
+        dtype='DevBoolean',
+        default_value=False
+    )
+
+    max_acceleration = device_property(
+        dtype='DevLong',
+        default_value=4000000
+    )
+
+    max_speed = device_property(
+        dtype='DevLong',
+        default_value=500000
+    )
+
+    autotune_accelerations = device_property(
+        dtype='DevVarLongArray',
+        default_value=[500000, 1000000, 2000000, 4000000]
+    )
+
+    autotune_decelerations = device_property(
+        dtype='DevVarLongArray',
+        default_value=[500000, 1000000, 2000000, 4000000]
+    )
+
+    autotune_speeds = device_property(
+        dtype='DevVarLongArray',
+        default_value=[100000, 200000, 400000]
+    )
+
+    autotune_smoothing = device_property(
+        dtype='DevVarDoubleArray',
+        default_value=[1.0]
+    )
+
+    autotune_repeats = device_property(
+        dtype='DevShort',
+        default_value=3
+    )
+
+    autotune_settle_window = device_property(
+        dtype='DevDouble',
+        default_value=20.0
+    )
+
+    latch_thresholds = device_property(
+        dtype='DevVarLongArray',
+        default_value=[]
+    )
+
+    latch_input = device_property(
+        dtype='DevBoolean',
+        default_value=False
+    )
+
+    latch_buffer = device_property(
+        dtype='DevShort',
+        default_value=100
+    )
+
+    latch_history = device_property(
+        dtype='DevLong',
+        default_value=1000
+    )
+
+    record_moves = device_property(
+        dtype='DevBoolean',
+        default_value=False
+    )
+
+    record_rate = device_property(
+        dtype='DevShort',
+        default_value=1
+    )
+
+    record_samples = device_property(
+        dtype='DevShort',
+        default_value=200
+    )
+
+    record_error = device_property(
+        dtype='DevBoolean',
+        default_value=False
+    )
+
+    record_velocity = device_property(
+        dtype='DevBoolean',
+        default_value=False
+    )
+
+    record_history = device_property(
+        dtype='DevShort',
+        default_value=10
+    )
+
+    shm_path = device_property(
+        dtype='DevString',
+        default_value=""
+    )
+
+    shm_history = device_property(
+        dtype='DevLong',
+        default_value=4096
+    )
+
+    shm_period = device_property(
+        dtype='DevDouble',
+        default_value=10.0
+    )
+
+    traffic_log = device_property(
+        dtype='DevString',
+        default_value=""
+    )
+
+    replay_time_scale = device_property(
+        dtype='DevDouble',
+        default_value=1.0
+    )
+
+    settle_time = device_property(
+        dtype='DevDouble',
+        default_value=10.0
+    )
+
+    positions = device_property(
+        dtype='DevVarStringArray',
+        default_value=[]
+    )
+
+    queue_size = device_property(
+        dtype='DevShort',
+        default_value=16
+    )
+
+    queue_mode = device_property(
+        dtype='DevString',
+        default_value="latest"
+    )
+
+    adaptive_timeouts = device_property(
+        dtype='DevBoolean',
+        default_value=True
+    )
+
+    probe_period = device_property(
+        dtype='DevDouble',
+        default_value=200.0
+    )
+
+    enable_interrupts = device_property(
+        dtype='DevBoolean',
+        default_value=True
+    )
+
+    interrupt_port = device_property(
+        dtype='DevLong',
+        default_value=0
+    )
+
     # ----------
     # Attributes
     # ----------
@@ -150,6 +1060,12 @@ class SoftiGalilShutter(Device):
         doc="Clockwise offset from the index marker to 0 deg.",
     )
 
+    calibrated = attribute(
+        dtype='DevBoolean',
+        label="Calibrated",
+        doc="True if the encoder reference matches the stored calibration record.",
+    )
+
     external_control = attribute(
         dtype='DevBoolean',
         label="External control",
@@ -159,6 +1075,7 @@ class SoftiGalilShutter(Device):
     open_value = attribute(
         dtype='DevLong',
         access=AttrWriteType.READ_WRITE,
+        memorized=True,
         display_level=DispLevel.EXPERT,
         label="Open value",
         unit="counts",
@@ -168,6 +1085,7 @@ class SoftiGalilShutter(Device):
     close_value = attribute(
         dtype='DevLong',
         access=AttrWriteType.READ_WRITE,
+        memorized=True,
         display_level=DispLevel.EXPERT,
         label="Close value",
         unit="counts",
@@ -177,12 +1095,349 @@ class SoftiGalilShutter(Device):
     closing_tolerance = attribute(
         dtype='DevLong',
         access=AttrWriteType.READ_WRITE,
+        memorized=True,
         label="Closing tolerance",
         max_value=500,
         min_value=0,
         doc="The tolerance to determine whether the shutter is open or closed.",
     )
 
+    acceleration = attribute(
+        dtype='DevLong',
+        access=AttrWriteType.READ_WRITE,
+        memorized=True,
+        display_level=DispLevel.EXPERT,
+        label="Acceleration",
+        unit="counts/s^2",
+        min_value=1024,
+        doc="Acceleration of the open/close moves (AC).",
+    )
+
+    deceleration = attribute(
+        dtype='DevLong',
+        access=AttrWriteType.READ_WRITE,
+        memorized=True,
+        display_level=DispLevel.EXPERT,
+        label="Deceleration",
+        unit="counts/s^2",
+        min_value=1024,
+        doc="Deceleration of the open/close moves (DC).",
+    )
+
+    speed = attribute(
+        dtype='DevLong',
+        access=AttrWriteType.READ_WRITE,
+        memorized=True,
+        display_level=DispLevel.EXPERT,
+        label="Speed",
+        unit="counts/s",
+        min_value=1,
+        doc="Slew speed of the open/close moves (SP).",
+    )
+
+    smoothing = attribute(
+        dtype='DevDouble',
+        access=AttrWriteType.READ_WRITE,
+        memorized=True,
+        display_level=DispLevel.EXPERT,
+        label="Smoothing",
+        max_value=1.0,
+        min_value=0.004,
+        doc="Independent time constant smoothing (IT), 1 means no smoothing.",
+    )
+
+    autotune_progress = attribute(
+        dtype='DevDouble',
+        display_level=DispLevel.EXPERT,
+        label="AutoTune progress",
+        unit="%",
+        doc="Progress of the running motion profile sweep.",
+    )
+
+    autotune_status = attribute(
+        dtype='DevString',
+        display_level=DispLevel.EXPERT,
+        label="AutoTune status",
+        doc="What the motion profile sweep is doing or how it ended.",
+    )
+
+    autotune_result = attribute(
+        dtype='DevString',
+        display_level=DispLevel.EXPERT,
+        label="AutoTune result",
+        doc="JSON with the measured travel/settle times and overshoot per profile and the fastest clean one.",
+    )
+
+    latch_times = attribute(
+        dtype=('DevDouble',),
+        max_dim_x=100000,
+        label="Latch times",
+        unit="s",
+        doc="Epoch times of the latched threshold crossings, oldest first.",
+    )
+
+    latch_positions = attribute(
+        dtype=('DevLong64',),
+        max_dim_x=100000,
+        label="Latch positions",
+        unit="counts",
+        doc="Positions of the latched threshold crossings.",
+    )
+
+    latch_sources = attribute(
+        dtype=('DevShort',),
+        max_dim_x=100000,
+        label="Latch sources",
+        doc="Index into latch_thresholds of each crossing, -1 for a latch input capture.",
+    )
+
+    trajectories = attribute(
+        dtype=(('DevDouble',),),
+        max_dim_x=32767,
+        max_dim_y=1000,
+        display_level=DispLevel.EXPERT,
+        label="Trajectories",
+        unit="counts",
+        doc="Recorded positions of the last moves, one row per move, oldest first.",
+    )
+
+    trajectory_errors = attribute(
+        dtype=(('DevDouble',),),
+        max_dim_x=32767,
+        max_dim_y=1000,
+        display_level=DispLevel.EXPERT,
+        label="Trajectory errors",
+        unit="counts",
+        doc="Recorded position errors of the last moves, if record_error is set.",
+    )
+
+    trajectory_velocities = attribute(
+        dtype=(('DevDouble',),),
+        max_dim_x=32767,
+        max_dim_y=1000,
+        display_level=DispLevel.EXPERT,
+        label="Trajectory velocities",
+        unit="counts/s",
+        doc="Recorded velocities of the last moves, if record_velocity is set.",
+    )
+
+    last_trajectory = attribute(
+        dtype=('DevDouble',),
+        max_dim_x=32767,
+        display_level=DispLevel.EXPERT,
+        label="Last trajectory",
+        unit="counts",
+        doc="Recorded positions of the last move.",
+    )
+
+    trajectory_time = attribute(
+        dtype=('DevDouble',),
+        max_dim_x=32767,
+        display_level=DispLevel.EXPERT,
+        label="Trajectory time",
+        unit="s",
+        doc="Time of each trajectory sample since the start of the move.",
+    )
+
+    transactions = attribute(
+        dtype='DevLong64',
+        display_level=DispLevel.EXPERT,
+        label="Transactions",
+        doc="Number of transactions with the controller since the last metrics reset.",
+    )
+
+    transaction_errors = attribute(
+        dtype='DevLong64',
+        display_level=DispLevel.EXPERT,
+        label="Transaction errors",
+        doc="Number of transactions that returned a gclib error.",
+    )
+
+    transaction_timeouts = attribute(
+        dtype='DevLong64',
+        display_level=DispLevel.EXPERT,
+        label="Transaction timeouts",
+        doc="Number of transactions that timed out.",
+    )
+
+    bytes_sent = attribute(
+        dtype='DevLong64',
+        display_level=DispLevel.EXPERT,
+        label="Bytes sent",
+        unit="bytes",
+        doc="Command bytes sent to the controller.",
+    )
+
+    bytes_received = attribute(
+        dtype='DevLong64',
+        display_level=DispLevel.EXPERT,
+        label="Bytes received",
+        unit="bytes",
+        doc="Response bytes received from the controller.",
+    )
+
+    reconnects = attribute(
+        dtype='DevLong64',
+        display_level=DispLevel.EXPERT,
+        label="Reconnects",
+        doc="Number of times the connection to the controller was reopened.",
+    )
+
+    hook_time = attribute(
+        dtype='DevDouble',
+        display_level=DispLevel.EXPERT,
+        label="Hook time",
+        unit="s",
+        doc="Total time spent in always_executed_hook.",
+    )
+
+    metrics = attribute(
+        dtype='DevString',
+        display_level=DispLevel.EXPERT,
+        label="Metrics",
+        doc="Per-command counts and latency histograms in OpenMetrics text format.",
+    )
+
+    trace_enabled = attribute(
+        dtype='DevBoolean',
+        access=AttrWriteType.READ_WRITE,
+        display_level=DispLevel.EXPERT,
+        label="Trace enabled",
+        doc="Record gclib transactions and Tango calls in the trace buffer.",
+    )
+
+    open_eta = attribute(
+        dtype='DevDouble',
+        label="Open ETA",
+        unit="s",
+        doc="Predicted epoch time the aperture of the current Open move is within closing_tolerance, NaN for other moves.",
+    )
+
+    settle_eta = attribute(
+        dtype='DevDouble',
+        label="Settle ETA",
+        unit="s",
+        doc="Predicted epoch time the current move is settled.",
+    )
+
+    time_to_open = attribute(
+        dtype='DevDouble',
+        label="Time to open",
+        unit="s",
+        doc="Predicted time until the aperture is open, 0 once it is, NaN if no Open move is predicted.",
+    )
+
+    time_to_settle = attribute(
+        dtype='DevDouble',
+        label="Time to settle",
+        unit="s",
+        doc="Predicted time until the current move is settled, 0 once it is.",
+    )
+
+    open_ready = attribute(
+        dtype='DevBoolean',
+        label="Open ready",
+        doc="The controller confirmed the aperture is within closing_tolerance of open_value.",
+    )
+
+    position_name = attribute(
+        dtype='DevString',
+        label="Position name",
+        doc="Name of the position whose tolerance window holds abs_position, empty between positions.",
+    )
+
+    position_names = attribute(
+        dtype=('DevString',),
+        max_dim_x=256,
+        label="Position names",
+        doc="Names of the positions MoveTo accepts, sorted by position.",
+    )
+
+    queue_depth = attribute(
+        dtype='DevLong',
+        label="Queue depth",
+        doc="Pending plus running Open/Close/MoveTo requests.",
+    )
+
+    queue_drops = attribute(
+        dtype='DevLong64',
+        label="Queue drops",
+        doc="Requests dropped because the queue was full.",
+    )
+
+    queue_coalesced = attribute(
+        dtype='DevLong64',
+        label="Queue coalesced",
+        doc="Pending requests replaced by a newer one.",
+    )
+
+    completed_request = attribute(
+        dtype='DevLong64',
+        label="Completed request",
+        doc="Id of the last request that finished, see RequestState.",
+    )
+
+    last_request = attribute(
+        dtype='DevString',
+        label="Last request",
+        doc="Last request state change as JSON: id, name and state.",
+    )
+
+    snapshot_json = attribute(
+        dtype='DevEncoded',
+        label="Snapshot",
+        doc="Timestamped state, position, set points and controller status from one controller read, JSON encoded.",
+    )
+
+    rtt = attribute(
+        dtype='DevDouble',
+        unit="ms",
+        label="Round-trip time",
+        doc="Round-trip time of the last health probe, NaN when it failed.",
+    )
+
+    rtt_p50 = attribute(
+        dtype='DevDouble',
+        unit="ms",
+        label="RTT p50",
+        doc="Median round-trip time of the recent status queries.",
+    )
+
+    rtt_p99 = attribute(
+        dtype='DevDouble',
+        unit="ms",
+        label="RTT p99",
+        doc="99th percentile round-trip time of the recent status queries.",
+    )
+
+    command_timeouts = attribute(
+        dtype='DevString',
+        label="Command timeouts",
+        doc="Library timeout and round-trip percentiles per transaction class as JSON, in ms.",
+    )
+
+    interrupt_count = attribute(
+        dtype='DevLong64',
+        label="Interrupts",
+        doc="Controller interrupts received.",
+    )
+
+    last_interrupt = attribute(
+        dtype='DevString',
+        label="Last interrupt",
+        doc="Last controller interrupt, e.g. motionA, input1 or limit.",
+    )
+
+    # -----
+    # Pipes
+    # -----
+
+    if pipe is not None: # PyTango 10 has no pipes, snapshot_json then stands alone
+        snapshot = pipe(
+            label="Snapshot",
+            doc="Timestamped state, position, set points and controller status from one controller read.",
+        )
+
     # ---------------
     # General methods
     # ---------------
@@ -192,77 +1447,154 @@ class SoftiGalilShutter(Device):
         Device.init_device(self)
         # PROTECTED REGION ID(SoftiGalilShutter.init_device) ENABLED START #
         self._abs_position = 0
-        self._offset = 2100
+        self._offset = 0
+        self._calibration = {}
+        self._calibrated = False
         self._external_control = False
         self.current_position = 0
         self._open_value = 7000
         self._close_value = 7500
         self._closing_tolerance = 40
+        self._acceleration = 1000000
+        self._deceleration = 1000000
+        self._speed = 200000
+        self._smoothing = 1.0
+        self._tuning = False
+        self._autotune_abort = Event()
+        self._autotune_progress = 0.0
+        self._autotune_status = 'Idle'
+        self._autotune_result = ''
+        self._reconnects = 0
+        self._hook_time = 0.0
+        self._hook_calls = 0
+        self._metrics_server = None
+        self._tracer = None
+        self._status = None
+        self._status_time = 0.0
+        self._positions = positions.PositionTable([], self._move_command)
+        self._position_name = ''
+        self._queue = None
+        self._last_request = ''
+        self._completed_request = 0
+        for name in ('queue_depth', 'queue_drops', 'queue_coalesced', 'completed_request', 'last_request'):
+            self.set_change_event(name, True, False)
+        self._open_eta = float('nan')
+        self._settle_eta = 0.0
+        self._settle_margin = self.settle_time / 1000.0
+        self._move_id = 0
+        self._move_pending = False
+        self._opened = Event()
+        self._open_condition = Condition() # notified when _opened is set or _move_request changes
+        self._running_request = 0
+        self._move_request = 0 # request of the current move, _opened refers to it
+        self._last_submitted = 0
+        for name in ('open_eta', 'settle_eta', 'open_ready'):
+            self.set_change_event(name, True, False)
+        self._latching = bool(len(self.latch_thresholds)) or self.latch_input
+        self._latches = latch.History(self.latch_history)
+        self._latch_seen = 0
+        for name in LATCH_ATTRIBUTES:
+            self.set_change_event(name, True, False)
+        self._shm = None
+        self._shm_stop = Event()
+        self._rtt = float('nan')
+        self._probe_failing = False
+        self.set_change_event('rtt', True, False)
+        self._interrupt_count = 0
+        self._last_interrupt = ''
+        self._motion_complete = Event()
+        self._interrupts_on = False
+        self._interrupt_listener = None
+        for name in ('interrupt_count', 'last_interrupt'):
+            self.set_change_event(name, True, False)
+        self._trajectories = recording.Trajectories(self.record_samples, self.record_history)
+        self._record_signals = {'position': recording.POSITION}
+        if self.record_error:
+            self._record_signals['error'] = recording.ERROR
+        if self.record_velocity:
+            self._record_signals['velocity'] = recording.VELOCITY
+        self.g = None # stays None if the connection cannot be created
         try:
-            self.g = gclib.py()
+            self.g = self._connection()
+            if self.adaptive_timeouts:
+                self.g.timeouts = gclib.AdaptiveTimeouts()
+            if self.traffic_log:
+                self.g.recorder = gclib.TransactionRecorder(self.traffic_log)
+            self._cache = querycache.QueryCache(self._query, self.query_cache_ttl / 1000.0)
+            if self.metrics_port > 0:
+                self._metrics_server = metrics.MetricsServer(self.metrics_port, self._metrics_text)
+                self._metrics_server.start()
             print('gclib version:', self.g.GVersion())
             self.g.GClose()
             time.sleep(1)
-            self.g.GOpen(self.host + ' --direct -s ALL')
+            self.g.GOpen(self._address())
             print('The controller info during init: ', self.g.GInfo())
             self.current_position = int(self.g.GCommand('TP'))
             print('The current position is: ', self.current_position)
             self.set_state(DevState.STANDBY)
+            self._load_memorized()
+            self._positions = self._position_table()
+            self._queue = scheduler.CommandQueue(self._execute_move, self.queue_size, self.queue_mode,
+                                                 self._on_request)
+            if self._latching:
+                self._setup_latch()
+            if self.record_moves:
+                self._setup_recording()
+            self._load_firmware()
+            if self.shm_path:
+                self._shm = shmstatus.StatusWriter(self.shm_path, self.shm_history)
+                t = Thread(target=self._publish_status)
+                t.daemon = True
+                t.start()
+            if self.probe_period > 0:
+                t = Thread(target=self._probe)
+                t.daemon = True
+                t.start()
+            if self.enable_interrupts and not self.host.startswith('replay:'):
+                self._start_interrupts()
+            self._calibrated = self._restore_calibration()
+            if self._calibrated:
+                print('Encoder reference is consistent with the calibration record, skipping homing.')
+            elif self.home_on_startup:
+                print('No consistent calibration record, finding the index..')
+                self._wait_index(self._find_index())
             self._switch_to_ext_ctrl(
                 close_pos=self._close_value,
                 open_pos=self._open_value
             )
         except Exception as e:
-            self.g.GClose()
+            if self.g is not None:
+                self.g.GClose()
             self.set_state(DevState.FAULT)
+            self.set_status(f'Error in init_device: {e}')
             print(f'Error in init_device: {e}')
         # PROTECTED REGION END #    //  SoftiGalilShutter.init_device
 
+    @tracing.traced
     def always_executed_hook(self):
         """Method always executed before any TANGO command is executed."""
         # PROTECTED REGION ID(SoftiGalilShutter.always_executed_hook) ENABLED START #
+        start = time.perf_counter()
         try:
-            self.current_position = int(self.g.GCommand('TP'))
-            if abs(self.current_position - self._open_value) < self._closing_tolerance:
-                if self._external_control:
-                    self.set_state(DevState.INSERT)
-                else:
-                    self.set_state(DevState.OPEN)
-            elif abs(self.current_position - self._close_value) < self._closing_tolerance:
-                if self._external_control:
-                    self.set_state(DevState.INSERT)
-                else:
-                    self.set_state(DevState.CLOSE)
-        except Exception as e:
-            print(f'There was an exception in always_executed_hook: {e}')
-            self.g.GClose()
-            time.sleep(1)
-            print('Reopenning of the connection to the controller..')
-            self.g.GOpen(self.host + ' --direct -s ALL')
-            self.set_state(DevState.FAULT)
+            self._update_state()
+        finally:
+            self._hook_time += time.perf_counter() - start
+            self._hook_calls += 1
         # PROTECTED REGION END #    //  SoftiGalilShutter.always_executed_hook
 
-    # PROTECTED REGION ID(SoftiGalilShutter.read_attr_hardware) ENABLED START #
-    # def read_attr_hardware(self):
-    #     print('Calling read_attr_hardware..')
-    #     """Method always executed before each reading of attributes."""
-    #     try:
-    #         self.current_position = int(self.g.GCommand('TP'))
-    #         print('read_attr_hardware call.., current posiontion is: ', self.current_position)
-    #         if abs(self.current_position - self._open_value) < self._closing_tolerance:
-    #             if self._external_control:
-    #                 self.set_state(DevState.INSERT)
-    #             else:
-    #                 self.set_state(DevState.OPEN)
-    #         elif abs(self.current_position - self._close_value) < self._closing_tolerance:
-    #             if self._external_control:
-    #                 self.set_state(DevState.INSERT)
-    #             else:
-    #                 self.set_state(DevState.CLOSE)
-    #     except Exception as e:
-    #         print('There was an error in read_attr_hardware:', e)
-    #         self.g.GClose()
-    #     # PROTECTED REGION END #    //  SoftiGalilShutter.read_attr_hardware
+    @tracing.traced
+    def read_attr_hardware(self, attr_list):
+        """Method always executed before each reading of attributes."""
+        # PROTECTED REGION ID(SoftiGalilShutter.read_attr_hardware) ENABLED START #
+        self._update_state()
+        if self._latching:
+            attributes = self.get_device_attr()
+            if any(attributes.get_attr_by_ind(i).get_name() in LATCH_ATTRIBUTES for i in attr_list):
+                try:
+                    self._drain_latches() # once for all the latch attributes read together
+                except Exception as e:
+                    print(f'Could not upload the latched crossings: {e}')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.read_attr_hardware
 
     def delete_device(self):
         """Hook to delete resources allocated in init_device.
@@ -272,78 +1604,497 @@ class SoftiGalilShutter(Device):
         destructor and by the device Init command.
         """
         # PROTECTED REGION ID(SoftiGalilShutter.delete_device) ENABLED START #
-        self.g.GClose()
+        if self._calibrated:
+            try:
+                self._calibration['position'] = int(self.g.GCommand('TP'))
+                self._save_calibration()
+            except gclib.GclibError as e:
+                print(f'Could not update the calibration record: {e}')
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+            self._metrics_server = None
+        self._shm_stop.set()
+        self._stop_interrupts()
+        if self._shm is not None:
+            shm, self._shm = self._shm, None
+            shm.close()
+        if self._queue is not None:
+            self._queue.stop()
+        if self.g is not None:
+            if self.g.recorder is not None:
+                self.g.recorder.close()
+                self.g.recorder = None
+            self.g.GClose()
         # PROTECTED REGION END #    //  SoftiGalilShutter.delete_device
     # ------------------
     # Attributes methods
     # ------------------
 
+    @tracing.traced
     def read_abs_position(self):
         # PROTECTED REGION ID(SoftiGalilShutter.abs_position_read) ENABLED START #
         """Return the abs_position attribute."""
         return self.current_position
         # PROTECTED REGION END #    //  SoftiGalilShutter.abs_position_read
 
+    @tracing.traced
     def write_abs_position(self, value):
         # PROTECTED REGION ID(SoftiGalilShutter.abs_position_write) ENABLED START #
         """Set the abs_position attribute."""
-        pass
+        if self._external_control or self._tuning or self._queue is None:
+            print('abs_position can not be written in external control, while tuning or without a queue.')
+            return
+        self._submit(value) # queued like MoveTo, last_request reports its id
         # PROTECTED REGION END #    //  SoftiGalilShutter.abs_position_write
 
+    @tracing.traced
     def read_offset(self):
         # PROTECTED REGION ID(SoftiGalilShutter.offset_read) ENABLED START #
         """Return the offset attribute."""
         return self._offset
         # PROTECTED REGION END #    //  SoftiGalilShutter.offset_read
 
+    @tracing.traced
     def write_offset(self, value):
         # PROTECTED REGION ID(SoftiGalilShutter.offset_write) ENABLED START #
         """Set the offset attribute."""
-        pass
+        # Shift the coordinates so that 0 stays `value` counts from the index
+        self._command(f'DPA=_TPA-{value - self._offset}')
+        self._offset = value
+        self._calibration['offset'] = value
+        self._calibration['position'] = int(self.g.GCommand('TP'))
+        self._save_calibration()
         # PROTECTED REGION END #    //  SoftiGalilShutter.offset_write
 
+    @tracing.traced
+    def read_calibrated(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.calibrated_read) ENABLED START #
+        """Return the calibrated attribute."""
+        return self._calibrated
+        # PROTECTED REGION END #    //  SoftiGalilShutter.calibrated_read
+
+    @tracing.traced
     def read_external_control(self):
         # PROTECTED REGION ID(SoftiGalilShutter.external_control_read) ENABLED START #
         """Return the external_control attribute."""
         return self._external_control
         # PROTECTED REGION END #    //  SoftiGalilShutter.external_control_read
 
+    @tracing.traced
     def read_open_value(self):
         # PROTECTED REGION ID(SoftiGalilShutter.open_value_read) ENABLED START #
         """Return the open_value attribute."""
         return self._open_value
         # PROTECTED REGION END #    //  SoftiGalilShutter.open_value_read
 
+    @tracing.traced
     def write_open_value(self, value):
         # PROTECTED REGION ID(SoftiGalilShutter.open_value_write) ENABLED START #
         """Set the open_value attribute."""
+        table = self._position_table(open_value=value)
+        self._command(f'opn={value};epos=0') # #EXT moves to the new target right away
         self._open_value = value
+        self._positions = table
         # PROTECTED REGION END #    //  SoftiGalilShutter.open_value_write
 
+    @tracing.traced
     def read_close_value(self):
         # PROTECTED REGION ID(SoftiGalilShutter.close_value_read) ENABLED START #
         """Return the close_value attribute."""
         return self._close_value
         # PROTECTED REGION END #    //  SoftiGalilShutter.close_value_read
 
+    @tracing.traced
     def write_close_value(self, value):
         # PROTECTED REGION ID(SoftiGalilShutter.close_value_write) ENABLED START #
         """Set the close_value attribute."""
+        table = self._position_table(close_value=value)
+        self._command(f'cls={value};epos=0')
         self._close_value = value
+        self._positions = table
         # PROTECTED REGION END #    //  SoftiGalilShutter.close_value_write
 
+    @tracing.traced
     def read_closing_tolerance(self):
         # PROTECTED REGION ID(SoftiGalilShutter.closing_tolerance_read) ENABLED START #
         """Return the closing_tolerance attribute."""
         return self._closing_tolerance
         # PROTECTED REGION END #    //  SoftiGalilShutter.closing_tolerance_read
 
+    @tracing.traced
     def write_closing_tolerance(self, value):
         # PROTECTED REGION ID(SoftiGalilShutter.closing_tolerance_write) ENABLED START #
         """Set the closing_tolerance attribute."""
+        self._positions = self._position_table(tolerance=value)
         self._closing_tolerance = value
         # PROTECTED REGION END #    //  SoftiGalilShutter.closing_tolerance_write
 
+    @tracing.traced
+    def read_acceleration(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.acceleration_read) ENABLED START #
+        """Return the acceleration attribute."""
+        return self._acceleration
+        # PROTECTED REGION END #    //  SoftiGalilShutter.acceleration_read
+
+    @tracing.traced
+    def write_acceleration(self, value):
+        # PROTECTED REGION ID(SoftiGalilShutter.acceleration_write) ENABLED START #
+        """Set the acceleration attribute."""
+        self._acceleration = min(value, self.max_acceleration)
+        self._command(f'acc={self._acceleration};ACA=acc')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.acceleration_write
+
+    @tracing.traced
+    def read_deceleration(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.deceleration_read) ENABLED START #
+        """Return the deceleration attribute."""
+        return self._deceleration
+        # PROTECTED REGION END #    //  SoftiGalilShutter.deceleration_read
+
+    @tracing.traced
+    def write_deceleration(self, value):
+        # PROTECTED REGION ID(SoftiGalilShutter.deceleration_write) ENABLED START #
+        """Set the deceleration attribute."""
+        self._deceleration = min(value, self.max_acceleration)
+        self._command(f'dec={self._deceleration};DCA=dec')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.deceleration_write
+
+    @tracing.traced
+    def read_speed(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.speed_read) ENABLED START #
+        """Return the speed attribute."""
+        return self._speed
+        # PROTECTED REGION END #    //  SoftiGalilShutter.speed_read
+
+    @tracing.traced
+    def write_speed(self, value):
+        # PROTECTED REGION ID(SoftiGalilShutter.speed_write) ENABLED START #
+        """Set the speed attribute."""
+        self._speed = min(value, self.max_speed)
+        self._command(f'spd={self._speed};SPA=spd')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.speed_write
+
+    @tracing.traced
+    def read_smoothing(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.smoothing_read) ENABLED START #
+        """Return the smoothing attribute."""
+        return self._smoothing
+        # PROTECTED REGION END #    //  SoftiGalilShutter.smoothing_read
+
+    @tracing.traced
+    def write_smoothing(self, value):
+        # PROTECTED REGION ID(SoftiGalilShutter.smoothing_write) ENABLED START #
+        """Set the smoothing attribute."""
+        self._smoothing = value
+        self._command(f'its={self._smoothing};ITA=its')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.smoothing_write
+
+    @tracing.traced
+    def read_autotune_progress(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.autotune_progress_read) ENABLED START #
+        """Return the autotune_progress attribute."""
+        return self._autotune_progress
+        # PROTECTED REGION END #    //  SoftiGalilShutter.autotune_progress_read
+
+    @tracing.traced
+    def read_autotune_status(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.autotune_status_read) ENABLED START #
+        """Return the autotune_status attribute."""
+        return self._autotune_status
+        # PROTECTED REGION END #    //  SoftiGalilShutter.autotune_status_read
+
+    @tracing.traced
+    def read_autotune_result(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.autotune_result_read) ENABLED START #
+        """Return the autotune_result attribute."""
+        return self._autotune_result
+        # PROTECTED REGION END #    //  SoftiGalilShutter.autotune_result_read
+
+    @tracing.traced
+    def read_latch_times(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.latch_times_read) ENABLED START #
+        """Return the latch_times attribute."""
+        return self._latches.times
+        # PROTECTED REGION END #    //  SoftiGalilShutter.latch_times_read
+
+    @tracing.traced
+    def read_latch_positions(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.latch_positions_read) ENABLED START #
+        """Return the latch_positions attribute."""
+        return self._latches.positions
+        # PROTECTED REGION END #    //  SoftiGalilShutter.latch_positions_read
+
+    @tracing.traced
+    def read_latch_sources(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.latch_sources_read) ENABLED START #
+        """Return the latch_sources attribute."""
+        return self._latches.sources
+        # PROTECTED REGION END #    //  SoftiGalilShutter.latch_sources_read
+
+    @tracing.traced
+    def read_trajectories(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.trajectories_read) ENABLED START #
+        """Return the trajectories attribute."""
+        return self._trajectories.image('position')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.trajectories_read
+
+    @tracing.traced
+    def read_trajectory_errors(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.trajectory_errors_read) ENABLED START #
+        """Return the trajectory_errors attribute."""
+        return self._trajectories.image('error')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.trajectory_errors_read
+
+    @tracing.traced
+    def read_trajectory_velocities(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.trajectory_velocities_read) ENABLED START #
+        """Return the trajectory_velocities attribute."""
+        return self._trajectories.image('velocity')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.trajectory_velocities_read
+
+    @tracing.traced
+    def read_last_trajectory(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.last_trajectory_read) ENABLED START #
+        """Return the last_trajectory attribute."""
+        return self._trajectories.last('position')
+        # PROTECTED REGION END #    //  SoftiGalilShutter.last_trajectory_read
+
+    @tracing.traced
+    def read_trajectory_time(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.trajectory_time_read) ENABLED START #
+        """Return the trajectory_time attribute."""
+        sample = float(self.g.GCommand('MG _TM')) / 1e6 * 2 ** self.record_rate
+        return numpy.arange(self.record_samples) * sample
+        # PROTECTED REGION END #    //  SoftiGalilShutter.trajectory_time_read
+
+    @tracing.traced
+    def read_transactions(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.transactions_read) ENABLED START #
+        """Return the transactions attribute."""
+        return self.g.stats.transactions
+        # PROTECTED REGION END #    //  SoftiGalilShutter.transactions_read
+
+    @tracing.traced
+    def read_transaction_errors(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.transaction_errors_read) ENABLED START #
+        """Return the transaction_errors attribute."""
+        return self.g.stats.errors
+        # PROTECTED REGION END #    //  SoftiGalilShutter.transaction_errors_read
+
+    @tracing.traced
+    def read_transaction_timeouts(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.transaction_timeouts_read) ENABLED START #
+        """Return the transaction_timeouts attribute."""
+        return self.g.stats.timeouts
+        # PROTECTED REGION END #    //  SoftiGalilShutter.transaction_timeouts_read
+
+    @tracing.traced
+    def read_bytes_sent(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.bytes_sent_read) ENABLED START #
+        """Return the bytes_sent attribute."""
+        return self.g.stats.bytes_sent
+        # PROTECTED REGION END #    //  SoftiGalilShutter.bytes_sent_read
+
+    @tracing.traced
+    def read_bytes_received(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.bytes_received_read) ENABLED START #
+        """Return the bytes_received attribute."""
+        return self.g.stats.bytes_received
+        # PROTECTED REGION END #    //  SoftiGalilShutter.bytes_received_read
+
+    @tracing.traced
+    def read_reconnects(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.reconnects_read) ENABLED START #
+        """Return the reconnects attribute."""
+        return self._reconnects
+        # PROTECTED REGION END #    //  SoftiGalilShutter.reconnects_read
+
+    @tracing.traced
+    def read_hook_time(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.hook_time_read) ENABLED START #
+        """Return the hook_time attribute."""
+        return self._hook_time
+        # PROTECTED REGION END #    //  SoftiGalilShutter.hook_time_read
+
+    @tracing.traced
+    def read_metrics(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.metrics_read) ENABLED START #
+        """Return the metrics attribute."""
+        return self._metrics_text()
+        # PROTECTED REGION END #    //  SoftiGalilShutter.metrics_read
+
+    @tracing.traced
+    def read_trace_enabled(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.trace_enabled_read) ENABLED START #
+        """Return the trace_enabled attribute."""
+        return self._tracer is not None
+        # PROTECTED REGION END #    //  SoftiGalilShutter.trace_enabled_read
+
+    @tracing.traced
+    def write_trace_enabled(self, value):
+        # PROTECTED REGION ID(SoftiGalilShutter.trace_enabled_write) ENABLED START #
+        """Set the trace_enabled attribute."""
+        if value and self._tracer is None:
+            self._tracer = tracing.TraceBuffer(self.trace_buffer_size)
+        elif not value:
+            self._tracer = None
+        self.g.tracer = self._tracer
+        # PROTECTED REGION END #    //  SoftiGalilShutter.trace_enabled_write
+
+    @tracing.traced
+    def read_open_eta(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.open_eta_read) ENABLED START #
+        """Return the open_eta attribute."""
+        return self._open_eta
+        # PROTECTED REGION END #    //  SoftiGalilShutter.open_eta_read
+
+    @tracing.traced
+    def read_settle_eta(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.settle_eta_read) ENABLED START #
+        """Return the settle_eta attribute."""
+        return self._settle_eta
+        # PROTECTED REGION END #    //  SoftiGalilShutter.settle_eta_read
+
+    @tracing.traced
+    def read_time_to_open(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.time_to_open_read) ENABLED START #
+        """Return the time_to_open attribute."""
+        if self._opened.is_set():
+            return 0.0
+        return max(0.0, self._open_eta - time.time()) # NaN stays NaN
+        # PROTECTED REGION END #    //  SoftiGalilShutter.time_to_open_read
+
+    @tracing.traced
+    def read_time_to_settle(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.time_to_settle_read) ENABLED START #
+        """Return the time_to_settle attribute."""
+        return max(0.0, self._settle_eta - time.time())
+        # PROTECTED REGION END #    //  SoftiGalilShutter.time_to_settle_read
+
+    @tracing.traced
+    def read_open_ready(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.open_ready_read) ENABLED START #
+        """Return the open_ready attribute."""
+        return self._opened.is_set()
+        # PROTECTED REGION END #    //  SoftiGalilShutter.open_ready_read
+
+    @tracing.traced
+    def read_position_name(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.position_name_read) ENABLED START #
+        """Return the position_name attribute."""
+        return self._position_name
+        # PROTECTED REGION END #    //  SoftiGalilShutter.position_name_read
+
+    @tracing.traced
+    def read_position_names(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.position_names_read) ENABLED START #
+        """Return the position_names attribute."""
+        return self._positions.names
+        # PROTECTED REGION END #    //  SoftiGalilShutter.position_names_read
+
+    @tracing.traced
+    def read_queue_depth(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.queue_depth_read) ENABLED START #
+        """Return the queue_depth attribute."""
+        return self._queue.depth if self._queue is not None else 0
+        # PROTECTED REGION END #    //  SoftiGalilShutter.queue_depth_read
+
+    @tracing.traced
+    def read_queue_drops(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.queue_drops_read) ENABLED START #
+        """Return the queue_drops attribute."""
+        return self._queue.drops if self._queue is not None else 0
+        # PROTECTED REGION END #    //  SoftiGalilShutter.queue_drops_read
+
+    @tracing.traced
+    def read_queue_coalesced(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.queue_coalesced_read) ENABLED START #
+        """Return the queue_coalesced attribute."""
+        return self._queue.coalesced if self._queue is not None else 0
+        # PROTECTED REGION END #    //  SoftiGalilShutter.queue_coalesced_read
+
+    @tracing.traced
+    def read_completed_request(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.completed_request_read) ENABLED START #
+        """Return the completed_request attribute."""
+        return self._completed_request
+        # PROTECTED REGION END #    //  SoftiGalilShutter.completed_request_read
+
+    @tracing.traced
+    def read_last_request(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.last_request_read) ENABLED START #
+        """Return the last_request attribute."""
+        return self._last_request
+        # PROTECTED REGION END #    //  SoftiGalilShutter.last_request_read
+
+    @tracing.traced
+    def read_snapshot_json(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.snapshot_json_read) ENABLED START #
+        """Return the snapshot_json attribute."""
+        return 'json', json.dumps(self._snapshot()).encode()
+        # PROTECTED REGION END #    //  SoftiGalilShutter.snapshot_json_read
+
+    @tracing.traced
+    def read_rtt(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.rtt_read) ENABLED START #
+        """Return the rtt attribute."""
+        return self._rtt
+        # PROTECTED REGION END #    //  SoftiGalilShutter.rtt_read
+
+    @tracing.traced
+    def read_rtt_p50(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.rtt_p50_read) ENABLED START #
+        """Return the rtt_p50 attribute."""
+        if self.g.timeouts is None:
+            return float('nan')
+        return self.g.timeouts.percentiles('status')[0]
+        # PROTECTED REGION END #    //  SoftiGalilShutter.rtt_p50_read
+
+    @tracing.traced
+    def read_rtt_p99(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.rtt_p99_read) ENABLED START #
+        """Return the rtt_p99 attribute."""
+        if self.g.timeouts is None:
+            return float('nan')
+        return self.g.timeouts.percentiles('status')[1]
+        # PROTECTED REGION END #    //  SoftiGalilShutter.rtt_p99_read
+
+    @tracing.traced
+    def read_command_timeouts(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.command_timeouts_read) ENABLED START #
+        """Return the command_timeouts attribute."""
+        if self.g.timeouts is None:
+            return json.dumps({'fixed': self.g._timeout})
+        return json.dumps(self.g.timeouts.snapshot())
+        # PROTECTED REGION END #    //  SoftiGalilShutter.command_timeouts_read
+
+    @tracing.traced
+    def read_interrupt_count(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.interrupt_count_read) ENABLED START #
+        """Return the interrupt_count attribute."""
+        return self._interrupt_count
+        # PROTECTED REGION END #    //  SoftiGalilShutter.interrupt_count_read
+
+    @tracing.traced
+    def read_last_interrupt(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.last_interrupt_read) ENABLED START #
+        """Return the last_interrupt attribute."""
+        return self._last_interrupt
+        # PROTECTED REGION END #    //  SoftiGalilShutter.last_interrupt_read
+
+    # ------------
+    # Pipe methods
+    # ------------
+
+    @tracing.traced
+    def read_snapshot(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.snapshot_read) ENABLED START #
+        """Return the snapshot pipe."""
+        # Pipe reads do not go through read_attr_hardware
+        self._update_state()
+        return 'snapshot', self._snapshot()
+        # PROTECTED REGION END #    //  SoftiGalilShutter.snapshot_read
+
     # --------
     # Commands
     # --------
@@ -351,6 +2102,7 @@ class SoftiGalilShutter(Device):
     @command(
     )
     @DebugIt()
+    @tracing.traced
     def TurnOn(self):
         # PROTECTED REGION ID(SoftiGalilShutter.TurnOn) ENABLED START #
         """
@@ -364,6 +2116,7 @@ class SoftiGalilShutter(Device):
     @command(
     )
     @DebugIt()
+    @tracing.traced
     def TurnOff(self):
         # PROTECTED REGION ID(SoftiGalilShutter.TurnOff) ENABLED START #
         """
@@ -372,8 +2125,8 @@ class SoftiGalilShutter(Device):
         :return:None
         """
         try:
-            print('ST A sent, ', self.g.GCommand('ST A'))
-            print('MO sent, ', self.g.GCommand('MO'))
+            print('ST A sent, ', self._command('ST A'))
+            print('MO sent, ', self._command('MO'))
             self.set_state(DevState.OFF)
         except gclib.GclibError as e:
             self.g.GClose()
@@ -384,6 +2137,7 @@ class SoftiGalilShutter(Device):
     @command(
     )
     @DebugIt()
+    @tracing.traced
     def StopMotor(self):
         # PROTECTED REGION ID(SoftiGalilShutter.StopMotor) ENABLED START #
         """
@@ -391,8 +2145,11 @@ class SoftiGalilShutter(Device):
 
         :return:None
         """
+        self._autotune_abort.set()
+        if self._queue is not None:
+            self._queue.cancel()
         try:
-            print('Stopping the motor: ', self.g.GCommand('ST A'))
+            print('Stopping the motor: ', self._command('ST A'))
             self.set_state(DevState.STANDBY)
         except gclib.GclibError as e:
             self.set_state(DevState.FAULT)
@@ -402,6 +2159,7 @@ class SoftiGalilShutter(Device):
     @command(
     )
     @DebugIt()
+    @tracing.traced
     def FindIndex(self):
         # PROTECTED REGION ID(SoftiGalilShutter.FindIndex) ENABLED START #
         """
@@ -410,12 +2168,9 @@ class SoftiGalilShutter(Device):
         :return:None
         """
         try:
-            self._stop_all()
-            self._external_control = False
-            program = '#A;ST;MO A;JG 5000;FI;SH A;BG A;EN' # Find index Galil program
-            self.g.GProgramDownload(program, '--max 3')
-            #print(' Uploaded program:\n%s' % self.g.GProgramUpload())
-            print('FindIndex(): ', self.g.GCommand('XQ'))
+            t = Thread(target=self._complete_index, args=(self._find_index(),))
+            t.daemon = True
+            t.start()
             self.set_state(DevState.UNKNOWN)
         except Exception as e:
             self.set_state(DevState.FAULT)
@@ -424,12 +2179,15 @@ class SoftiGalilShutter(Device):
 
     def is_FindIndex_allowed(self):
         # PROTECTED REGION ID(SoftiGalilShutter.is_FindIndex_allowed) ENABLED START #
+        if self._tuning:
+            return False
         return self.get_state() not in [DevState.MOVING]
         # PROTECTED REGION END #    //  SoftiGalilShutter.is_FindIndex_allowed
 
     @command(
     )
     @DebugIt()
+    @tracing.traced
     def ExternalControl(self):
         # PROTECTED REGION ID(SoftiGalilShutter.ExternalControl) ENABLED START #
         """
@@ -442,6 +2200,8 @@ class SoftiGalilShutter(Device):
             #                         args=(self._close_value, self._open_value))
             # self.t.setDaemon(True)
             # self.t.start()
+            if self._queue is not None:
+                self._queue.cancel()
             self._switch_to_ext_ctrl(self._close_value, self._open_value)
         except Exception as e:
             print(f"Error in the external control switch: {e}")
@@ -449,12 +2209,15 @@ class SoftiGalilShutter(Device):
 
     def is_ExternalControl_allowed(self):
         # PROTECTED REGION ID(SoftiGalilShutter.is_ExternalControl_allowed) ENABLED START #
-        return self.get_state() not in [DevState.OPEN]
+        if self._tuning:
+            return False
+        return self.get_state() not in [DevState.OPEN, DevState.MOVING]
         # PROTECTED REGION END #    //  SoftiGalilShutter.is_ExternalControl_allowed
 
     @command(
     )
     @DebugIt()
+    @tracing.traced
     def GalilSoftReset(self):
         # PROTECTED REGION ID(SoftiGalilShutter.GalilSoftReset) ENABLED START #
         """
@@ -463,7 +2226,15 @@ class SoftiGalilShutter(Device):
         :return:None
         """
         try:
-            print('Controller reset: ', self.g.GCommand('RS'))
+            print('Controller reset: ', self._command('RS'))
+            self._calibrated = False # RS clears the position and calref
+            if self._interrupts_on: # and disables the interrupts
+                self._command(interrupts.ei_command())
+            if self._latching:
+                self._setup_latch()
+            if self.record_moves:
+                self._setup_recording()
+            self._load_firmware()
             self.set_state(DevState.STANDBY)
         except Exception as e:
             self.g.GClose()
@@ -483,6 +2254,7 @@ class SoftiGalilShutter(Device):
         doc_out="Returns True if the command was successful.",
     )
     @DebugIt()
+    @tracing.traced
     def SingleCommandInput(self, argin):
         # PROTECTED REGION ID(SoftiGalilShutter.SingleCommandInput) ENABLED START #
         """
@@ -495,7 +2267,7 @@ class SoftiGalilShutter(Device):
         """
         try:
             print('Galil manual command input..', argin)
-            response = self.g.GCommand(argin)
+            response = self._command(argin)
             print("The response was: ", response)
 
             self.info_stream(response)
@@ -508,48 +2280,53 @@ class SoftiGalilShutter(Device):
         # PROTECTED REGION END #    //  SoftiGalilShutter.SingleCommandInput
 
     @command(
+        dtype_out='DevLong64',
+        doc_out="Request id, see RequestState.",
     )
     @DebugIt()
+    @tracing.traced
     def Open(self):
         # PROTECTED REGION ID(SoftiGalilShutter.Open) ENABLED START #
         """
-        Opens the shutter.
+        Queues opening the shutter.
 
-        :return:None
+        :return:'DevLong64'
+        Request id, see RequestState.
         """
-        self._open_shutter()
+        return self._submit('open')
         # PROTECTED REGION END #    //  SoftiGalilShutter.Open
 
     def is_Open_allowed(self):
         # PROTECTED REGION ID(SoftiGalilShutter.is_Open_allowed) ENABLED START #
-        if self._external_control:
-            return False
-        return self.get_state() not in [DevState.MOVING]
+        return self._queue is not None and not (self._external_control or self._tuning)
         # PROTECTED REGION END #    //  SoftiGalilShutter.is_Open_allowed
 
     @command(
+        dtype_out='DevLong64',
+        doc_out="Request id, see RequestState.",
     )
     @DebugIt()
+    @tracing.traced
     def Close(self):
         # PROTECTED REGION ID(SoftiGalilShutter.Close) ENABLED START #
         """
-        Closes the shutter.
+        Queues closing the shutter.
 
-        :return:None
+        :return:'DevLong64'
+        Request id, see RequestState.
         """
-        self._close_shutter()
+        return self._submit('close')
         # PROTECTED REGION END #    //  SoftiGalilShutter.Close
 
     def is_Close_allowed(self):
         # PROTECTED REGION ID(SoftiGalilShutter.is_Close_allowed) ENABLED START #
-        if self._external_control:
-            return False
-        return self.get_state() not in [DevState.MOVING]
+        return self._queue is not None and not (self._external_control or self._tuning)
         # PROTECTED REGION END #    //  SoftiGalilShutter.is_Close_allowed
 
     @command(
     )
     @DebugIt()
+    @tracing.traced
     def SoftCtrl(self):
         # PROTECTED REGION ID(SoftiGalilShutter.SoftCtrl) ENABLED START #
         """
@@ -557,16 +2334,177 @@ class SoftiGalilShutter(Device):
 
         :return:None
         """
+        self._queue.cancel()
         self._init_motor()
-        self._close_shutter()
-        self._external_control = False
+        self._external_control = False # before the close, which the scheduler refuses in external control
+        self._submit('close')
         # PROTECTED REGION END #    //  SoftiGalilShutter.SoftCtrl
 
     def is_SoftCtrl_allowed(self):
         # PROTECTED REGION ID(SoftiGalilShutter.is_SoftCtrl_allowed) ENABLED START #
+        if self._tuning or self._queue is None:
+            return False
         return self.get_state() not in [DevState.OPEN]
         # PROTECTED REGION END #    //  SoftiGalilShutter.is_SoftCtrl_allowed
 
+    @command(
+        dtype_in='DevBoolean',
+        doc_in="Apply the fastest clean profile when the sweep is done.",
+    )
+    @DebugIt()
+    @tracing.traced
+    def AutoTune(self, argin):
+        # PROTECTED REGION ID(SoftiGalilShutter.AutoTune) ENABLED START #
+        """
+        Sweeps acceleration, deceleration, speed and smoothing within max_acceleration
+        and max_speed in the background, timing repeated open/close moves on the controller.
+        StopMotor aborts the sweep.
+
+        :param argin: 'DevBoolean'
+        Apply the fastest clean profile when the sweep is done.
+
+        :return:None
+        """
+        profiles = list(autotune.profiles(
+            self.autotune_accelerations, self.autotune_decelerations, self.autotune_speeds,
+            self.autotune_smoothing, self.max_acceleration, self.max_speed,
+        ))
+        self._tuning = True
+        self._autotune_abort.clear()
+        self._autotune_progress = 0.0
+        self._autotune_result = ''
+        self._autotune_status = f'Sweeping {len(profiles)} profiles'
+        t = Thread(target=self._autotune, args=(profiles, argin))
+        t.daemon = True
+        t.start()
+        # PROTECTED REGION END #    //  SoftiGalilShutter.AutoTune
+
+    def is_AutoTune_allowed(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.is_AutoTune_allowed) ENABLED START #
+        if self._external_control or self._tuning:
+            return False
+        return self.get_state() not in [DevState.MOVING]
+        # PROTECTED REGION END #    //  SoftiGalilShutter.is_AutoTune_allowed
+
+    @command(
+    )
+    @DebugIt()
+    @tracing.traced
+    def ResetMetrics(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.ResetMetrics) ENABLED START #
+        """
+        Resets the transaction statistics and the device counters.
+
+        :return:None
+        """
+        self.g.stats.reset()
+        self._reconnects = 0
+        self._hook_time = 0.0
+        self._hook_calls = 0
+        # PROTECTED REGION END #    //  SoftiGalilShutter.ResetMetrics
+
+    @command(
+        dtype_out='DevString',
+        doc_out="Chrome trace event JSON, loadable in chrome://tracing or Perfetto.",
+    )
+    @DebugIt()
+    @tracing.traced
+    def DumpTrace(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.DumpTrace) ENABLED START #
+        """
+        Returns the content of the trace buffer and clears it.
+
+        :return:'DevString'
+        Chrome trace event JSON, loadable in chrome://tracing or Perfetto.
+        """
+        if self._tracer is None:
+            return tracing.TraceBuffer(1).to_chrome()
+        trace = self._tracer.to_chrome()
+        self._tracer.clear()
+        return trace
+        # PROTECTED REGION END #    //  SoftiGalilShutter.DumpTrace
+
+    @command(
+        dtype_in='DevDouble',
+        doc_in="Timeout in s.",
+        dtype_out='DevBoolean',
+        doc_out="True if the aperture is open, False on timeout.",
+    )
+    @DebugIt()
+    @tracing.traced
+    def WaitUntilOpen(self, argin):
+        # PROTECTED REGION ID(SoftiGalilShutter.WaitUntilOpen) ENABLED START #
+        """
+        Returns as soon as the controller confirms the aperture is within closing_tolerance
+        of open_value once every request submitted before has started, the confirmation is
+        only polled from the predicted open time on. The device stays available meanwhile.
+
+        :param argin: 'DevDouble'
+        Timeout in s.
+
+        :return:'DevBoolean'
+        True if the aperture is open, False on timeout.
+        """
+        target = self._last_submitted
+        with tango.AutoTangoAllowThreads(self): # the queue and other clients need the monitor
+            with self._open_condition:
+                return self._open_condition.wait_for(
+                    lambda: self._move_request >= target and self._opened.is_set(), argin)
+        # PROTECTED REGION END #    //  SoftiGalilShutter.WaitUntilOpen
+
+    @command(
+        dtype_in='DevString',
+        doc_in="Name of the position, see position_names.",
+        dtype_out='DevLong64',
+        doc_out="Request id, see RequestState.",
+    )
+    @DebugIt()
+    @tracing.traced
+    def MoveTo(self, argin):
+        # PROTECTED REGION ID(SoftiGalilShutter.MoveTo) ENABLED START #
+        """
+        Queues a move to a named position; MoveTo('open') and MoveTo('close') are Open and Close.
+
+        :param argin: 'DevString'
+        Name of the position, see position_names.
+
+        :return:'DevLong64'
+        Request id, see RequestState.
+        """
+        if argin not in self._positions.targets:
+            raise ValueError(f'Unknown position {argin}, known are {self._positions.names}')
+        return self._submit(argin)
+        # PROTECTED REGION END #    //  SoftiGalilShutter.MoveTo
+
+    def is_MoveTo_allowed(self):
+        # PROTECTED REGION ID(SoftiGalilShutter.is_MoveTo_allowed) ENABLED START #
+        return self._queue is not None and not (self._external_control or self._tuning)
+        # PROTECTED REGION END #    //  SoftiGalilShutter.is_MoveTo_allowed
+
+    @command(
+        dtype_in='DevLong64',
+        doc_in="Request id returned by Open, Close or MoveTo.",
+        dtype_out='DevString',
+        doc_out="queued, running, done, failed, dropped, coalesced, cancelled or unknown.",
+    )
+    @DebugIt()
+    @tracing.traced
+    def RequestState(self, argin):
+        # PROTECTED REGION ID(SoftiGalilShutter.RequestState) ENABLED START #
+        """
+        Returns the state of a queued request, the last 1000 are kept.
+
+        :param argin: 'DevLong64'
+        Request id returned by Open, Close or MoveTo.
+
+        :return:'DevString'
+        queued, running, done, failed, dropped, coalesced, cancelled or unknown.
+        """
+        if self._queue is None:
+            return 'unknown'
+        return self._queue.state(argin)
+        # PROTECTED REGION END #    //  SoftiGalilShutter.RequestState
+
 # ----------
 # Run server
 # ----------
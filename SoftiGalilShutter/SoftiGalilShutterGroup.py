@@ -0,0 +1,623 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Group of Galil based beam shutters moved together
+
+"""
+
+# PyTango imports
+import tango
+from tango import DebugIt
+from tango.server import run
+from tango.server import Device
+from tango.server import attribute, command
+from tango.server import device_property
+from tango import DevState
+# Additional import
+# PROTECTED REGION ID(SoftiGalilShutterGroup.additionnal_import) ENABLED START #
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier, Lock, Thread
+if __name__ == '__main__':
+    import emulator
+    import firmware
+    import gclib
+    import latch
+else:
+    import SoftiGalilShutter.emulator as emulator
+    import SoftiGalilShutter.firmware as firmware
+    import SoftiGalilShutter.gclib as gclib
+    import SoftiGalilShutter.latch as latch
+
+MEMBER_QUERY = 'MG _TPA,_BGA'
+POLL_PERIOD = 0.0005 # s between the motion complete polls of a member
+# Threads the member's shutter device keeps running, restarted after a download
+RESIDENT_THREADS = {firmware.SUPERVISOR_THREAD: '#INIT', latch.LATCH_THREAD: '#LATCH'}
+
+# PROTECTED REGION END #    //  SoftiGalilShutterGroup.additionnal_import
+
+__all__ = ["SoftiGalilShutterGroup", "main"]
+
+
+class SoftiGalilShutterGroup(Device):
+    """
+    Opens and closes shutters on several controllers together. The targets are
+    staged (PA) on every controller first, then BG is sent to all of them at once
+    from one thread per controller, or the controllers start on a shared trigger input.
+
+    **Properties:**
+
+    - Device Property
+        hosts
+            - Galil host names or ips of the members, emulator[:<latency ms>] for an emulated one.
+            - Type:'DevVarStringArray'
+        open_positions
+            - Open position of every member, a single value applies to all.
+            - Type:'DevVarLongArray'
+        close_positions
+            - Close position of every member, a single value applies to all.
+            - Type:'DevVarLongArray'
+        tolerance
+            - Distance from a position within which a member is at it, in counts.
+            - Type:'DevLong'
+        trigger_input
+            - Digital input wired to the shared trigger on every member, 0 fires BG from software.
+            - Type:'DevShort'
+        trigger_output
+            - Digital output of the first member driving the shared trigger.
+            - Type:'DevShort'
+    """
+    # PROTECTED REGION ID(SoftiGalilShutterGroup.class_variable) ENABLED START #
+
+    def _connection(self, host):
+        if host.split(':')[0] == 'emulator':
+            latency = host.partition(':')[2]
+            g = emulator.EmulatedController(float(latency or 0) / 1000.0)
+        else:
+            g = gclib.py()
+        g.GOpen(host + ' --direct -s MG') # the member's shutter device listens to the interrupts
+        return g
+
+    def _load_firmware(self, g):
+        """
+        Downloads the resident program, which holds #GTRIG, unless the controller already runs this version.
+        The threads the member's shutter device started are restarted afterwards, a running #INDEX or
+        #TUNE is not interrupted.
+        """
+        try:
+            loaded = int(float(g.GCommand('MG fwver'))) == firmware.VERSION
+        except gclib.GclibError:
+            loaded = False
+        if not loaded:
+            if int(float(g.GCommand(f'MG _XQ{firmware.ROUTINE_THREAD}'))) >= 0:
+                raise RuntimeError('the member is homing or tuning, the program can not be downloaded now')
+            running = [thread for thread in RESIDENT_THREADS if int(float(g.GCommand(f'MG _XQ{thread}'))) >= 0]
+            print('Downloading the controller program..')
+            g.GCommand('HX')
+            g.GProgramDownload(firmware.PROGRAM, '--max 3')
+            g.GCommand(f'fwver={firmware.VERSION}')
+            for thread in running: # the variables survive the download, so #INIT applies the same profile
+                g.GCommand(f'XQ{RESIDENT_THREADS[thread]},{thread}')
+
+    def _external_members(self):
+        """Returns the hosts of the members whose shutter device is in external control (mode=1)."""
+        external = []
+        for host, g in zip(self.hosts, self._members):
+            try:
+                if int(float(g.GCommand('MG mode'))) == 1:
+                    external.append(host)
+            except gclib.GclibError:
+                pass # not defined, the resident program never ran there
+        return external
+
+    def _busy_members(self):
+        """
+        Returns the hosts of the members that are moving or in external control, with the reason.
+        A move the member's shutter device started would be overridden by the group's targets.
+        """
+        external = self._external_members()
+        busy = [f'{host} (external control)' for host in external]
+        for host, g in zip(self.hosts, self._members):
+            if host not in external and int(float(g.GCommand('MG _BGA'))):
+                busy.append(f'{host} (moving)')
+        return busy
+
+    def _check_members(self, origin):
+        busy = self._busy_members()
+        if busy:
+            tango.Except.throw_exception('SoftiGalilShutterGroup_MembersBusy',
+                                         f'Members not available: {", ".join(busy)}', origin)
+
+    def _targets(self, name):
+        positions = self.open_positions if name == 'open' else self.close_positions
+        if len(positions) == 1:
+            return [positions[0]] * len(self._members)
+        return list(positions)
+
+    def _update_state(self):
+        if self._members is None:
+            return
+        if not self._group_lock.acquire(blocking=False): # firing, the connections belong to the move
+            return
+        try:
+            positions, states = [], []
+            opens, closes = self._targets('open'), self._targets('close')
+            for g, open_target, close_target in zip(self._members, opens, closes):
+                position, moving = (int(float(v)) for v in g.GCommand(MEMBER_QUERY).split())
+                positions.append(position)
+                if moving:
+                    states.append('MOVING')
+                elif abs(position - open_target) < self.tolerance:
+                    states.append('OPEN')
+                elif abs(position - close_target) < self.tolerance:
+                    states.append('CLOSE')
+                else:
+                    states.append('ON')
+            self._positions = positions
+            self._member_states = states
+            if self._running or 'MOVING' in states:
+                self.set_state(DevState.MOVING)
+            elif all(s == 'OPEN' for s in states):
+                self.set_state(DevState.OPEN)
+            elif all(s == 'CLOSE' for s in states):
+                self.set_state(DevState.CLOSE)
+            else:
+                self.set_state(DevState.ALARM) # members apart
+        except Exception as e:
+            print(f'There was an exception in _update_state: {e}')
+            self.set_state(DevState.FAULT)
+        finally:
+            self._group_lock.release()
+
+    def _stage(self, name):
+        """Sends the targets, the members then only wait for BG or the trigger."""
+        self._check_members('Stage')
+        for g, target in zip(self._members, self._targets(name)):
+            if self.trigger_input > 0:
+                g.GCommand(f'HX{firmware.GROUP_THREAD};PA{target};gin={self.trigger_input};glev=1;'
+                           f'XQ#GTRIG,{firmware.GROUP_THREAD}')
+            else:
+                g.GCommand(f'PA{target}')
+        self._staged = name
+
+    def _fire_member(self, g, barrier):
+        """Starts one member when all threads are at the barrier and waits for its move to complete."""
+        if barrier is not None:
+            barrier.wait()
+            start = time.perf_counter()
+            g.GCommand('BG A')
+            fired = (start + time.perf_counter()) / 2
+            query = 'MG _BGA'
+        else: # the trigger starts it, #GTRIG ends with the move and _XQn is -1 then
+            fired = float('nan')
+            query = f'MG _XQ{firmware.GROUP_THREAD}+1'
+        while int(float(g.GCommand(query))) > 0:
+            time.sleep(POLL_PERIOD)
+        return fired, time.perf_counter()
+
+    def _run_group(self):
+        """Fires the staged move and publishes the skew once every member arrived."""
+        try:
+            with self._group_lock:
+                fire_offsets, arrival_offsets, skew, group_time = self._fire_members()
+        except Exception as e:
+            print(f'Error in the group move: {e}')
+            with tango.AutoTangoMonitor(self):
+                self._running = False
+                self.set_state(DevState.FAULT)
+                self.push_change_event('State', DevState.FAULT)
+            return
+        with tango.AutoTangoMonitor(self):
+            self._running = False
+            self._fire_offsets = fire_offsets
+            self._arrival_offsets = arrival_offsets
+            self._skew = skew
+            self._arrival_skew = max(arrival_offsets)
+            self._group_time = group_time
+            self._completed += 1
+            self._update_state()
+            self.push_change_event('fire_offsets', self._fire_offsets)
+            self.push_change_event('arrival_offsets', self._arrival_offsets)
+            self.push_change_event('skew', self._skew)
+            self.push_change_event('arrival_skew', self._arrival_skew)
+            self.push_change_event('group_time', self._group_time)
+            self.push_change_event('completed', self._completed)
+            self.push_change_event('State', self.get_state())
+
+    def _fire_members(self):
+        """Starts the members and returns the fire and arrival offsets, the skew and the group time."""
+        if self.trigger_input > 0:
+            futures = [self._pool.submit(self._fire_member, g, None) for g in self._members]
+            start = time.perf_counter()
+            self._members[0].GCommand(f'SB {self.trigger_output}')
+            start = (start + time.perf_counter()) / 2
+        else:
+            barrier = Barrier(len(self._members))
+            futures = [self._pool.submit(self._fire_member, g, barrier) for g in self._members]
+        results = [f.result() for f in futures]
+        if self.trigger_input > 0:
+            self._members[0].GCommand(f'CB {self.trigger_output}')
+            fire_offsets = [float('nan')] * len(results)
+            skew = float('nan')
+        else:
+            start = min(fired for fired, _ in results)
+            fire_offsets = [(fired - start) * 1000 for fired, _ in results]
+            skew = max(fire_offsets)
+        first = min(done for _, done in results)
+        arrival_offsets = [(done - first) * 1000 for _, done in results]
+        group_time = (max(done for _, done in results) - start) * 1000
+        return fire_offsets, arrival_offsets, skew, group_time
+
+    def _fire(self):
+        self._staged = None
+        self._running = True
+        self.set_state(DevState.MOVING)
+        self.push_change_event('State', DevState.MOVING)
+        t = Thread(target=self._run_group)
+        t.daemon = True
+        t.start()
+
+    # PROTECTED REGION END #    //  SoftiGalilShutterGroup.class_variable
+
+    # -----------------
+    # Device Properties
+    # -----------------
+
+    hosts = device_property(
+        dtype='DevVarStringArray',
+        mandatory=True
+    )
+
+    open_positions = device_property(
+        dtype='DevVarLongArray',
+        default_value=[7000]
+    )
+
+    close_positions = device_property(
+        dtype='DevVarLongArray',
+        default_value=[7500]
+    )
+
+    tolerance = device_property(
+        dtype='DevLong',
+        default_value=40
+    )
+
+    trigger_input = device_property(
+        dtype='DevShort',
+        default_value=0
+    )
+
+    trigger_output = device_property(
+        dtype='DevShort',
+        default_value=1
+    )
+
+    # ----------
+    # Attributes
+    # ----------
+
+    positions = attribute(
+        dtype=('DevLong',),
+        max_dim_x=64,
+        label="Positions",
+        doc="Position of every member.",
+    )
+
+    member_states = attribute(
+        dtype=('DevString',),
+        max_dim_x=64,
+        label="Member states",
+        doc="OPEN, CLOSE, MOVING or ON for every member.",
+    )
+
+    staged = attribute(
+        dtype='DevString',
+        label="Staged",
+        doc="Position the members are staged for, empty when nothing is staged.",
+    )
+
+    fire_offsets = attribute(
+        dtype=('DevDouble',),
+        max_dim_x=64,
+        unit="ms",
+        label="Fire offsets",
+        doc="When BG reached every member in the last group move, relative to the first. NaN with the hardware trigger.",
+    )
+
+    arrival_offsets = attribute(
+        dtype=('DevDouble',),
+        max_dim_x=64,
+        unit="ms",
+        label="Arrival offsets",
+        doc="When every member completed its move, relative to the first.",
+    )
+
+    skew = attribute(
+        dtype='DevDouble',
+        unit="ms",
+        label="Skew",
+        doc="Spread of the fire offsets of the last group move.",
+    )
+
+    arrival_skew = attribute(
+        dtype='DevDouble',
+        unit="ms",
+        label="Arrival skew",
+        doc="Spread of the arrival offsets of the last group move.",
+    )
+
+    group_time = attribute(
+        dtype='DevDouble',
+        unit="ms",
+        label="Group time",
+        doc="Time from firing until the last member arrived.",
+    )
+
+    completed = attribute(
+        dtype='DevLong64',
+        label="Completed",
+        doc="Group moves completed, an event is pushed after each one.",
+    )
+
+    # ---------------
+    # General methods
+    # ---------------
+
+    def init_device(self):
+        """Initialises the attributes and properties of the SoftiGalilShutterGroup."""
+        Device.init_device(self)
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.init_device) ENABLED START #
+        self._members = None
+        self._pool = None
+        self._positions = []
+        self._member_states = []
+        self._staged = None
+        self._running = False
+        self._group_lock = Lock() # held while firing, _update_state then leaves the members alone
+        self._fire_offsets = []
+        self._arrival_offsets = []
+        self._skew = float('nan')
+        self._arrival_skew = float('nan')
+        self._group_time = float('nan')
+        self._completed = 0
+        for name in ('State', 'fire_offsets', 'arrival_offsets', 'skew', 'arrival_skew', 'group_time', 'completed'):
+            self.set_change_event(name, True, False)
+        try:
+            for positions in (self.open_positions, self.close_positions):
+                if len(positions) not in (1, len(self.hosts)):
+                    raise ValueError(f'{len(positions)} positions for {len(self.hosts)} hosts')
+            self._members = [self._connection(host) for host in self.hosts]
+            external = self._external_members()
+            if external: # input 1 drives these, the group would fight it
+                raise RuntimeError(f'members in external control: {", ".join(external)}')
+            for g in self._members:
+                if self.trigger_input > 0:
+                    self._load_firmware(g)
+                g.GCommand('SH A')
+            if self.trigger_input > 0:
+                self._members[0].GCommand(f'CB {self.trigger_output}')
+            # One thread per member, all started now so that firing does not spawn any
+            self._pool = ThreadPoolExecutor(len(self._members))
+            barrier = Barrier(len(self._members))
+            for f in [self._pool.submit(barrier.wait) for _ in self._members]:
+                f.result()
+            self.set_state(DevState.STANDBY)
+            self._update_state()
+        except Exception as e:
+            self.set_state(DevState.FAULT)
+            print(f'Error in init_device: {e}')
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.init_device
+
+    def always_executed_hook(self):
+        """Method always executed before any TANGO command is executed."""
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.always_executed_hook) ENABLED START #
+        self._update_state()
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.always_executed_hook
+
+    def read_attr_hardware(self, attr_list):
+        """Method always executed before each reading of attributes."""
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.read_attr_hardware) ENABLED START #
+        pass # always_executed_hook already read the members
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.read_attr_hardware
+
+    def delete_device(self):
+        """Hook to delete resources allocated in init_device.
+
+        This method allows for any memory or other resources allocated in the
+        init_device method to be released.  This method is called by the device
+        destructor and by the device Init command.
+        """
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.delete_device) ENABLED START #
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        for g in self._members or []:
+            g.GClose()
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.delete_device
+
+    # ------------------
+    # Attributes methods
+    # ------------------
+
+    def read_positions(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.positions_read) ENABLED START #
+        """Return the positions attribute."""
+        return self._positions
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.positions_read
+
+    def read_member_states(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.member_states_read) ENABLED START #
+        """Return the member_states attribute."""
+        return self._member_states
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.member_states_read
+
+    def read_staged(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.staged_read) ENABLED START #
+        """Return the staged attribute."""
+        return self._staged or ''
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.staged_read
+
+    def read_fire_offsets(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.fire_offsets_read) ENABLED START #
+        """Return the fire_offsets attribute."""
+        return self._fire_offsets
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.fire_offsets_read
+
+    def read_arrival_offsets(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.arrival_offsets_read) ENABLED START #
+        """Return the arrival_offsets attribute."""
+        return self._arrival_offsets
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.arrival_offsets_read
+
+    def read_skew(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.skew_read) ENABLED START #
+        """Return the skew attribute."""
+        return self._skew
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.skew_read
+
+    def read_arrival_skew(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.arrival_skew_read) ENABLED START #
+        """Return the arrival_skew attribute."""
+        return self._arrival_skew
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.arrival_skew_read
+
+    def read_group_time(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.group_time_read) ENABLED START #
+        """Return the group_time attribute."""
+        return self._group_time
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.group_time_read
+
+    def read_completed(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.completed_read) ENABLED START #
+        """Return the completed attribute."""
+        return self._completed
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.completed_read
+
+    # --------
+    # Commands
+    # --------
+
+    @command(
+        dtype_in='DevString',
+        doc_in="open or close",
+    )
+    @DebugIt()
+    def Stage(self, argin):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.Stage) ENABLED START #
+        """
+        Sends the targets of a position to every member without starting the moves.
+
+        :param argin: 'DevString'
+        open or close
+
+        :return:None
+        """
+        if argin not in ('open', 'close'):
+            tango.Except.throw_exception('SoftiGalilShutterGroup_UnknownPosition',
+                                         f'Unknown position {argin!r}, expected open or close', 'Stage')
+        self._stage(argin)
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.Stage
+
+    def is_Stage_allowed(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.is_Stage_allowed) ENABLED START #
+        return self.get_state() not in [DevState.MOVING, DevState.FAULT]
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.is_Stage_allowed
+
+    @command(
+    )
+    @DebugIt()
+    def Fire(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.Fire) ENABLED START #
+        """
+        Starts the staged moves on all members together.
+
+        :return:None
+        """
+        self._check_members('Fire') # a member's shutter device may have moved the axis since the staging
+        self._fire()
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.Fire
+
+    def is_Fire_allowed(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.is_Fire_allowed) ENABLED START #
+        return self._staged is not None and self.get_state() not in [DevState.MOVING, DevState.FAULT]
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.is_Fire_allowed
+
+    @command(
+    )
+    @DebugIt()
+    def Open(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.Open) ENABLED START #
+        """
+        Opens all shutters together.
+
+        :return:None
+        """
+        self._stage('open')
+        self._fire()
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.Open
+
+    def is_Open_allowed(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.is_Open_allowed) ENABLED START #
+        return self.get_state() not in [DevState.MOVING, DevState.FAULT]
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.is_Open_allowed
+
+    @command(
+    )
+    @DebugIt()
+    def Close(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.Close) ENABLED START #
+        """
+        Closes all shutters together.
+
+        :return:None
+        """
+        self._stage('close')
+        self._fire()
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.Close
+
+    def is_Close_allowed(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.is_Close_allowed) ENABLED START #
+        return self.get_state() not in [DevState.MOVING, DevState.FAULT]
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.is_Close_allowed
+
+    @command(
+    )
+    @DebugIt()
+    def Stop(self):
+        # PROTECTED REGION ID(SoftiGalilShutterGroup.Stop) ENABLED START #
+        """
+        Stops every member and drops the staged targets.
+
+        :return:None
+        """
+        self._staged = None
+        for g in self._members or []:
+            try:
+                if self.trigger_input > 0:
+                    g.GCommand(f'HX{firmware.GROUP_THREAD}')
+                g.GCommand('ST A')
+            except gclib.GclibError as e:
+                print('Unexpected GclibError:', e)
+        if self.trigger_input > 0 and self._members:
+            self._members[0].GCommand(f'CB {self.trigger_output}')
+        # PROTECTED REGION END #    //  SoftiGalilShutterGroup.Stop
+
+# ----------
+# Run server
+# ----------
+
+
+def main(args=None, **kwargs):
+    """Main function of the SoftiGalilShutterGroup module."""
+    # PROTECTED REGION ID(SoftiGalilShutterGroup.main) ENABLED START #
+    return run((SoftiGalilShutterGroup,), args=args, **kwargs)
+    # PROTECTED REGION END #    //  SoftiGalilShutterGroup.main
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Motion profile sweep for the fastest clean open/close move
+
+"""
+
+import itertools
+from collections import namedtuple
+
+Profile = namedtuple('Profile', 'acceleration deceleration speed smoothing')
+
+# Runs one move to tgt with the profile in acc/dec/spd/its and measures it on the
+# controller: ttr is the profile time (BG to AM), tst the time until the position
+# stayed within tol for win samples, ov the largest excursion past the target.
+# Times are in samples of TIME, tmax bounds the settling wait.
+# Galil evaluates expressions left to right, hence the parentheses.
+TUNE_PROGRAM = (
+    '#TUNE;ACA=acc;DCA=dec;SPA=spd;ITA=its\n'
+    't0=TIME;PAA=tgt;BGA;AMA;t1=TIME;tset=t1;ov=0\n'
+    '#TS;er=(_TPA-tgt)*dir\n'
+    'IF(er>ov);ov=er;ENDIF\n'
+    'IF(@ABS[er]>=tol);tset=TIME;ENDIF\n'
+    'JP#TS,(TIME<(tset+win))&(TIME<(t1+tmax))\n'
+    'ttr=t1-t0;tst=tset-t0;done=1;EN'
+)
+
+
+def profiles(accelerations, decelerations, speeds, smoothing, max_acceleration, max_speed):
+    """Yields the sweep grid, leaving out settings beyond the safe bounds."""
+    for acc, dec, spd, its in itertools.product(accelerations, decelerations, speeds, smoothing):
+        if acc > max_acceleration or dec > max_acceleration or spd > max_speed:
+            continue
+        if not 0 < its <= 1:
+            continue
+        yield Profile(int(acc), int(dec), int(spd), float(its))
+
+
+def fastest(results, tolerance):
+    """
+    Returns the result with the shortest mean settle time among those whose moves
+    all settled and never overshot by more than tolerance, or None.
+    """
+    clean = [r for r in results if r['settled'] and r['overshoot'] <= tolerance]
+    if not clean:
+        return None
+    return min(clean, key=lambda r: r['settle_time'])
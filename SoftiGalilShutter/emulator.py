@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Emulated controller for running the device without hardware
+
+Set the host property of the device to emulator, or emulator:<latency> to
+answer every transaction after <latency> ms. The emulator understands the
+commands the device sends (PA, BG, ST, AB, MO, SH, TP, DP, AC/DC/SP/IT,
+variable assignments, DM and the MG operands of the status query) and moves
+the axis along a trapezoidal profile. Downloaded programs are executed
+statement by statement from the label up to EN or the first jump, so loops
+such as the external control, #TUNE and #LATCH routines do not run; JS runs
+the subroutine up to its EN and goes on. IF with a comparison or comparisons
+joined by & like (a=1)&(b<>2), ELSE and ENDIF are followed, other conditions
+end the execution like a jump. A thread that stopped at a jump counts as
+running for _XQn until HX or RS halts it.
+
+EI is honoured for motion complete of axis A and the digital inputs: the
+status bytes are sent to interrupt_address, where an interrupts.UdpListener
+receives them. set_input() changes an input like the wiring would.
+"""
+
+import re
+import threading
+import time
+
+if not __package__: # imported by the device server run as a script
+    import gclib
+    import interrupts
+    import motion
+else:
+    import SoftiGalilShutter.gclib as gclib
+    import SoftiGalilShutter.interrupts as interrupts
+    import SoftiGalilShutter.motion as motion
+
+_ASSIGNMENT = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*(?:\[\d+\])?)\s*=\s*(.+)$')
+_ARRAY = re.compile(r'^([A-Za-z][A-Za-z0-9]*)\[(\d+)\]$')
+_TERM = re.compile(r'([+-]?)\s*([^+-]+)')
+_MNEMONIC = re.compile(r'^[A-Z]{2}')
+_CONDITION = re.compile(r'^IF\s*\((.+)\)$')
+_COMPARISON = re.compile(r'^([^()]+?)(<>|=|<|>)([^()]+)$')
+_COMPARE = {'=': lambda a, b: a == b, '<>': lambda a, b: a != b, '<': lambda a, b: a < b, '>': lambda a, b: a > b}
+_PROFILE = {'ACA': 'acceleration', 'DCA': 'deceleration', 'SPA': 'speed', 'ITA': 'smoothing'}
+
+
+class _Move:
+    """One profiled move from start to target, started at begin (time.monotonic())."""
+
+    def __init__(self, start, target, acceleration, deceleration, speed, begin):
+        self.start = start
+        self.target = target
+        self.direction = 1 if target >= start else -1
+        self.acceleration = acceleration
+        self.deceleration = deceleration
+        self.t_acc, self.t_flat, self.t_dec = motion.trapezoid(target - start, acceleration, deceleration, speed)
+        self.speed = acceleration * self.t_acc
+        self.begin = begin
+        self.end = begin + self.t_acc + self.t_flat + self.t_dec
+
+    def position(self, now):
+        t = now - self.begin
+        if t >= self.end - self.begin:
+            return self.target
+        if t < self.t_acc:
+            travelled = self.acceleration * t ** 2 / 2
+        elif t < self.t_acc + self.t_flat:
+            travelled = self.speed * (self.t_acc / 2 + (t - self.t_acc))
+        else:
+            left = self.end - self.begin - t
+            travelled = abs(self.target - self.start) - self.deceleration * left ** 2 / 2
+        return int(round(self.start + self.direction * travelled))
+
+    def velocity(self, now):
+        t = now - self.begin
+        if t >= self.end - self.begin:
+            return 0
+        if t < self.t_acc:
+            return int(self.direction * self.acceleration * t)
+        if t < self.t_acc + self.t_flat:
+            return int(self.direction * self.speed)
+        return int(self.direction * self.deceleration * (self.end - self.begin - t))
+
+
+class EmulatedController(gclib.py):
+    """
+    Galil connection answered by an in-process model of a single axis controller.
+
+    Transactions are serialized like on a real connection and each one takes
+    latency seconds.
+    """
+
+    def __init__(self, latency=0.0, position=7500):
+        super().__init__()
+        self.latency = latency
+        self._epoch = time.monotonic()
+        self._position = position # in motor counts, without the DP offset
+        self._target = position
+        self._offset = 0 # DP shifts the reported position
+        self._move = None
+        self._motor_off = True
+        self._stop_code = 0
+        self._finding = False # the next move ends on the index (FI)
+        self.profile = {'acceleration': 256000, 'deceleration': 256000, 'speed': 25000, 'smoothing': 1.0}
+        self.inputs = {1: 1}
+        self.variables = {}
+        self.arrays = {}
+        self.program = ''
+        self.threads = set() # threads whose routine loops or waits, i.e. still runs after XQ
+        self.interrupt_address = None # (host, port) the EI status bytes are sent to
+        self._interrupt_axes = 0 # EI m
+        self._interrupt_inputs = 0 # EI n, an input is disarmed once it fired
+        self._complete_timer = None
+
+    # Axis model
+
+    def _update(self, now):
+        move = self._move
+        if move is not None and now >= move.end:
+            self._position = move.target
+            self._move = None
+            self._stop_code = 10 if self._finding else 1
+            self._finding = False
+
+    def _axis_position(self, now):
+        self._update(now)
+        if self._move is not None:
+            return self._move.position(now)
+        return self._position
+
+    def _stop(self, now, stop_code):
+        self._position = self._axis_position(now)
+        moving = self._move is not None
+        self._move = None
+        self._stop_code = stop_code
+        self._finding = False
+        timer = self._complete_timer
+        if moving and timer is not None: # the motion completes now
+            timer.cancel()
+            self._interrupt(interrupts.MOTION_COMPLETE)
+
+    def _begin(self, now):
+        if self._motor_off:
+            raise gclib.GclibError('motor off')
+        self._update(now)
+        if self._move is not None:
+            raise gclib.GclibError('axis already in motion')
+        self._move = _Move(self._position, self._target, self.profile['acceleration'],
+                           self.profile['deceleration'], self.profile['speed'], now)
+        self._stop_code = 0
+        if self._interrupt_axes & 1:
+            self._complete_timer = threading.Timer(self._move.end - now, self._interrupt,
+                                                   (interrupts.MOTION_COMPLETE,))
+            self._complete_timer.daemon = True
+            self._complete_timer.start()
+
+    # Interrupts
+
+    def _interrupt(self, status):
+        if status == interrupts.MOTION_COMPLETE:
+            self._complete_timer = None
+        if self.interrupt_address is not None:
+            interrupts.send(self.interrupt_address, status)
+
+    def set_input(self, number, value):
+        """Sets a digital input and interrupts if EI enabled it."""
+        changed = self.inputs.get(number, 0) != value
+        self.inputs[number] = value
+        bit = 1 << (number - 1)
+        if changed and self._interrupt_inputs & bit:
+            self._interrupt_inputs &= ~bit
+            self._interrupt(interrupts.INPUT + number)
+
+    def _operand(self, operand, now):
+        operand = operand.strip()
+        try:
+            return float(operand)
+        except ValueError:
+            pass
+        self._update(now)
+        moving = self._move is not None
+        if operand in ('_TPA', '_RPA'):
+            return self._axis_position(now) - self._offset
+        if operand == '_BGA':
+            return int(moving)
+        if operand == '_MOA':
+            return int(self._motor_off)
+        if operand == '_TSA':
+            # in motion, motor off, forward and reverse limits inactive
+            return 128 * moving + 32 * self._motor_off + 8 + 4
+        if operand == '_SCA':
+            return self._stop_code
+        if operand == '_TVA':
+            return self._move.velocity(now) if moving else 0
+        if operand in ('_TEA', '_RC', '_RD', '_ALA'):
+            return 0
+        if operand == '_TM':
+            return 1000
+        match = re.match(r'^_XQ(\d)$', operand)
+        if match: # program line of the thread, -1 when it does not run
+            return 0 if int(match.group(1)) in self.threads else -1
+        if operand == 'TIME':
+            return int((now - self._epoch) * 1000)
+        match = re.match(r'^@IN\[(\d+)\]$', operand)
+        if match:
+            return self.inputs.get(int(match.group(1)), 0)
+        match = _ARRAY.match(operand)
+        if match:
+            values = self.arrays.get(match.group(1), [])
+            index = int(match.group(2))
+            return values[index] if index < len(values) else 0
+        if operand in self.variables:
+            return self.variables[operand]
+        raise gclib.GclibError(f'unknown operand {operand}')
+
+    def _evaluate(self, expression, now):
+        """Evaluates a sum of operands, like _TPA-100."""
+        return sum((-1 if sign == '-' else 1) * self._operand(term, now)
+                   for sign, term in _TERM.findall(expression))
+
+    def _assign(self, name, value, now):
+        if name in _PROFILE:
+            self.profile[_PROFILE[name]] = value
+        elif name == 'PAA':
+            self._target = int(value) + self._offset
+        elif name == 'DPA':
+            self._offset = self._axis_position(now) - int(value)
+        else:
+            match = _ARRAY.match(name)
+            if match:
+                values = self.arrays.setdefault(match.group(1), [])
+                index = int(match.group(2))
+                values.extend([0.0] * (index + 1 - len(values)))
+                values[index] = value
+            else:
+                self.variables[name] = value
+
+    def _statement(self, statement, now):
+        """Executes one statement and returns its response text, if any."""
+        statement = statement.strip()
+        if not statement or statement.startswith('#') or statement.startswith("'"):
+            return None
+        if statement.startswith('MG '):
+            values = [self._operand(operand, now) for operand in statement[3:].split(',')]
+            return ' '.join(f'{value:.4f}' for value in values)
+        assignment = _ASSIGNMENT.match(statement)
+        if assignment:
+            self._assign(assignment.group(1), self._evaluate(assignment.group(2), now), now)
+            return None
+        if not _MNEMONIC.match(statement):
+            raise gclib.GclibError(f'unknown statement {statement}')
+        mnemonic, argument = statement[:2], statement[2:].strip()
+        if mnemonic == 'TP':
+            return f'{self._axis_position(now) - self._offset}'
+        if mnemonic == 'PA':
+            self._target = int(self._evaluate(argument, now)) + self._offset
+        elif mnemonic == 'BG':
+            self._begin(now)
+        elif mnemonic in ('ST', 'AB'):
+            self._stop(now, 4)
+        elif mnemonic == 'MO':
+            self._stop(now, 4)
+            self._motor_off = True
+        elif mnemonic == 'SH':
+            self._motor_off = False
+        elif mnemonic == 'FI': # the index is found right where the axis is
+            self._target = self._axis_position(now)
+            self._finding = True
+        elif mnemonic == 'AM':
+            if self._move is not None:
+                time.sleep(max(0.0, self._move.end - now))
+                self._update(self._move.end)
+        elif mnemonic == 'DM':
+            for declaration in argument.split(','):
+                match = _ARRAY.match(declaration.strip())
+                if match:
+                    self.arrays[match.group(1)] = [0.0] * int(match.group(2))
+        elif mnemonic == 'DA':
+            for name in argument.split(','):
+                self.arrays.pop(name.strip().rstrip('[]'), None)
+        elif mnemonic == 'EI':
+            fields = [int(self._evaluate(f, now)) if f.strip() else 0 for f in argument.split(',')]
+            fields += [0] * (2 - len(fields))
+            self._interrupt_axes, self._interrupt_inputs = fields[:2]
+        elif mnemonic == 'XQ':
+            label, _, thread = argument.partition(',')
+            if self._execute(label, now):
+                self.threads.discard(int(thread or 0))
+            else:
+                self.threads.add(int(thread or 0))
+        elif mnemonic == 'HX':
+            if argument:
+                self.threads.discard(int(argument))
+            else:
+                self.threads.clear()
+        elif mnemonic == 'RS':
+            self._stop(now, 4)
+            self.threads.clear()
+            self.variables.clear()
+            self.arrays.clear()
+            self._interrupt_axes = self._interrupt_inputs = 0 # RS disables the interrupts
+        return None # everything else (AM, RC, RA, RD, AL, ...) is accepted and ignored
+
+    def _condition(self, statement, now):
+        """Returns whether the condition of an IF statement holds, None if it is not supported."""
+        match = _CONDITION.match(statement)
+        if match is None:
+            return None
+        condition = match.group(1)
+        if _COMPARISON.match(condition):
+            comparisons = [condition]
+        elif condition.startswith('(') and condition.endswith(')'):
+            comparisons = condition[1:-1].split(')&(')
+        else:
+            return None
+        for comparison in comparisons:
+            match = _COMPARISON.match(comparison)
+            if match is None:
+                return None
+            lhs, operator, rhs = match.groups()
+            if not _COMPARE[operator](self._evaluate(lhs, now), self._evaluate(rhs, now)):
+                return False
+        return True
+
+    def _execute(self, label, now):
+        """
+        Runs the downloaded program from label (the first line if empty) up to EN or a jump.
+        Returns True when it reached EN, the thread would keep running after a jump.
+        """
+        statements = [s.strip() for line in self.program.splitlines() for s in line.split(';')]
+        start = 0
+        if label:
+            if label not in statements:
+                raise gclib.GclibError(f'no label {label}')
+            start = statements.index(label)
+        skip = 0 # depth of the IF blocks being skipped
+        for statement in statements[start:]:
+            if skip:
+                if statement.startswith('IF'):
+                    skip += 1
+                elif statement == 'ENDIF':
+                    skip -= 1
+                elif statement == 'ELSE' and skip == 1:
+                    skip = 0
+                continue
+            if statement == 'ELSE': # end of the branch taken
+                skip = 1
+            elif statement == 'ENDIF':
+                continue
+            elif statement.startswith('IF'):
+                holds = self._condition(statement, now)
+                if holds is None:
+                    break
+                if not holds:
+                    skip = 1
+            elif statement.startswith('EN'):
+                return True
+            elif statement.startswith('JS'):
+                if not self._execute(statement[2:].strip(), now):
+                    break # the subroutine jumped
+            elif statement.startswith('JP'):
+                break
+            elif not statement.startswith('AM'): # the move is complete when the program would resume
+                self._statement(statement, now)
+        return False
+
+    # Transport
+
+    def _respond(self, function, args, text):
+        now = time.monotonic()
+        if function == 'GCommand':
+            replies = [self._statement(s, now) for s in text.split(';')]
+            replies = [r for r in replies if r is not None]
+            return (' ' + ' '.join(replies) + '\r\n:' if replies else ':').encode(gclib._enc)
+        if function == 'GProgramDownload':
+            self.program = args[1].value.decode(gclib._enc)
+        elif function == 'GArrayUpload':
+            name, first, last = args[1].value.decode(gclib._enc), args[2], args[3]
+            values = self.arrays.get(name, [])
+            if last < 0 or last >= len(values):
+                last = len(values) - 1
+            return ','.join(f'{v:.4f}' for v in values[first:last + 1]).encode(gclib._enc)
+        elif function == 'GArrayDownload':
+            name, first = args[1].value.decode(gclib._enc), args[2]
+            values = self.arrays.setdefault(name, [])
+            data = [float(v) for v in args[4].value.decode(gclib._enc).split(',')]
+            values.extend([0.0] * (first + len(data) - len(values)))
+            values[first:first + len(data)] = data
+        elif function == 'GOpen':
+            self._gcon.value = 1
+        return b''
+
+    def _transact(self, kind, func, args, sent=0, reads=False, locked=True, text=None):
+        function = func.__name__
+        with self._lock:
+            start = time.perf_counter()
+            if self.latency > 0:
+                time.sleep(self.latency)
+            try:
+                response = self._respond(function, args, text)
+                return_code = gclib.G_NO_ERROR
+            except gclib.GclibError:
+                response = b''
+                return_code = gclib.G_BAD_RESPONSE_QUESTION_MARK
+            end = time.perf_counter()
+            timeout_class = gclib._timeout_class(function, text) if self.timeouts is not None else None
+            if timeout_class is not None and return_code == gclib.G_NO_ERROR:
+                self.timeouts.record(timeout_class, end - start)
+        self._account(kind, function, text, start, end, sent, response, return_code)
+        gclib._rc(return_code)
+        return response
+
+    def GVersion(self):
+        return 'py.emulator'
+
+    def GInfo(self):
+        return 'emulated controller'
+
+    def GTimeout(self, timeout):
+        self._timeout = timeout
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Resident controller program
+
+All routines the device runs on the controller, downloaded once and selected
+through variables:
+
+    mode            0: Tango drives the moves, 1: digital input 1 drives them
+    opn, cls        open and close targets
+    acc, dec, spd, its
+                    motion profile applied by #INIT (and swept by #TUNE)
+    epos            last position the input asked for, 0 makes #EXT move again;
+                    #EXT waits for a move in progress (_BGA) to end before it follows the input
+    ioff, itok      offset and reference token set by #INDEX, idone is 1 when it is done
+                    and -1 when the search was stopped before the index was found
+    gin, glev       trigger input and level #GTRIG waits for before starting the staged move
+
+Thread 0 runs #INIT followed by the #SUP loop, #LATCH runs on thread 1,
+#INDEX and #TUNE are started on thread 2 and #GTRIG, used by the shutter
+group, on thread 3. The fwver variable holds the VERSION of the downloaded
+program.
+"""
+
+import zlib
+
+if not __package__: # imported by the device server run as a script
+    import autotune
+    import latch
+else:
+    import SoftiGalilShutter.autotune as autotune
+    import SoftiGalilShutter.latch as latch
+
+SUPERVISOR_THREAD = 0
+ROUTINE_THREAD = 2
+GROUP_THREAD = 3
+
+# Galil evaluates expressions left to right, hence the parentheses.
+RESIDENT_PROGRAM = (
+    '#INIT;ACA=acc;DCA=dec;SPA=spd;ITA=its;SHA\n'
+    '#SUP;IF(mode=1);JS#EXT;ENDIF\n'
+    'WT2;JP#SUP\n'
+    '#EXT;IF((@IN[1]=0)&(epos<>1)&(_MOA=0)&(_BGA=0));epos=1;JS#OPEN;ENDIF\n'
+    'IF((@IN[1]=1)&(epos<>2)&(_MOA=0)&(_BGA=0));epos=2;JS#CLOSE;ENDIF\n'
+    'EN\n'
+    '#OPEN;PAA=opn;BGA;AMA;EN\n'
+    '#CLOSE;PAA=cls;BGA;AMA;EN\n'
+    '#INDEX;STA;AMA;MOA;JG 5000;FIA;SHA;BGA;AMA\n'
+    'IF(_SCA=10);DPA=_TPA-ioff;calref=itok;idone=1;ELSE;idone=-1;ENDIF;EN' # 10: stopped by FI
+)
+
+# Starts the move staged with PA when the trigger input reaches glev, the
+# thread ends once the move is complete.
+GROUP_PROGRAM = (
+    '#GTRIG;JP#GTRIG,(@IN[gin]<>glev)\n'
+    'BGA;AMA;EN'
+)
+
+PROGRAM = '\n'.join((RESIDENT_PROGRAM, autotune.TUNE_PROGRAM, latch.LATCH_PROGRAM, GROUP_PROGRAM))
+VERSION = zlib.crc32(PROGRAM.encode()) & 0x7FFFFFF # fits a controller variable
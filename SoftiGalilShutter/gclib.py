@@ -7,62 +7,88 @@ Contact softwaresupport@galil.com with questions, comments, and suggestions.
 # Part of implementation, don't use directly.
 ###############################################################################
 import platform #for distinguishing 'Windows', 'Linux', 'Darwin'
+import bisect
+import struct
+import threading
+import time
+from collections import deque
 from ctypes import *
 
-if platform.system() == 'Windows':
-    if '64 bit' in platform.python_compiler():
-        _gclib_path = r'C:\Program Files (x86)\Galil\gclib\dll\x64\gclib.dll'
-        _gclibo_path = r'C:\Program Files (x86)\Galil\gclib\dll\x64\gclibo.dll'
-        _gclib = WinDLL(_gclib_path)
-        _gclibo = WinDLL(_gclibo_path)
-    else:
-        _gclib_path = r'C:\Program Files (x86)\Galil\gclib\dll\x86\gclib.dll'
-        _gclibo_path = r'C:\Program Files (x86)\Galil\gclib\dll\x86\gclibo.dll'
-        _gclib = WinDLL(_gclib_path)
-        _gclibo = WinDLL(_gclibo_path)
-        #Reassign symbol name, Python doesn't like @ in function names
-        #gclib calls
-        setattr(_gclib, 'GArrayDownload', getattr(_gclib, '_GArrayDownload@20'))
-        setattr(_gclib, 'GArrayUpload', getattr(_gclib, '_GArrayUpload@28'))
-        setattr(_gclib, 'GClose', getattr(_gclib, '_GClose@4'))
-        setattr(_gclib, 'GCommand', getattr(_gclib, '_GCommand@20'))
-        setattr(_gclib, 'GFirmwareDownload', getattr(_gclib, '_GFirmwareDownload@8'))
-        setattr(_gclib, 'GInterrupt', getattr(_gclib, '_GInterrupt@8'))
-        setattr(_gclib, 'GMessage', getattr(_gclib, '_GMessage@12'))
-        setattr(_gclib, 'GOpen', getattr(_gclib, '_GOpen@8'))
-        setattr(_gclib, 'GProgramDownload', getattr(_gclib, '_GProgramDownload@12'))
-        setattr(_gclib, 'GProgramUpload', getattr(_gclib, '_GProgramUpload@12'))
-        #gclibo calls (open source component/convenience functions)
-        setattr(_gclibo, 'GAddresses', getattr(_gclibo, '_GAddresses@8'))
-        setattr(_gclibo, 'GArrayDownloadFile', getattr(_gclibo, '_GArrayDownloadFile@8'))
-        setattr(_gclibo, 'GArrayUploadFile', getattr(_gclibo, '_GArrayUploadFile@12'))
-        setattr(_gclibo, 'GAssign', getattr(_gclibo, '_GAssign@8'))
-        setattr(_gclibo, 'GError', getattr(_gclibo, '_GError@12'))
-        setattr(_gclibo, 'GInfo', getattr(_gclibo, '_GInfo@12'))
-        setattr(_gclibo, 'GIpRequests', getattr(_gclibo, '_GIpRequests@8'))
-        setattr(_gclibo, 'GMotionComplete', getattr(_gclibo, '_GMotionComplete@8'))
-        setattr(_gclibo, 'GProgramDownloadFile', getattr(_gclibo, '_GProgramDownloadFile@12'))
-        setattr(_gclibo, 'GSleep', getattr(_gclibo, '_GSleep@4'))
-        setattr(_gclibo, 'GProgramUploadFile', getattr(_gclibo, '_GProgramUploadFile@8'))
-        setattr(_gclibo, 'GTimeout', getattr(_gclibo, '_GTimeout@8'))
-        setattr(_gclibo, 'GVersion', getattr(_gclibo, '_GVersion@8'))
-        setattr(_gclibo, 'GSetupDownloadFile', getattr(_gclibo, '_GSetupDownloadFile@20'))
-
-elif platform.system() == 'Linux':
-    cdll.LoadLibrary("libgclib.so.0")
-    _gclib = CDLL("libgclib.so.0")
-    cdll.LoadLibrary("libgclibo.so.0")
-    _gclibo = CDLL("libgclibo.so.0")
-
-elif platform.system() == 'Darwin': #OSX
-    _gclib_path = '/Applications/gclib/dylib/gclib.0.dylib'
-    _gclibo_path = '/Applications/gclib/dylib/gclibo.0.dylib'
-    cdll.LoadLibrary(_gclib_path)
-    _gclib = CDLL(_gclib_path)
-    cdll.LoadLibrary(_gclibo_path)
-    _gclibo = CDLL(_gclibo_path)
-    
-    
+class _UnavailableFunction:
+    """Stands in for a function of a gclib library that could not be loaded."""
+
+    def __init__(self, name, error):
+        self.__name__ = name
+        self._error = error
+
+    def __call__(self, *args):
+        raise GclibError(f'gclib is not available: {self._error}')
+
+class _Unavailable:
+    """Stands in for a gclib library that could not be loaded, e.g. to replay a transaction log."""
+
+    def __init__(self, error):
+        self._error = error
+
+    def __getattr__(self, name):
+        return _UnavailableFunction(name, self._error)
+
+try:
+    if platform.system() == 'Windows':
+        if '64 bit' in platform.python_compiler():
+            _gclib_path = r'C:\Program Files (x86)\Galil\gclib\dll\x64\gclib.dll'
+            _gclibo_path = r'C:\Program Files (x86)\Galil\gclib\dll\x64\gclibo.dll'
+            _gclib = WinDLL(_gclib_path)
+            _gclibo = WinDLL(_gclibo_path)
+        else:
+            _gclib_path = r'C:\Program Files (x86)\Galil\gclib\dll\x86\gclib.dll'
+            _gclibo_path = r'C:\Program Files (x86)\Galil\gclib\dll\x86\gclibo.dll'
+            _gclib = WinDLL(_gclib_path)
+            _gclibo = WinDLL(_gclibo_path)
+            #Reassign symbol name, Python doesn't like @ in function names
+            #gclib calls
+            setattr(_gclib, 'GArrayDownload', getattr(_gclib, '_GArrayDownload@20'))
+            setattr(_gclib, 'GArrayUpload', getattr(_gclib, '_GArrayUpload@28'))
+            setattr(_gclib, 'GClose', getattr(_gclib, '_GClose@4'))
+            setattr(_gclib, 'GCommand', getattr(_gclib, '_GCommand@20'))
+            setattr(_gclib, 'GFirmwareDownload', getattr(_gclib, '_GFirmwareDownload@8'))
+            setattr(_gclib, 'GInterrupt', getattr(_gclib, '_GInterrupt@8'))
+            setattr(_gclib, 'GMessage', getattr(_gclib, '_GMessage@12'))
+            setattr(_gclib, 'GOpen', getattr(_gclib, '_GOpen@8'))
+            setattr(_gclib, 'GProgramDownload', getattr(_gclib, '_GProgramDownload@12'))
+            setattr(_gclib, 'GProgramUpload', getattr(_gclib, '_GProgramUpload@12'))
+            #gclibo calls (open source component/convenience functions)
+            setattr(_gclibo, 'GAddresses', getattr(_gclibo, '_GAddresses@8'))
+            setattr(_gclibo, 'GArrayDownloadFile', getattr(_gclibo, '_GArrayDownloadFile@8'))
+            setattr(_gclibo, 'GArrayUploadFile', getattr(_gclibo, '_GArrayUploadFile@12'))
+            setattr(_gclibo, 'GAssign', getattr(_gclibo, '_GAssign@8'))
+            setattr(_gclibo, 'GError', getattr(_gclibo, '_GError@12'))
+            setattr(_gclibo, 'GInfo', getattr(_gclibo, '_GInfo@12'))
+            setattr(_gclibo, 'GIpRequests', getattr(_gclibo, '_GIpRequests@8'))
+            setattr(_gclibo, 'GMotionComplete', getattr(_gclibo, '_GMotionComplete@8'))
+            setattr(_gclibo, 'GProgramDownloadFile', getattr(_gclibo, '_GProgramDownloadFile@12'))
+            setattr(_gclibo, 'GSleep', getattr(_gclibo, '_GSleep@4'))
+            setattr(_gclibo, 'GProgramUploadFile', getattr(_gclibo, '_GProgramUploadFile@8'))
+            setattr(_gclibo, 'GTimeout', getattr(_gclibo, '_GTimeout@8'))
+            setattr(_gclibo, 'GVersion', getattr(_gclibo, '_GVersion@8'))
+            setattr(_gclibo, 'GSetupDownloadFile', getattr(_gclibo, '_GSetupDownloadFile@20'))
+
+    elif platform.system() == 'Linux':
+        cdll.LoadLibrary("libgclib.so.0")
+        _gclib = CDLL("libgclib.so.0")
+        cdll.LoadLibrary("libgclibo.so.0")
+        _gclibo = CDLL("libgclibo.so.0")
+
+    elif platform.system() == 'Darwin': #OSX
+        _gclib_path = '/Applications/gclib/dylib/gclib.0.dylib'
+        _gclibo_path = '/Applications/gclib/dylib/gclibo.0.dylib'
+        cdll.LoadLibrary(_gclib_path)
+        _gclib = CDLL(_gclib_path)
+        cdll.LoadLibrary(_gclibo_path)
+        _gclibo = CDLL(_gclibo_path)
+except OSError as e: #the gclib shared libraries are not installed
+    _gclib = _Unavailable(e)
+    _gclibo = _Unavailable(e)
 
 # Python "typedefs"
 _GReturn = c_int #type for a return code
@@ -111,17 +137,197 @@ _enc = "ASCII" #byte encoding for going between python strings and c strings.
 _buf_size = 500000 #size of response buffer. Big enough to fit entire 4000 program via UL/LS, or 24000 elements of array data.
 _error_buf = create_string_buffer(128)    #buffer for retrieving error code descriptions.
     
+G_NO_ERROR = 0
+G_BAD_RESPONSE_QUESTION_MARK = -1010 #controller replied with '?'
+G_TIMEOUT = -1100 #no response from the controller within the library timeout
+G_CONNECTION_NOT_ESTABLISHED = -1201
+
 def _rc(return_code):
     """Checks return codes from gclib and raises a python error if result is exceptional."""
     if return_code != 0:
-        _gclibo.GError(return_code, _error_buf, 128) #Get the library's error description
-        raise GclibError(str(_error_buf.value.decode(_enc)))
+        if isinstance(_gclibo, _Unavailable):
+            error = GclibError(f'gclib return code {return_code}')
+        else:
+            _gclibo.GError(return_code, _error_buf, 128) #Get the library's error description
+            error = GclibError(str(_error_buf.value.decode(_enc)))
+        error.rc = return_code
+        raise error
     return 
 
 class GclibError(Exception):
     """Error class for non-zero gclib return codes."""
-    pass 
- 
+    rc = None #gclib return code, e.g. G_TIMEOUT
+
+def _command_kind(command):
+    """Classifies a command by its mnemonic, e.g. 'PA7000' -> 'PA', 'MG _TPA' -> 'MG'."""
+    command = command.lstrip()
+    if command[:2].isalpha():
+        return command[:2].upper()
+    return command[:1] or '?'
+
+class GclibStats:
+    """Transaction counters and round-trip latency histograms of a connection."""
+
+    buckets = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.5, 1.0, 5.0) #histogram upper bounds in seconds, +Inf implied
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears all counters."""
+        with self._lock:
+            self._kinds = {} #kind -> [count, total seconds, per-bucket counts]
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.errors = 0
+            self.timeouts = 0
+
+    def record(self, kind, elapsed, sent, received, return_code):
+        """Accounts for one finished transaction."""
+        slot = bisect.bisect_left(self.buckets, elapsed)
+        with self._lock:
+            entry = self._kinds.get(kind)
+            if entry is None:
+                entry = self._kinds[kind] = [0, 0.0, [0] * (len(self.buckets) + 1)]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2][slot] += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+            if return_code != G_NO_ERROR:
+                self.errors += 1
+                if return_code == G_TIMEOUT:
+                    self.timeouts += 1
+
+    @property
+    def transactions(self):
+        """Total number of recorded transactions."""
+        with self._lock:
+            return sum(entry[0] for entry in self._kinds.values())
+
+    def snapshot(self):
+        """
+        Returns a consistent copy of the counters as a dictionary.
+        'kinds' maps the command type to {'count', 'sum', 'buckets'}, bucket counts are not cumulative.
+        """
+        with self._lock:
+            return {
+                'kinds': {kind: {'count': entry[0], 'sum': entry[1], 'buckets': list(entry[2])}
+                          for kind, entry in self._kinds.items()},
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+            }
+
+def _timeout_class(function, command):
+    """Returns the timeout class of a transaction, None for the ones GTimeout does not apply to."""
+    if function in ('GOpen', 'GClose', 'GInterrupt'):
+        return None
+    if function != 'GCommand':
+        return 'program' #downloads and uploads
+    statements = [s.strip()[:2].upper() for s in command.split(';')]
+    if any(s in ('AM', 'MC', 'WT') for s in statements):
+        return 'blocking' #the response waits for the motion
+    if any(s in ('XQ', 'HX', 'RS', 'DM', 'DA', 'BP', 'BV') for s in statements):
+        return 'program'
+    if statements[0] in ('MG', 'TP', 'TS', 'TE', 'TV', 'RP', 'TC', 'TB', 'SC'):
+        return 'status'
+    return 'command'
+
+class AdaptiveTimeouts:
+    """
+    Library timeouts per transaction class derived from the measured round-trip times:
+    multiplier times the p99 of the last window transactions plus margin, within the
+    class's (floor, ceiling). A class uses its ceiling until min_samples were measured.
+    """
+
+    limits = {'status': (20, 1000), 'command': (50, 2000), 'program': (500, 10000), 'blocking': (2000, 30000)} #ms
+
+    def __init__(self, window=256, multiplier=4.0, margin=5.0, min_samples=16):
+        self.multiplier = multiplier
+        self.margin = margin
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = {c: deque(maxlen=window) for c in self.limits} #ms
+        self._pending = {c: 0 for c in self.limits} #samples since the timeout was last computed
+        self._timeouts = {c: ceiling for c, (_, ceiling) in self.limits.items()}
+        self._percentiles = {c: (float('nan'), float('nan')) for c in self.limits}
+
+    def timeout(self, timeout_class):
+        """Returns the timeout for the class, in ms."""
+        return self._timeouts[timeout_class]
+
+    def record(self, timeout_class, elapsed):
+        """Accounts for a successful transaction of elapsed seconds."""
+        with self._lock:
+            samples = self._samples[timeout_class]
+            samples.append(elapsed * 1000)
+            self._pending[timeout_class] += 1
+            if len(samples) < self.min_samples or self._pending[timeout_class] < self.min_samples:
+                return
+            self._pending[timeout_class] = 0
+            ordered = sorted(samples)
+            p50 = ordered[len(ordered) // 2]
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            floor, ceiling = self.limits[timeout_class]
+            self._percentiles[timeout_class] = (p50, p99)
+            self._timeouts[timeout_class] = int(min(max(self.multiplier * p99 + self.margin, floor), ceiling))
+
+    def percentiles(self, timeout_class):
+        """Returns the (p50, p99) round-trip time of the class in ms, NaN before min_samples."""
+        with self._lock:
+            return self._percentiles[timeout_class]
+
+    def snapshot(self):
+        """Returns {class: {'timeout', 'p50', 'p99'}}, times in ms."""
+        with self._lock:
+            return {c: {'timeout': self._timeouts[c], 'p50': self._percentiles[c][0],
+                        'p99': self._percentiles[c][1]} for c in self.limits}
+
+_LOG_MAGIC = b'GCLIBLOG\x01'
+_LOG_RECORD = struct.Struct('<ddiHII') #start, latency, return code, lengths of function name, command and response
+
+class TransactionRecorder:
+    """Appends every transaction of a connection to a compact binary log, see read_transactions()."""
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self._file.write(_LOG_MAGIC)
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def write(self, function, command, response, start, end, return_code):
+        function = function.encode(_enc)
+        command = (command or '').encode(_enc)
+        with self._lock:
+            self._file.write(_LOG_RECORD.pack(start - self._origin, end - start, return_code,
+                                              len(function), len(command), len(response)))
+            self._file.write(function + command + response)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def read_transactions(path):
+    """
+    Yields the transactions of a log written by TransactionRecorder as tuples
+    (start, latency, function, command, response, return_code), times in seconds.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(_LOG_MAGIC)) != _LOG_MAGIC:
+            raise ValueError(f'{path} is not a gclib transaction log')
+        while True:
+            header = f.read(_LOG_RECORD.size)
+            if len(header) < _LOG_RECORD.size:
+                return
+            start, latency, return_code, function_len, command_len, response_len = _LOG_RECORD.unpack(header)
+            function = f.read(function_len).decode(_enc)
+            command = f.read(command_len).decode(_enc)
+            response = f.read(response_len)
+            yield start, latency, function, command, response, return_code
+
 class py:
     """Represents a single Python connection to a Galil Controller or PLC."""
     
@@ -130,6 +336,11 @@ class py:
         self._gcon = _GCon(0) #handle to connection
         self._buf = create_string_buffer(_buf_size)
         self._timeout = 5000
+        self._lock = threading.RLock() #serializes transactions sharing the handle and read buffer
+        self.stats = GclibStats()
+        self.tracer = None #optional span recorder with an add(category, name, start, end, args) method
+        self.recorder = None #optional TransactionRecorder
+        self.timeouts = None #optional AdaptiveTimeouts
         return        
     
     def __del__(self):
@@ -140,7 +351,46 @@ class py:
     def _cc(self):
         """Checks if connection is established, throws error if not."""
         if self._gcon.value == None:
-            _rc(-1201) #G_CONNECTION_NOT_ESTABLISHED
+            _rc(G_CONNECTION_NOT_ESTABLISHED)
+
+    def _transact(self, kind, func, args, sent=0, reads=False, locked=True, text=None):
+        """
+        Calls a gclib function and records it in the connection statistics and the tracer, if any.
+        Returns a copy of the read buffer if reads is set, so it can be decoded outside the lock.
+        """
+        if locked:
+            self._lock.acquire()
+        try:
+            timeouts = self.timeouts
+            timeout_class = _timeout_class(func.__name__, text) if timeouts is not None else None
+            if timeout_class is not None:
+                timeout = timeouts.timeout(timeout_class)
+                if timeout != self._timeout:
+                    _rc(_gclibo.GTimeout(self._gcon, timeout))
+                    self._timeout = timeout
+            start = time.perf_counter()
+            return_code = func(*args)
+            end = time.perf_counter()
+            response = self._buf.value if reads and return_code == G_NO_ERROR else b''
+            if timeout_class is not None and return_code == G_NO_ERROR:
+                timeouts.record(timeout_class, end - start)
+            self._account(kind, func.__name__, text, start, end, sent, response, return_code)
+            _rc(return_code)
+            return response
+        finally:
+            if locked:
+                self._lock.release()
+
+    def _account(self, kind, function, text, start, end, sent, response, return_code):
+        """Records a finished transaction in the statistics, the tracer and the recorder."""
+        self.stats.record(kind, end - start, sent, len(response), return_code)
+        tracer = self.tracer
+        if tracer is not None:
+            tracer.add('gclib', text or function, start, end,
+                       {'function': function, 'command': text, 'rc': return_code})
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.write(function, text, response, start, end, return_code)
     
     def GOpen(self, address):
         """
@@ -149,7 +399,7 @@ class py:
         See Link GOpen() <http://www.galil.com/sw/pub/all/doc/gclib/html/gclib_8h_aef4aec8a85630eed029b7a46aea7db54.html#aef4aec8a85630eed029b7a46aea7db54>
         """
         c_address = _GCStringIn(address.encode(_enc))
-        _rc(_gclib.GOpen(c_address, byref(self._gcon)))
+        self._transact('GOpen', _gclib.GOpen, (c_address, byref(self._gcon)))
         return
         
      
@@ -159,7 +409,7 @@ class py:
         See Link GClose() <http://www.galil.com/sw/pub/all/doc/gclib/html/gclib_8h_a24a437bcde9637b0db4b94176563a052.html#a24a437bcde9637b0db4b94176563a052>
         """
         if self._gcon.value != None:
-            _rc(_gclib.GClose(self._gcon))
+            self._transact('GClose', _gclib.GClose, (self._gcon,))
             self._gcon = _GCon(0)
         return
         
@@ -172,8 +422,10 @@ class py:
         """
         self._cc()
         c_command = _GCStringIn(command.encode(_enc))
-        _rc(_gclib.GCommand(self._gcon, c_command, self._buf, _buf_size, None))
-        response = str(self._buf.value.decode(_enc))
+        response = self._transact(_command_kind(command), _gclib.GCommand,
+                                  (self._gcon, c_command, self._buf, _buf_size, None),
+                                  sent=len(c_command.value), reads=True, text=command)
+        response = str(response.decode(_enc))
         return response[:-3].strip() # trim trailing /r/n: and leading space
 
         
@@ -268,7 +520,7 @@ class py:
         self._cc()
         c_prog = _GCStringIn(program.encode(_enc))
         c_pre = _GCStringIn(preprocessor.encode(_enc))
-        _rc(_gclib.GProgramDownload(self._gcon, c_prog, c_pre))
+        self._transact('GProgramDownload', _gclib.GProgramDownload, (self._gcon, c_prog, c_pre), sent=len(c_prog.value))
         return
      
     
@@ -278,8 +530,8 @@ class py:
         See Link GProgramUpload() <http://www.galil.com/sw/pub/all/doc/gclib/html/gclib_8h_a80a653ce387a2bd16bde2793c6de77e9.html#a80a653ce387a2bd16bde2793c6de77e9>
         """
         self._cc()
-        _rc(_gclib.GProgramUpload(self._gcon, self._buf, _buf_size))
-        return str(self._buf.value.decode(_enc))
+        program = self._transact('GProgramUpload', _gclib.GProgramUpload, (self._gcon, self._buf, _buf_size), reads=True)
+        return str(program.decode(_enc))
         
         
     def GProgramDownloadFile(self, file_path, preprocessor=""):
@@ -291,7 +543,7 @@ class py:
         self._cc()
         c_path = _GCStringIn(file_path.encode(_enc))
         c_pre = _GCStringIn(preprocessor.encode(_enc))
-        _rc(_gclibo.GProgramDownloadFile(self._gcon, c_path, c_pre))
+        self._transact('GProgramDownloadFile', _gclibo.GProgramDownloadFile, (self._gcon, c_path, c_pre))
         return        
         
     def GProgramUploadFile(self, file_path):
@@ -301,7 +553,7 @@ class py:
         """
         self._cc()
         c_path = _GCStringIn(file_path.encode(_enc))
-        _rc(_gclibo.GProgramUploadFile(self._gcon, c_path))
+        self._transact('GProgramUploadFile', _gclibo.GProgramUploadFile, (self._gcon, c_path))
         return
         
     def GArrayDownload(self, name, first, last, array_data):
@@ -316,7 +568,7 @@ class py:
         for val in array_data:
             array_string += str(val) + ","
         c_data = _GCStringIn(array_string[:-1].encode(_enc)) #trim trailing command
-        _rc(_gclib.GArrayDownload(self._gcon, c_name, first, last, c_data))
+        self._transact('GArrayDownload', _gclib.GArrayDownload, (self._gcon, c_name, first, last, c_data), sent=len(c_data.value))
         return
         
         
@@ -334,7 +586,7 @@ class py:
             names_string += name + ' '
         
         c_names = _GCStringIn(names_string[:-1].encode(_enc)) #trim trailing space
-        _rc(_gclibo.GArrayUploadFile(self._gcon, c_path, c_names))
+        self._transact('GArrayUploadFile', _gclibo.GArrayUploadFile, (self._gcon, c_path, c_names))
         return
             
             
@@ -345,7 +597,7 @@ class py:
         """
         self._cc()
         c_path = _GCStringIn(file_path.encode(_enc))
-        _rc(_gclibo.GArrayDownloadFile(self._gcon, c_path))
+        self._transact('GArrayDownloadFile', _gclibo.GArrayDownloadFile, (self._gcon, c_path))
         return        
     
     
@@ -356,8 +608,9 @@ class py:
         """
         self._cc()
         c_name = _GCStringIn(name.encode(_enc))
-        _rc(_gclib.GArrayUpload(self._gcon, c_name, first, last, 1, self._buf, _buf_size)) #1 is comma delimiter
-        string_list = str(self._buf.value.decode(_enc)).split(',')
+        data = self._transact('GArrayUpload', _gclib.GArrayUpload,
+                              (self._gcon, c_name, first, last, 1, self._buf, _buf_size), reads=True) #1 is comma delimiter
+        string_list = str(data.decode(_enc)).split(',')
         float_list = []
         for s in string_list:
             float_list.append(float(s))
@@ -400,7 +653,7 @@ class py:
         """
         self._cc()
         c_path = _GCStringIn(file_path.encode(_enc))
-        _rc(_gclib.GFirmwareDownload(self._gcon, c_path))
+        self._transact('GFirmwareDownload', _gclib.GFirmwareDownload, (self._gcon, c_path))
         return
 
 
@@ -410,8 +663,8 @@ class py:
         See Link GMessage() <http://www.galil.com/sw/pub/all/doc/gclib/html/gclib_8h_aabc5eaa09ddeca55ab8ee048b916cbcd.html#aabc5eaa09ddeca55ab8ee048b916cbcd>
         """
         self._cc()
-        _rc(_gclib.GMessage(self._gcon, self._buf, _buf_size))
-        return str(self._buf.value.decode(_enc))
+        message = self._transact('GMessage', _gclib.GMessage, (self._gcon, self._buf, _buf_size), reads=True)
+        return str(message.decode(_enc))
      
      
     def GMotionComplete(self, axes):
@@ -421,7 +674,7 @@ class py:
         """
         self._cc()
         c_axes = _GCStringIn(axes.encode(_enc))
-        _rc(_gclibo.GMotionComplete(self._gcon, c_axes))
+        self._transact('GMotionComplete', _gclibo.GMotionComplete, (self._gcon, c_axes))
         return
 
     def GInterrupt(self):
@@ -431,7 +684,7 @@ class py:
         """
         self._cc()
         status = _GStatus(0)
-        _rc(_gclib.GInterrupt(self._gcon, byref(status)))
+        self._transact('GInterrupt', _gclib.GInterrupt, (self._gcon, byref(status)), locked=False) #blocks until an interrupt arrives
         return status.value
     
     def GSetupDownloadFile(self, file_path, options):
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Controller interrupts (EI) and the listeners receiving their status bytes
+
+The EI command selects the events the controller reports with one status
+byte each. GclibListener receives them through GInterrupt on its own
+connection, UdpListener on a local UDP port, which stands in for the
+controller with the emulator or when testing:
+
+    python -m SoftiGalilShutter.interrupts <port> input1
+"""
+
+import socket
+import sys
+
+if not __package__: # imported by the device server run as a script
+    import gclib
+else:
+    import SoftiGalilShutter.gclib as gclib
+
+# Status bytes
+LIMIT_SWITCH = 0xC0
+EXCESS_ERROR = 0xC8
+MOTION_COMPLETE = 0xD0 # + axis, 0 for A
+ALL_COMPLETE = 0xD8
+PROGRAM_STOPPED = 0xDB
+INPUT = 0xE0 # + input number, 1 to 8
+
+# EI m bits besides the axes
+ALL_COMPLETE_BIT = 1 << 8
+EXCESS_ERROR_BIT = 1 << 9
+LIMIT_SWITCH_BIT = 1 << 10
+
+NAMES = {'limit': LIMIT_SWITCH, 'error': EXCESS_ERROR, 'complete': ALL_COMPLETE, 'stopped': PROGRAM_STOPPED}
+NAMES.update({'motion' + 'ABCDEFGH'[axis]: MOTION_COMPLETE + axis for axis in range(8)})
+NAMES.update({f'input{n}': INPUT + n for n in range(1, 9)})
+_DESCRIPTIONS = {status: name for name, status in NAMES.items()}
+
+
+def ei_command(axes=(0,), inputs=(1,), limits=True):
+    """Returns the EI command enabling motion complete of axes, the inputs (1 based) and the limit switches."""
+    m = sum(1 << axis for axis in axes) | (LIMIT_SWITCH_BIT if limits else 0)
+    n = sum(1 << (i - 1) for i in inputs)
+    return f'EI {m},{n}'
+
+
+def describe(status):
+    """Returns the name of a status byte, e.g. 'motionA' or 'input1'."""
+    return _DESCRIPTIONS.get(status, f'0x{status:02X}')
+
+
+def send(address, status):
+    """Sends one status byte to a UdpListener at address (host, port)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.sendto(bytes((status,)), address)
+
+
+class GclibListener:
+    """
+    Receives the interrupts of the controller at address on a direct connection of
+    its own. The controller reports them to a single connection, so the other
+    connections of the device must not subscribe to them.
+    """
+
+    def __init__(self, address, timeout=200):
+        self._g = gclib.py()
+        self._g.GOpen(address + ' --direct --subscribe EI')
+        self._g.GTimeout(timeout) # GInterrupt returns G_TIMEOUT when nothing came in
+
+    def wait(self):
+        """Returns the next status byte, or None after the timeout."""
+        try:
+            return self._g.GInterrupt()
+        except gclib.GclibError as e:
+            if e.rc == gclib.G_TIMEOUT:
+                return None
+            raise
+
+    def close(self):
+        self._g.GClose()
+
+
+class UdpListener:
+    """Receives status bytes sent to a local UDP port, 0 picks a free one."""
+
+    def __init__(self, port=0, timeout=200):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(('127.0.0.1', port))
+        self._socket.settimeout(timeout / 1000.0)
+        self.address = self._socket.getsockname()
+
+    def wait(self):
+        """Returns the next status byte, or None after the timeout."""
+        try:
+            data = self._socket.recv(16)
+        except socket.timeout:
+            return None
+        return data[0] if data else None
+
+    def close(self):
+        self._socket.close()
+
+
+def main(argv):
+    if len(argv) != 2 or argv[1] not in NAMES:
+        print(f'usage: python -m SoftiGalilShutter.interrupts <port> <{"|".join(NAMES)}>')
+        return 1
+    send(('127.0.0.1', int(argv[0])), NAMES[argv[1]])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
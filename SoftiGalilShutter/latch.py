@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Controller-side timestamps of aperture threshold crossings
+
+"""
+
+import numpy
+
+# Runs on its own thread next to the main program. Every pass compares the
+# position with the lnt thresholds in lth[] and, on a crossing, stores the time
+# interpolated between the two samples (in TIME ticks), the threshold position
+# and the threshold index into the ring lt[]/lp[]/lk[] of lsz entries. With
+# lal=1 the position latch (AL) is rearmed and its captures are stored with
+# index -1. lcount counts all records, ln is the next slot; both are set up by
+# the device so that restarting the thread keeps the ring.
+# Galil evaluates expressions left to right, hence the parentheses.
+LATCH_PROGRAM = (
+    '#LATCH;lo=_TPA;lxo=TIME\n'
+    'IF(lal=1);ALA;ENDIF\n'
+    '#LL;lc=_TPA;lx=TIME;li=0\n'
+    '#LI;JP#LA,li>=lnt\n'
+    'th=lth[li]\n'
+    'IF(((lo<th)&(lc>=th))|((lo>=th)&(lc<th)))\n'
+    'lv=lxo+(((th-lo)/(lc-lo))*(lx-lxo));lw=th;lq=li;JS#LREC\n'
+    'ENDIF\n'
+    'li=li+1;JP#LI\n'
+    '#LA;IF((lal=1)&(_ALA=0))\n'
+    'lv=TIME;lw=_RLA;lq=-1;JS#LREC;ALA\n'
+    'ENDIF\n'
+    'lo=lc;lxo=lx;JP#LL\n'
+    '#LREC;lt[ln]=lv;lp[ln]=lw;lk[ln]=lq\n'
+    'ln=ln+1;lcount=lcount+1\n'
+    'IF(ln=lsz);ln=0;ENDIF\n'
+    'EN'
+)
+LATCH_THREAD = 1
+
+
+def ring_order(count, seen, next_slot, size):
+    """Returns the ring slots holding the records added since seen was the record count, oldest first."""
+    new = min(count - seen, size)
+    return numpy.arange(next_slot - new, next_slot) % size
+
+
+class History:
+    """Bounded history of latched crossings, the newest at the end."""
+
+    def __init__(self, size):
+        self.size = size
+        self.times = numpy.zeros(0, dtype=numpy.float64)
+        self.positions = numpy.zeros(0, dtype=numpy.int64)
+        self.sources = numpy.zeros(0, dtype=numpy.int16)
+
+    def extend(self, times, positions, sources):
+        self.times = numpy.concatenate((self.times, times))[-self.size:]
+        self.positions = numpy.concatenate((self.positions, positions))[-self.size:]
+        self.sources = numpy.concatenate((self.sources, sources))[-self.size:]
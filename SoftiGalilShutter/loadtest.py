@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Concurrent-client load test of the device server
+
+Starts SoftiGalilShutter in a tango.test_context.DeviceTestContext against the
+emulated controller and runs mixes of attribute readers, Open/Close writers
+and event subscribers at increasing client counts:
+
+    python -m SoftiGalilShutter.loadtest --mix 4:1:1 --scale 1,2,4,8 --duration 10
+    python -m SoftiGalilShutter.loadtest --property query_cache_ttl=0 --processes
+
+--mix gives readers:writers:subscribers of one unit and --scale the number of
+units per step. Every step reports throughput, latency percentiles and error
+rates per client kind, the events received and the controller transactions
+the server made, so serialization models and caching options can be compared
+with --property and --json.
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy
+import tango
+from tango.test_context import DeviceTestContext
+
+from SoftiGalilShutter.SoftiGalilShutter import SoftiGalilShutter
+
+REJECTED = 'API_CommandNotAllowed' # Open/Close in external control or while tuning
+
+
+def _reason(error):
+    return error.args[0].reason if isinstance(error, tango.DevFailed) else type(error).__name__
+
+
+def _result(kind, latencies, errors, rejected=0, events=0):
+    return {'kind': kind, 'latencies': latencies, 'errors': errors, 'rejected': rejected, 'events': events}
+
+
+def reader(access, attributes, duration):
+    """Reads the attributes in one call, back to back."""
+    proxy = tango.DeviceProxy(access)
+    latencies, errors = [], {}
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            proxy.read_attributes(attributes)
+        except tango.DevFailed as e:
+            errors[_reason(e)] = errors.get(_reason(e), 0) + 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    return _result('read', latencies, errors)
+
+
+def writer(access, duration):
+    """Alternates Open and Close, back to back; each returns once queued, refused commands count as rejected."""
+    proxy = tango.DeviceProxy(access)
+    latencies, errors, rejected = [], {}, 0
+    commands = ('Open', 'Close')
+    deadline = time.monotonic() + duration
+    i = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            proxy.command_inout(commands[i % 2])
+        except tango.DevFailed as e:
+            if _reason(e) == REJECTED:
+                rejected += 1
+            else:
+                errors[_reason(e)] = errors.get(_reason(e), 0) + 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        i += 1
+    return _result('write', latencies, errors, rejected)
+
+
+def subscriber(access, attribute, duration):
+    """Subscribes to change events of the attribute; the latencies are the subscription times."""
+    proxy = tango.DeviceProxy(access)
+    received = []
+    errors = {}
+
+    def push(event):
+        if event.err:
+            reason = event.errors[0].reason
+            errors[reason] = errors.get(reason, 0) + 1
+        else:
+            received.append(time.perf_counter())
+
+    start = time.perf_counter()
+    try:
+        event_id = proxy.subscribe_event(attribute, tango.EventType.CHANGE_EVENT, push)
+    except tango.DevFailed as e:
+        return _result('subscribe', [], {_reason(e): 1})
+    latency = (time.perf_counter() - start) * 1000
+    time.sleep(duration)
+    proxy.unsubscribe_event(event_id)
+    return _result('subscribe', [latency], errors, events=len(received))
+
+
+def _summary(results, duration):
+    latencies = numpy.array([v for r in results for v in r['latencies']])
+    errors = {}
+    for r in results:
+        for reason, count in r['errors'].items():
+            errors[reason] = errors.get(reason, 0) + count
+    failed = sum(errors.values())
+    attempts = len(latencies) + failed + sum(r['rejected'] for r in results)
+    summary = {
+        'clients': len(results),
+        'ok': len(latencies),
+        'throughput': len(latencies) / duration,
+        'error_rate': failed / attempts if attempts else 0.0,
+        'errors': errors,
+        'rejected': sum(r['rejected'] for r in results),
+        'events_per_s': sum(r['events'] for r in results) / duration,
+    }
+    for p in (50, 90, 99):
+        summary[f'p{p}'] = float(numpy.percentile(latencies, p)) if len(latencies) else float('nan')
+    summary['max'] = float(latencies.max()) if len(latencies) else float('nan')
+    return summary
+
+
+def run_step(access, readers, writers, subscribers, options):
+    """Runs one mix of clients for options.duration seconds and returns the summary per client kind."""
+    jobs = ([(reader, access, options.attributes, options.duration)] * readers
+            + [(writer, access, options.duration)] * writers
+            + [(subscriber, access, options.event_attribute, options.duration)] * subscribers)
+    if not jobs:
+        return {}
+    if options.processes:
+        pool = ProcessPoolExecutor(len(jobs), mp_context=multiprocessing.get_context('spawn'))
+    else:
+        pool = ThreadPoolExecutor(len(jobs))
+    proxy = tango.DeviceProxy(access)
+    transactions = proxy.transactions
+    with pool:
+        futures = [pool.submit(*job) for job in jobs]
+        results = [f.result() for f in futures]
+    step = {'controller_transactions_per_s': (proxy.transactions - transactions) / options.duration}
+    for kind in ('read', 'write', 'subscribe'):
+        kind_results = [r for r in results if r['kind'] == kind]
+        if kind_results:
+            step[kind] = _summary(kind_results, options.duration)
+    return step
+
+
+def _print_step(mix, step):
+    readers, writers, subscribers = mix
+    print(f'\nreaders {readers}, writers {writers}, subscribers {subscribers}: '
+          f'{step["controller_transactions_per_s"]:.0f} controller transactions/s')
+    print(f'  {"kind":<10}{"ops/s":>10}{"p50 ms":>9}{"p90 ms":>9}{"p99 ms":>9}{"max ms":>9}'
+          f'{"err %":>8}{"rejected":>10}{"events/s":>10}')
+    for kind in ('read', 'write', 'subscribe'):
+        s = step.get(kind)
+        if s is None:
+            continue
+        print(f'  {kind:<10}{s["throughput"]:>10.1f}{s["p50"]:>9.2f}{s["p90"]:>9.2f}{s["p99"]:>9.2f}'
+              f'{s["max"]:>9.2f}{100 * s["error_rate"]:>8.2f}{s["rejected"]:>10}{s["events_per_s"]:>10.1f}')
+        if s['errors']:
+            print(f'  {"":<10}errors: {s["errors"]}')
+
+
+def _arguments(argv):
+    parser = argparse.ArgumentParser(description='Load test of SoftiGalilShutter with concurrent clients.')
+    parser.add_argument('--host', default='emulator:0.5',
+                        help='host property of the device, emulator:<latency ms> by default')
+    parser.add_argument('--property', action='append', default=[], metavar='NAME=VALUE',
+                        help='further device property, may be repeated')
+    parser.add_argument('--mix', default='4:1:1', help='readers:writers:subscribers of one unit')
+    parser.add_argument('--scale', default='1,2,4,8', help='comma separated numbers of units')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per step')
+    parser.add_argument('--attributes', default='abs_position,State',
+                        help='comma separated attributes read by the readers')
+    parser.add_argument('--event-attribute', default='State', help='attribute the subscribers listen to')
+    parser.add_argument('--poll-period', type=int, default=100,
+                        help='polling period of the event attribute in ms, 0 to leave polling off')
+    parser.add_argument('--processes', action='store_true', help='run every client in its own process')
+    parser.add_argument('--json', help='also write the results to this file')
+    options = parser.parse_args(argv)
+    options.attributes = options.attributes.split(',')
+    return options
+
+
+def main(argv=None):
+    options = _arguments(argv)
+    properties = {'host': options.host}
+    properties.update(p.split('=', 1) for p in options.property)
+    unit = [int(n) for n in options.mix.split(':')]
+    report = {'properties': properties, 'duration': options.duration, 'processes': options.processes, 'steps': []}
+    context = DeviceTestContext(SoftiGalilShutter, properties=properties, process=True)
+    with context as proxy:
+        access = context.get_device_access()
+        proxy.SoftCtrl()
+        if options.poll_period > 0:
+            proxy.poll_attribute(options.event_attribute, options.poll_period)
+        for scale in (int(n) for n in options.scale.split(',')):
+            mix = [n * scale for n in unit]
+            step = run_step(access, *mix, options)
+            _print_step(mix, step)
+            report['steps'].append({'readers': mix[0], 'writers': mix[1], 'subscribers': mix[2], **step})
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
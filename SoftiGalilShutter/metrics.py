@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" OpenMetrics exposition of the controller link statistics
+
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def render(snapshot, buckets, reconnects=0, hook_seconds=0.0, hook_calls=0):
+    """Renders a GclibStats snapshot and the device counters as OpenMetrics text."""
+    lines = [
+        '# TYPE galil_transactions counter',
+        '# HELP galil_transactions Controller transactions by command type.',
+    ]
+    kinds = sorted(snapshot['kinds'].items())
+    for kind, entry in kinds:
+        lines.append(f'galil_transactions_total{{kind="{kind}"}} {entry["count"]}')
+    lines += [
+        '# TYPE galil_transaction_seconds histogram',
+        '# HELP galil_transaction_seconds Round-trip time of controller transactions.',
+    ]
+    for kind, entry in kinds:
+        cumulative = 0
+        for bound, count in zip(buckets, entry['buckets']):
+            cumulative += count
+            lines.append(f'galil_transaction_seconds_bucket{{kind="{kind}",le="{_format_bound(bound)}"}} {cumulative}')
+        lines.append(f'galil_transaction_seconds_bucket{{kind="{kind}",le="+Inf"}} {entry["count"]}')
+        lines.append(f'galil_transaction_seconds_count{{kind="{kind}"}} {entry["count"]}')
+        lines.append(f'galil_transaction_seconds_sum{{kind="{kind}"}} {entry["sum"]}')
+    lines += [
+        '# TYPE galil_sent_bytes counter',
+        f'galil_sent_bytes_total {snapshot["bytes_sent"]}',
+        '# TYPE galil_received_bytes counter',
+        f'galil_received_bytes_total {snapshot["bytes_received"]}',
+        '# TYPE galil_errors counter',
+        '# HELP galil_errors Transactions that returned a gclib error.',
+        f'galil_errors_total {snapshot["errors"]}',
+        '# TYPE galil_timeouts counter',
+        f'galil_timeouts_total {snapshot["timeouts"]}',
+        '# TYPE galil_reconnects counter',
+        f'galil_reconnects_total {reconnects}',
+        '# TYPE galil_hook_seconds summary',
+        '# HELP galil_hook_seconds Time spent in always_executed_hook.',
+        f'galil_hook_seconds_count {hook_calls}',
+        f'galil_hook_seconds_sum {hook_seconds}',
+        '# EOF',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves the text returned by source() over HTTP on a background thread."""
+
+    def __init__(self, port, source, host=''):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = source().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Trapezoidal move profile of the controller (AC/DC/SP)
+
+IT smoothing is not modelled; it stretches the ramps slightly.
+"""
+
+import math
+
+
+def trapezoid(distance, acceleration, deceleration, speed):
+    """Returns the (acceleration, constant speed, deceleration) durations of a move, in seconds."""
+    distance = abs(distance)
+    if distance == 0:
+        return 0.0, 0.0, 0.0
+    ramps = speed ** 2 / (2 * acceleration) + speed ** 2 / (2 * deceleration)
+    if distance < ramps: # triangular profile, the slew speed is never reached
+        speed = math.sqrt(2 * distance * acceleration * deceleration / (acceleration + deceleration))
+        return speed / acceleration, 0.0, speed / deceleration
+    return speed / acceleration, (distance - ramps) / speed, speed / deceleration
+
+
+def time_at(travelled, distance, acceleration, deceleration, speed):
+    """Returns the time after BG at which a move of distance counts has covered travelled counts, in seconds."""
+    distance = abs(distance)
+    travelled = min(max(travelled, 0), distance)
+    t_acc, t_flat, t_dec = trapezoid(distance, acceleration, deceleration, speed)
+    peak = acceleration * t_acc
+    s_acc = peak * t_acc / 2
+    if travelled <= s_acc:
+        return math.sqrt(2 * travelled / acceleration)
+    if travelled <= s_acc + peak * t_flat:
+        return t_acc + (travelled - s_acc) / peak
+    return t_acc + t_flat + t_dec - math.sqrt(2 * (distance - travelled) / deceleration)
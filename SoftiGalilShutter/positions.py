@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Table of named positions and their tolerance windows
+
+"""
+
+from array import array
+from bisect import bisect_right
+
+
+def parse(entries, default_tolerance):
+    """Parses name:position[:tolerance] entries into (name, position, tolerance) tuples."""
+    table = []
+    for entry in entries:
+        fields = entry.split(':')
+        if len(fields) not in (2, 3) or not fields[0]:
+            raise ValueError(f'invalid position entry {entry!r}, expected name:position[:tolerance]')
+        tolerance = int(fields[2]) if len(fields) == 3 else default_tolerance
+        table.append((fields[0], int(fields[1]), tolerance))
+    return table
+
+
+class PositionTable:
+    """
+    Non-overlapping windows (position - tolerance, position + tolerance), sorted by
+    position, so that a position is classified with one binary search.
+    """
+
+    def __init__(self, entries, move_command):
+        entries = sorted(entries, key=lambda e: e[1])
+        names = [name for name, _, _ in entries]
+        if len(set(names)) != len(names):
+            raise ValueError(f'duplicate position names in {names}')
+        self.names = names
+        self.targets = {name: position for name, position, _ in entries}
+        self._lows = array('d', [position - tolerance for _, position, tolerance in entries])
+        self._highs = array('d', [position + tolerance for _, position, tolerance in entries])
+        for i in range(1, len(entries)):
+            if self._highs[i - 1] > self._lows[i]:
+                raise ValueError(f'the windows of {names[i - 1]} and {names[i]} overlap')
+        self.commands = {name: move_command(position) for name, position, _ in entries}
+
+    def lookup(self, position):
+        """Returns the name of the window containing position, or None."""
+        i = bisect_right(self._lows, position) - 1
+        if i >= 0 and self._lows[i] < position < self._highs[i]:
+            return self.names[i]
+        return None
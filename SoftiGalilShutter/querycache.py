@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Short TTL cache for read-only controller queries
+
+"""
+
+import threading
+import time
+
+
+class _Flight:
+    """A query in progress that other callers can wait for."""
+
+    def __init__(self, generation):
+        self.generation = generation # of the cache when the query was sent
+        self._done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def finish(self, value=None, error=None):
+        self.value = value
+        self.error = error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class QueryCache:
+    """
+    Caches the responses of read-only queries for ttl seconds.
+
+    Concurrent requests for the same query while it is being fetched are
+    coalesced: only the first caller talks to the controller, the others
+    wait for its response (or its exception). A response to a query sent
+    before the last invalidate() is returned to its callers but not cached.
+    """
+
+    def __init__(self, fetch, ttl=0.02):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {} #query -> (monotonic timestamp, response)
+        self._flights = {} #query -> _Flight
+        self._generation = 0 #incremented by invalidate()
+
+    def get(self, query):
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            flight = self._flights.get(query)
+            if flight is not None:
+                leader = False
+            else:
+                leader = True
+                flight = self._flights[query] = _Flight(self._generation)
+        if not leader:
+            return flight.wait()
+        try:
+            value = self._fetch(query)
+        except Exception as e:
+            with self._lock:
+                self._land(query, flight)
+            flight.finish(error=e)
+            raise
+        with self._lock:
+            if flight.generation == self._generation:
+                self._entries[query] = (time.monotonic(), value)
+            self._land(query, flight)
+        flight.finish(value)
+        return value
+
+    def _land(self, query, flight):
+        if self._flights.get(query) is flight:
+            del self._flights[query]
+
+    def invalidate(self):
+        """Drops all cached responses, e.g. after a motion command; queries in flight are sent again."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._flights.clear()
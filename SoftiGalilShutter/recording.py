@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Controller-side trajectory recording (RA/RD/RC) of the moves
+
+"""
+
+from collections import deque
+
+import numpy
+
+# Controller arrays and the operands recorded into them
+POSITION = ('rtp', '_TPA')
+ERROR = ('rte', '_TEA')
+VELOCITY = ('rtv', '_TVA')
+
+
+class Trajectories:
+    """The last trajectories of each recorded signal, NaN padded to the record length."""
+
+    def __init__(self, samples, history):
+        self.samples = samples
+        self.position = deque(maxlen=history)
+        self.error = deque(maxlen=history)
+        self.velocity = deque(maxlen=history)
+
+    def append(self, signal, values):
+        row = numpy.full(self.samples, numpy.nan)
+        row[:len(values)] = values
+        getattr(self, signal).append(row)
+
+    def image(self, signal):
+        rows = getattr(self, signal)
+        if not rows:
+            return numpy.zeros((0, self.samples))
+        return numpy.vstack(rows)
+
+    def last(self, signal):
+        rows = getattr(self, signal)
+        return rows[-1] if rows else numpy.zeros(0)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Replay of recorded controller traffic
+
+A connection recorded with gclib.TransactionRecorder (the traffic_log
+property of the device) can be served back to the device by setting its
+host property to replay:<path>. Summarize logs to compare latency profiles:
+
+    python -m SoftiGalilShutter.replay before.gcl after.gcl
+"""
+
+import sys
+import time
+from collections import deque
+
+if not __package__: # imported by the device server run as a script
+    import gclib
+else:
+    import SoftiGalilShutter.gclib as gclib
+
+
+class ReplayConnection(gclib.py):
+    """
+    Serves the responses of a transaction log in place of a controller.
+
+    Responses are matched by function and command text and served in the
+    recorded order; once a command's recorded responses are used up its last
+    one is repeated. Each response is delayed by its recorded latency times
+    time_scale (0 answers immediately).
+    """
+
+    def __init__(self, path, time_scale=1.0):
+        super().__init__()
+        self.path = path
+        self.time_scale = time_scale
+        self._replies = {} #(function, command) -> deque of (latency, response, return code)
+        for _, latency, function, command, response, return_code in gclib.read_transactions(path):
+            self._replies.setdefault((function, command), deque()).append((latency, response, return_code))
+
+    def _next_reply(self, function, text):
+        replies = self._replies.get((function, text or ''))
+        if replies is None:
+            if function == 'GCommand':
+                return 0.0, b'', gclib.G_BAD_RESPONSE_QUESTION_MARK
+            return 0.0, b'', gclib.G_NO_ERROR
+        return replies.popleft() if len(replies) > 1 else replies[0]
+
+    def _transact(self, kind, func, args, sent=0, reads=False, locked=True, text=None):
+        function = func.__name__
+        with self._lock:
+            start = time.perf_counter()
+            latency, response, return_code = self._next_reply(function, text)
+            if latency * self.time_scale > 0:
+                time.sleep(latency * self.time_scale)
+            end = time.perf_counter()
+        if function == 'GOpen' and return_code == gclib.G_NO_ERROR:
+            self._gcon.value = 1
+        self._account(kind, function, text, start, end, sent, response, return_code)
+        gclib._rc(return_code)
+        return response
+
+    def GVersion(self):
+        return 'py.replay'
+
+    def GInfo(self):
+        return f'replay of {self.path}'
+
+    def GTimeout(self, timeout):
+        self._timeout = timeout
+
+
+def summary(path):
+    """Returns {command type: (count, p50, p99, errors)} of a transaction log, latencies in ms."""
+    latencies = {}
+    errors = {}
+    for _, latency, function, command, _, return_code in gclib.read_transactions(path):
+        kind = gclib._command_kind(command) if function == 'GCommand' else function
+        latencies.setdefault(kind, []).append(latency * 1000)
+        errors[kind] = errors.get(kind, 0) + (return_code != gclib.G_NO_ERROR)
+    result = {}
+    for kind, values in latencies.items():
+        values.sort()
+        result[kind] = (len(values), values[len(values) // 2],
+                        values[min(len(values) - 1, int(len(values) * 0.99))], errors[kind])
+    return result
+
+
+def main(paths):
+    summaries = [summary(path) for path in paths]
+    kinds = sorted(set().union(*summaries))
+    print(f'{"kind":<20}' + ''.join(f'{path[-30:]:>36}' for path in paths))
+    print(f'{"":<20}' + f'{"count":>9}{"p50 ms":>9}{"p99 ms":>9}{"errors":>9}' * len(paths))
+    for kind in kinds:
+        row = f'{kind:<20}'
+        for s in summaries:
+            count, p50, p99, errors = s.get(kind, (0, 0.0, 0.0, 0))
+            row += f'{count:>9}{p50:>9.3f}{p99:>9.3f}{errors:>9}'
+        print(row)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
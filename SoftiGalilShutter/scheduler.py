@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Bounded queue of move requests run one after the other on a worker thread
+
+"""
+
+import itertools
+from collections import OrderedDict, deque
+from threading import Condition, Thread
+
+FIFO = 'fifo' # every request runs, requests beyond the queue size are dropped
+LATEST = 'latest' # a new request replaces the pending ones (last writer wins)
+MODES = (FIFO, LATEST)
+
+# Request states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+DROPPED = 'dropped'
+COALESCED = 'coalesced'
+CANCELLED = 'cancelled'
+UNKNOWN = 'unknown'
+HISTORY = 1000 # states kept for status()
+
+
+class CommandQueue:
+    """
+    Runs execute(name) for the submitted requests on its own thread. execute
+    returns True when the request succeeded. on_change(request_id, name, state)
+    is called after every state change, never with the queue lock held.
+    """
+
+    def __init__(self, execute, size, mode, on_change=None):
+        if mode not in MODES:
+            raise ValueError(f'queue mode {mode!r} is not one of {MODES}')
+        self.size = size
+        self.mode = mode
+        self.drops = 0
+        self.coalesced = 0
+        self.completed = 0
+        self._execute = execute
+        self._on_change = on_change
+        self._pending = deque()
+        self._running = None
+        self._states = OrderedDict()
+        self._ids = itertools.count(1)
+        self._condition = Condition()
+        self._stopped = False
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def depth(self):
+        """Pending requests plus the running one."""
+        return len(self._pending) + (self._running is not None)
+
+    def _set(self, request_id, name, state, changes):
+        self._states[request_id] = state
+        self._states.move_to_end(request_id)
+        if len(self._states) > HISTORY:
+            self._states.popitem(last=False)
+        changes.append((request_id, name, state))
+
+    def _notify(self, changes):
+        if self._on_change is not None:
+            for change in changes:
+                self._on_change(*change)
+
+    def submit(self, name):
+        """Queues a request and returns its id."""
+        changes = []
+        with self._condition:
+            request_id = next(self._ids)
+            if self.mode == LATEST:
+                while self._pending:
+                    self._set(*self._pending.popleft(), COALESCED, changes)
+                    self.coalesced += 1
+            if len(self._pending) >= self.size:
+                self.drops += 1
+                self._set(request_id, name, DROPPED, changes)
+            else:
+                self._pending.append((request_id, name))
+                self._set(request_id, name, QUEUED, changes)
+                self._condition.notify()
+        self._notify(changes)
+        return request_id
+
+    def cancel(self):
+        """Drops the pending requests, the running one completes."""
+        changes = []
+        with self._condition:
+            while self._pending:
+                self._set(*self._pending.popleft(), CANCELLED, changes)
+        self._notify(changes)
+
+    def state(self, request_id):
+        with self._condition:
+            return self._states.get(request_id, UNKNOWN)
+
+    def stop(self):
+        self.cancel()
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            changes = []
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                request_id, name = self._running = self._pending.popleft()
+                self._set(request_id, name, RUNNING, changes)
+            self._notify(changes)
+            try:
+                ok = self._execute(name)
+            except Exception as e:
+                print(f'Error in the queued request {request_id} ({name}): {e}')
+                ok = False
+            changes = []
+            with self._condition:
+                self._running = None
+                self.completed += 1
+                self._set(request_id, name, DONE if ok else FAILED, changes)
+            self._notify(changes)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Shared-memory export of the shutter status for processes on the same host
+
+The device server writes a memory-mapped file (typically under /dev/shm) and
+local readers map it with NumPy, without Tango or network round trips:
+
+    from SoftiGalilShutter.shmstatus import StatusReader
+    reader = StatusReader('/dev/shm/galil_shutter')
+    snapshot = reader.read()
+    times, positions = reader.history()
+
+The file is a seqlock: the writer makes seq odd before it updates the record
+and even again afterwards, readers retry until they saw the same even seq
+before and after copying. This module only depends on NumPy.
+"""
+
+import os
+import time
+
+import numpy
+
+MAGIC = 0x47534853 # 'SHSG'
+VERSION = 1
+# tango.DevState values, so readers do not need PyTango
+STATE_NAMES = ('ON', 'OFF', 'CLOSE', 'OPEN', 'INSERT', 'EXTRACT', 'MOVING', 'STANDBY',
+               'FAULT', 'INIT', 'RUNNING', 'ALARM', 'DISABLE', 'UNKNOWN')
+
+_HEADER = [
+    ('magic', '<u4'),
+    ('version', '<u4'),
+    ('seq', '<u8'),
+    ('history_size', '<u4'),
+    ('state', '<i4'),
+    ('timestamp', '<f8'),
+    ('position', '<i8'),
+    ('switches', '<i4'),
+    ('inputs', '<i4'), # bit 0 is digital input 1
+    ('moving', '<i4'),
+    ('motor_off', '<i4'),
+    ('history_count', '<u8'), # samples written so far, the next slot is history_count % history_size
+]
+SNAPSHOT_FIELDS = ('seq', 'timestamp', 'position', 'state', 'switches', 'inputs', 'moving', 'motor_off')
+
+
+def layout(history_size):
+    """Returns the record dtype of a file holding history_size position samples."""
+    return numpy.dtype(_HEADER + [
+        ('history_time', '<f8', (history_size,)),
+        ('history_position', '<i8', (history_size,)),
+    ])
+
+
+def _reusable(path, history_size):
+    """True if path is a status file of this layout, which readers may have mapped."""
+    dtype = layout(history_size)
+    if not os.path.exists(path) or os.path.getsize(path) != dtype.itemsize:
+        return False
+    header = numpy.memmap(path, dtype=numpy.dtype(_HEADER), mode='r', shape=(1,))[0]
+    return header['magic'] == MAGIC and header['version'] == VERSION and header['history_size'] == history_size
+
+
+class StatusWriter:
+    """
+    Single writer of the status file. An existing file of the same layout is
+    updated in place and any other one replaced by a new file: truncating a
+    file would crash the readers that have it mapped.
+    """
+
+    def __init__(self, path, history_size):
+        reuse = _reusable(path, history_size)
+        if not reuse and os.path.exists(path):
+            os.remove(path) # readers keep the old mapping until they reopen
+        self._map = numpy.memmap(path, dtype=layout(history_size), mode='r+' if reuse else 'w+', shape=(1,))
+        self._record = self._map[0]
+        self._seq = self._map['seq']
+        self._size = history_size
+        if reuse:
+            self._seq[0] += self._seq[0] & 1 # a writer stopped in the middle of an update
+            self._count = int(self._record['history_count'])
+        else:
+            self._record['magic'] = MAGIC
+            self._record['version'] = VERSION
+            self._record['history_size'] = history_size
+            self._count = 0
+
+    def publish(self, timestamp, position, state, switches, inputs, moving, motor_off):
+        """Writes a snapshot and appends the position to the history."""
+        record = self._record
+        self._seq[0] += 1 # odd: update in progress
+        record['timestamp'] = timestamp
+        record['position'] = position
+        record['state'] = state
+        record['switches'] = switches
+        record['inputs'] = inputs
+        record['moving'] = moving
+        record['motor_off'] = motor_off
+        slot = self._count % self._size
+        record['history_time'][slot] = timestamp
+        record['history_position'][slot] = position
+        self._count += 1
+        record['history_count'] = self._count
+        self._seq[0] += 1
+
+    def close(self):
+        self._map.flush()
+        del self._record, self._seq, self._map
+
+
+class StatusReader:
+    """Lock-free reader of the status file."""
+
+    def __init__(self, path):
+        header = numpy.memmap(path, dtype=numpy.dtype(_HEADER), mode='r', shape=(1,))[0]
+        if header['magic'] != MAGIC or header['version'] != VERSION:
+            raise ValueError(f'{path} is not a shutter status file')
+        self._map = numpy.memmap(path, dtype=layout(int(header['history_size'])), mode='r', shape=(1,))
+        self._seq = self._map['seq']
+        self._record = self._map[0]
+
+    def _consistent(self, copy, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            before = int(self._seq[0])
+            if not before & 1:
+                value = copy()
+                if int(self._seq[0]) == before:
+                    return before, value
+            if time.monotonic() > deadline:
+                raise TimeoutError('the status file is not being updated consistently')
+
+    def read(self, timeout=0.1):
+        """Returns the latest snapshot as a dictionary."""
+        record = self._record
+        seq, values = self._consistent(lambda: [record[name].item() for name in SNAPSHOT_FIELDS[1:]], timeout)
+        snapshot = dict(zip(SNAPSHOT_FIELDS, [seq] + values))
+        snapshot['state_name'] = STATE_NAMES[snapshot['state']]
+        return snapshot
+
+    def history(self, timeout=0.1):
+        """Returns the recent (times, positions), oldest first."""
+        record = self._record
+
+        def copy():
+            return (int(record['history_count']), record['history_time'].copy(),
+                    record['history_position'].copy())
+
+        _, (count, times, positions) = self._consistent(copy, timeout)
+        size = len(times)
+        order = numpy.arange(count - min(count, size), count) % size
+        return times[order], positions[order]
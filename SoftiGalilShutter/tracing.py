@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the SoftiGalilShutter project
+#
+#
+# Distributed under the terms of the GPL license.
+# See LICENSE.txt for more info.
+
+""" Trace capture in Chrome trace (Perfetto) format
+
+"""
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class TraceBuffer:
+    """
+    Fixed size ring buffer of completed spans.
+
+    Writers never block: the slot index comes from an itertools counter and the
+    slot is filled with a single list store, both atomic under the GIL. When the
+    buffer is full the oldest spans are overwritten.
+    """
+
+    def __init__(self, size=65536):
+        self._size = size
+        self.clear()
+
+    def clear(self):
+        self._slots = [None] * self._size
+        self._counter = itertools.count()
+
+    def add(self, category, name, start, end, args=None):
+        """Records a span, start and end are time.perf_counter() values."""
+        self._slots[next(self._counter) % self._size] = (
+            category, name, start, end, threading.get_ident(), args)
+
+    def events(self):
+        """Returns the recorded spans ordered by start time."""
+        return sorted((event for event in list(self._slots) if event is not None),
+                      key=lambda event: event[2])
+
+    def to_chrome(self):
+        """Returns the buffer as Chrome trace event JSON, loadable in chrome://tracing or Perfetto."""
+        pid = os.getpid()
+        trace_events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread.ident,
+             'args': {'name': thread.name}}
+            for thread in threading.enumerate()
+        ]
+        for category, name, start, end, tid, args in self.events():
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': start * 1e6,
+                'dur': (end - start) * 1e6,
+                'pid': pid,
+                'tid': tid,
+            }
+            if args:
+                event['args'] = args
+            trace_events.append(event)
+        return json.dumps({'traceEvents': trace_events, 'displayTimeUnit': 'ms'})
+
+
+def traced(func):
+    """Records entry and exit of a device method in the device's _tracer, if one is set."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        tracer = self._tracer
+        if tracer is None:
+            return func(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            tracer.add('tango', name, start, time.perf_counter())
+    return wrapper
@@ -15,6 +15,7 @@ setup(
     entry_points={
         'console_scripts': [
             'SoftiGalilShutter = SoftiGalilShutter.SoftiGalilShutter:main',
+            'SoftiGalilShutterGroup = SoftiGalilShutter.SoftiGalilShutterGroup:main',
         ],
     },
 )
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+from tango.test_context import DeviceTestContext
+
+from SoftiGalilShutter.SoftiGalilShutter import SoftiGalilShutter
+
+
+@pytest.fixture
+def shutter():
+    """Returns a function starting a SoftiGalilShutter on the emulator, stopped after the test."""
+    contexts = []
+
+    def start(**properties):
+        properties.setdefault('host', 'emulator:0.2')
+        context = DeviceTestContext(SoftiGalilShutter, properties=properties, process=True)
+        contexts.append(context)
+        return context.__enter__()
+
+    yield start
+    for context in reversed(contexts):
+        context.__exit__(None, None, None)
+
+
+@pytest.fixture
+def wait_until():
+    """Returns a function polling predicate until it is true, failing after timeout s."""
+
+    def wait(predicate, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            assert time.monotonic() < deadline, 'timed out'
+            time.sleep(0.01)
+
+    return wait
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+import tango
+
+from SoftiGalilShutter.autotune import Profile, fastest, profiles
+
+
+def test_profiles_stay_within_the_safe_bounds():
+    grid = list(profiles([1000, 5000], [1000], [100, 900], [0.5, 1.0, 0], 2000, 500))
+    assert grid == [Profile(1000, 1000, 100, 0.5), Profile(1000, 1000, 100, 1.0)]
+
+
+def test_a_deceleration_beyond_the_bound_is_left_out():
+    assert list(profiles([1000], [3000], [100], [1.0], 2000, 500)) == []
+
+
+def result(settle_time, overshoot=0, settled=True):
+    return {'settle_time': settle_time, 'overshoot': overshoot, 'settled': settled}
+
+
+def test_fastest_skips_moves_that_overshoot_or_never_settle():
+    results = [result(10, overshoot=50), result(20, settled=False), result(40), result(30)]
+    assert fastest(results, tolerance=25) == result(30)
+
+
+def test_fastest_without_a_clean_result():
+    assert fastest([result(10, overshoot=50)], tolerance=25) is None
+
+
+def test_autotune_is_refused_under_external_control(shutter):
+    dev = shutter()
+    with pytest.raises(tango.DevFailed):
+        dev.AutoTune(False) # init hands the shutter to the control input
+
+
+def test_autotune_reports_an_empty_sweep(shutter, wait_until):
+    dev = shutter(max_speed=1) # no profile is within the bounds
+    dev.SoftCtrl()
+    dev.AutoTune(True)
+    wait_until(lambda: dev.autotune_status != 'Sweeping 0 profiles')
+    assert dev.autotune_status == 'No profile settled within the closing tolerance'
+    assert json.loads(dev.autotune_result) == {'best': None, 'results': []}
@@ -0,0 +1,24 @@
+import json
+
+from tango import DevState
+
+
+def test_homing_on_startup_calibrates_the_encoder(shutter):
+    dev = shutter(home_on_startup=True)
+    assert dev.calibrated
+    assert dev.State() != DevState.FAULT
+
+
+def test_a_stale_record_is_not_trusted(shutter):
+    record = {'token': 7, 'offset': 0, 'position': 0}
+    dev = shutter(calibration=json.dumps(record))
+    assert not dev.calibrated # the emulator starts without calref
+
+
+def test_find_index_calibrates_and_a_reset_forgets(shutter, wait_until):
+    dev = shutter()
+    assert not dev.calibrated
+    dev.FindIndex()
+    wait_until(lambda: dev.calibrated, timeout=10)
+    dev.GalilSoftReset()
+    assert not dev.calibrated
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+from tango import DevState
+from tango.test_context import DeviceTestContext
+
+from SoftiGalilShutter.SoftiGalilShutter import SoftiGalilShutter
+
+
+def _wait(dev, request_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while dev.RequestState(request_id) not in ('done', 'failed'):
+        assert time.monotonic() < deadline, dev.RequestState(request_id)
+        time.sleep(0.01)
+    return dev.RequestState(request_id)
+
+
+def _session(dev):
+    """Homes, then opens and closes the shutter; returns the requests and where each one ended."""
+    seen = []
+    dev.SoftCtrl()
+    dev.FindIndex()
+    deadline = time.monotonic() + 5
+    while not dev.calibrated:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    for name in ('Open', 'Close'):
+        request_id = getattr(dev, name)()
+        seen.append((name, _wait(dev, request_id), dev.abs_position))
+    return seen
+
+
+@pytest.fixture(scope='module')
+def recorded(tmp_path_factory):
+    """A session on the emulator with its traffic log."""
+    path = str(tmp_path_factory.mktemp('traffic') / 'session.gcl')
+    properties = {'host': 'emulator:0.2', 'traffic_log': path, 'enable_interrupts': False, 'probe_period': 0}
+    with DeviceTestContext(SoftiGalilShutter, properties=properties, process=True) as dev:
+        seen = _session(dev)
+    return path, seen
+
+
+def test_emulator_session(recorded):
+    _, seen = recorded
+    assert seen == [('Open', 'done', 7000), ('Close', 'done', 7500)]
+
+
+def test_replay_serves_the_recorded_session(recorded):
+    path, seen = recorded
+    properties = {'host': f'replay:{path}', 'replay_time_scale': 0, 'enable_interrupts': False, 'probe_period': 0}
+    with DeviceTestContext(SoftiGalilShutter, properties=properties, process=True) as dev:
+        # the number of status polls differs from the recording, so does the state at a given moment
+        assert _session(dev) == seen
+
+
+
+def test_a_missing_replay_log_faults_the_device(shutter, tmp_path):
+    dev = shutter(host=f'replay:{tmp_path / "missing.gcl"}')
+    assert dev.State() == DevState.FAULT
+    assert 'missing.gcl' in dev.Status()
+    dev.Init() # delete_device copes with the connection that was never created
+    assert dev.State() == DevState.FAULT
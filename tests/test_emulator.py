@@ -0,0 +1,32 @@
+import pytest
+from tango import DevState
+
+from SoftiGalilShutter import emulator
+
+
+def test_moves_follow_the_profile_and_complete():
+    g = emulator.EmulatedController()
+    g.GOpen('emulator')
+    g.GCommand('SH;SPA=100000;ACA=1000000;DCA=1000000')
+    g.GCommand('PAA=7000;BGA')
+    assert g.GCommand('MG _BGA') == '1.0000'
+    g.GCommand('AMA')
+    assert g.GCommand('TP') == '7000'
+    assert g.GCommand('MG _BGA,_SCA') == '0.0000 1.0000'
+
+
+def test_a_program_runs_up_to_its_first_jump():
+    g = emulator.EmulatedController()
+    g.GOpen('emulator')
+    g.GProgramDownload('#A;x=1\nIF(x=1);y=2;ELSE;y=3;ENDIF\n#L;JP#L\n#B;z=4;EN', '')
+    g.GCommand('XQ#A,1;XQ#B,2')
+    assert g.GCommand('MG x,y,z,_XQ1,_XQ2') == '1.0000 2.0000 4.0000 0.0000 -1.0000'
+    g.GCommand('HX1')
+    assert g.GCommand('MG _XQ1') == '-1.0000'
+
+
+@pytest.mark.parametrize('host', ['emulator:fast', 'emulator:-5'])
+def test_a_bad_latency_faults_the_device(shutter, host):
+    dev = shutter(host=host)
+    assert dev.State() == DevState.FAULT
+    assert 'emulator latency' in dev.Status()
@@ -0,0 +1,31 @@
+from SoftiGalilShutter import emulator, firmware
+
+
+def controller(input1):
+    g = emulator.EmulatedController()
+    g.GOpen('emulator')
+    g.GProgramDownload(firmware.PROGRAM, '--max 3')
+    g.GCommand('opn=7000;cls=7500;acc=256000;dec=256000;spd=25000;its=1;mode=0')
+    g.GCommand(f'XQ#INIT,{firmware.SUPERVISOR_THREAD}')
+    g.set_input(1, input1)
+    return g
+
+
+def test_ext_follows_the_input():
+    g = controller(input1=0)
+    g.GCommand('epos=0;XQ#EXT,4')
+    assert g.GCommand('MG epos,_BGA') == '1.0000 1.0000'
+    g.GCommand('AMA')
+    assert g.GCommand('TP') == '7000'
+
+
+def test_ext_waits_for_the_move_in_progress():
+    g = controller(input1=0)
+    g.GCommand('PAA=7300;BGA') # a Tango move still running at the hand-over
+    g.GCommand('epos=0;XQ#EXT,4')
+    assert g.GCommand('MG epos') == '0.0000' # the next pass follows the input
+    g.GCommand('AMA')
+    g.GCommand('XQ#EXT,4')
+    assert g.GCommand('MG epos,_BGA') == '1.0000 1.0000'
+    g.GCommand('AMA')
+    assert g.GCommand('TP') == '7000'
@@ -0,0 +1,31 @@
+import pytest
+
+from SoftiGalilShutter import gclib
+
+
+def test_transaction_log_round_trip(tmp_path):
+    path = str(tmp_path / 'traffic.gcl')
+    recorder = gclib.TransactionRecorder(path)
+    recorder.write('GCommand', 'MG _TPA', b' 7000.0000\r\n:', 1.0, 1.002, gclib.G_NO_ERROR)
+    recorder.write('GProgramDownload', None, b'', 2.0, 2.5, gclib.G_NO_ERROR)
+    recorder.write('GCommand', 'XY', b'', 3.0, 3.001, gclib.G_BAD_RESPONSE_QUESTION_MARK)
+    recorder.close()
+    records = list(gclib.read_transactions(path))
+    assert [(function, command, response, rc) for _, _, function, command, response, rc in records] == [
+        ('GCommand', 'MG _TPA', b' 7000.0000\r\n:', gclib.G_NO_ERROR),
+        ('GProgramDownload', '', b'', gclib.G_NO_ERROR),
+        ('GCommand', 'XY', b'', gclib.G_BAD_RESPONSE_QUESTION_MARK),
+    ]
+    latencies = [latency for _, latency, _, _, _, _ in records]
+    assert abs(latencies[0] - 0.002) < 1e-6
+    assert abs(latencies[1] - 0.5) < 1e-6
+    starts = [start for start, _, _, _, _, _ in records]
+    assert starts == sorted(starts)
+
+
+def test_read_transactions_refuses_other_files(tmp_path):
+    path = tmp_path / 'other'
+    path.write_bytes(b'not a log')
+    with pytest.raises(ValueError):
+        list(gclib.read_transactions(str(path)))
+
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+import tango
+from tango import DevState
+from tango.test_context import DeviceTestContext
+
+from SoftiGalilShutter import emulator
+from SoftiGalilShutter.SoftiGalilShutterGroup import SoftiGalilShutterGroup
+
+
+@pytest.fixture
+def group():
+    properties = {'hosts': ['emulator:0.2', 'emulator:0.5', 'emulator'], 'close_positions': [7500, 7500, 7400]}
+    with DeviceTestContext(SoftiGalilShutterGroup, properties=properties, process=True) as dev:
+        yield dev
+
+
+def test_members_move_together(group, wait_until):
+    assert group.State() == DevState.ALARM # the third member is not at its close position
+    completed = []
+    group.subscribe_event('completed', tango.EventType.CHANGE_EVENT,
+                          lambda event: event.err or completed.append(event.attr_value.value))
+    group.Open()
+    wait_until(lambda: group.State() != DevState.MOVING)
+    assert group.State() == DevState.OPEN
+    assert list(group.positions) == [7000, 7000, 7000]
+    assert list(group.member_states) == ['OPEN'] * 3
+    assert len(group.fire_offsets) == 3 and 0 <= group.skew < 50
+    assert group.group_time > 0 and 0 <= group.arrival_skew < group.group_time
+    wait_until(lambda: 1 in completed)
+    group.Close()
+    wait_until(lambda: group.State() != DevState.MOVING)
+    assert group.State() == DevState.CLOSE and group.completed == 2
+
+
+def test_stage_then_fire(group, wait_until):
+    with pytest.raises(tango.DevFailed):
+        group.Fire() # nothing staged
+    with pytest.raises(tango.DevFailed):
+        group.Stage('ajar')
+    group.Stage('open')
+    assert group.staged == 'open'
+    group.Fire()
+    wait_until(lambda: group.State() == DevState.OPEN)
+    assert group.staged == ''
+
+
+def _members(*members):
+    connections = []
+    for moving, mode in members:
+        g = emulator.EmulatedController()
+        g.GOpen('emulator')
+        g.GCommand('SH')
+        if mode is not None:
+            g.GCommand(f'mode={mode}')
+        if moving:
+            g.GCommand('PAA=7000;BGA')
+        connections.append(g)
+    fake = SimpleNamespace(hosts=[f'h{i}' for i in range(len(members))], _members=connections)
+    fake._external_members = lambda: SoftiGalilShutterGroup._external_members(fake)
+    return fake
+
+
+def test_busy_members_are_named():
+    fake = _members((False, None), (True, 0), (False, 1), (True, 1))
+    assert SoftiGalilShutterGroup._busy_members(fake) == [
+        'h2 (external control)', 'h3 (external control)', 'h1 (moving)']
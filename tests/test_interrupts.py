@@ -0,0 +1,63 @@
+import socket
+
+import tango
+
+from SoftiGalilShutter import interrupts
+
+
+def test_ei_command_enables_axis_a_input_1_and_the_limits():
+    assert interrupts.ei_command() == f'EI {1 | interrupts.LIMIT_SWITCH_BIT},1'
+    assert interrupts.ei_command(axes=(0, 1), inputs=(1, 3), limits=False) == 'EI 3,5'
+
+
+def test_describe_names_the_status_bytes():
+    assert interrupts.describe(interrupts.MOTION_COMPLETE) == 'motionA'
+    assert interrupts.describe(interrupts.INPUT + 1) == 'input1'
+    assert interrupts.describe(0x42) == '0x42'
+
+
+def test_udp_listener_receives_the_sent_bytes():
+    listener = interrupts.UdpListener(timeout=50)
+    try:
+        assert listener.wait() is None # timed out
+        interrupts.send(listener.address, interrupts.INPUT + 1)
+        assert listener.wait() == interrupts.INPUT + 1
+    finally:
+        listener.close()
+
+
+def test_gclib_listener_has_a_direct_connection_of_its_own(monkeypatch):
+    opened = []
+
+    class Connection:
+        def GOpen(self, address):
+            opened.append(address)
+
+        def GTimeout(self, timeout):
+            pass
+
+    monkeypatch.setattr(interrupts.gclib, 'py', Connection)
+    interrupts.GclibListener('192.168.0.10')
+    assert opened == ['192.168.0.10 --direct --subscribe EI']
+
+
+def test_moves_push_interrupt_events(shutter, wait_until):
+    dev = shutter()
+    events = []
+    dev.subscribe_event('last_interrupt', tango.EventType.CHANGE_EVENT,
+                        lambda event: event.err or events.append(event.attr_value.value))
+    dev.SoftCtrl()
+    request_id = dev.Open()
+    wait_until(lambda: dev.RequestState(request_id) == 'done')
+    wait_until(lambda: 'motionA' in events)
+    assert dev.interrupt_count >= 1
+
+
+def test_a_busy_interrupt_port_falls_back_to_polling(shutter, wait_until):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as busy:
+        busy.bind(('127.0.0.1', 0))
+        dev = shutter(interrupt_port=busy.getsockname()[1])
+        dev.SoftCtrl()
+        request_id = dev.Open()
+        wait_until(lambda: dev.RequestState(request_id) == 'done')
+        assert dev.interrupt_count == 0
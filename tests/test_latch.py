@@ -0,0 +1,41 @@
+import re
+
+import numpy
+
+from SoftiGalilShutter.latch import History, ring_order
+
+
+def test_ring_order_returns_the_new_slots_oldest_first():
+    assert list(ring_order(count=5, seen=3, next_slot=5, size=8)) == [3, 4]
+    assert list(ring_order(count=10, seen=7, next_slot=2, size=8)) == [7, 0, 1] # wrapped
+
+
+def test_ring_order_keeps_only_what_the_ring_still_holds():
+    assert list(ring_order(count=20, seen=0, next_slot=4, size=8)) == [4, 5, 6, 7, 0, 1, 2, 3]
+
+
+def test_history_keeps_the_newest_records():
+    history = History(3)
+    history.extend(numpy.array([1.0, 2.0]), numpy.array([10, 20]), numpy.array([0, 1]))
+    history.extend(numpy.array([3.0, 4.0]), numpy.array([30, 40]), numpy.array([-1, 0]))
+    assert list(history.times) == [2.0, 3.0, 4.0]
+    assert list(history.positions) == [20, 30, 40]
+    assert list(history.sources) == [1, -1, 0]
+
+
+def status_queries(dev):
+    match = re.search(r'galil_transactions_total\{kind="MG"\} (\d+)', dev.metrics)
+    return int(match.group(1)) if match else 0
+
+
+def test_latch_attributes_share_one_upload_per_read(shutter):
+    dev = shutter(latch_thresholds=[1000, 5000], query_cache_ttl=60000)
+    dev.State()
+    dev.ResetMetrics()
+    dev.read_attribute('latch_times')
+    one = status_queries(dev)
+    assert one >= 1
+    dev.ResetMetrics()
+    values = [a.value for a in dev.read_attributes(['latch_times', 'latch_positions', 'latch_sources'])]
+    assert status_queries(dev) == one
+    assert [len(v) if v is not None else 0 for v in values] == [0, 0, 0]
@@ -0,0 +1,54 @@
+from SoftiGalilShutter import gclib, metrics
+
+
+def _samples(text):
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+
+def test_render_is_cumulative_openmetrics():
+    stats = gclib.GclibStats()
+    for elapsed in (0.0004, 0.0015, 0.0015, 2.0):
+        stats.record('status', elapsed, 8, 12, gclib.G_NO_ERROR)
+    text = metrics.render(stats.snapshot(), stats.buckets, reconnects=2, hook_seconds=0.5, hook_calls=10)
+    assert text.endswith('# EOF\n')
+    samples = _samples(text)
+    assert samples['galil_transactions_total{kind="status"}'] == '4'
+    assert samples['galil_transaction_seconds_bucket{kind="status",le="0.0005"}'] == '1'
+    assert samples['galil_transaction_seconds_bucket{kind="status",le="0.002"}'] == '3'
+    assert samples['galil_transaction_seconds_bucket{kind="status",le="1.0"}'] == '3'
+    assert samples['galil_transaction_seconds_bucket{kind="status",le="+Inf"}'] == '4'
+    assert float(samples['galil_transaction_seconds_sum{kind="status"}']) == sum((0.0004, 0.0015, 0.0015, 2.0))
+    assert samples['galil_reconnects_total'] == '2'
+    assert samples['galil_hook_seconds_count'] == '10'
+
+
+def test_render_without_transactions():
+    stats = gclib.GclibStats()
+    samples = _samples(metrics.render(stats.snapshot(), stats.buckets))
+    assert samples['galil_errors_total'] == '0'
+    assert not any(name.startswith('galil_transactions_total') for name in samples)
+
+
+def test_stats_histogram():
+    stats = gclib.GclibStats()
+    stats.record('status', 0.0004, 8, 12, gclib.G_NO_ERROR)
+    stats.record('status', 0.003, 8, 12, gclib.G_NO_ERROR)
+    stats.record('command', 0.2, 5, 0, gclib.G_TIMEOUT)
+    snapshot = stats.snapshot()
+    assert stats.transactions == 3
+    assert snapshot['kinds']['status']['count'] == 2
+    assert snapshot['kinds']['status']['buckets'][0] == 1 # <= 0.5 ms
+    assert snapshot['kinds']['status']['buckets'][3] == 1 # <= 5 ms
+    assert snapshot['errors'] == 1 and snapshot['timeouts'] == 1
+    assert snapshot['bytes_sent'] == 21 and snapshot['bytes_received'] == 24
+
+
+def test_device_counts_the_transactions(shutter):
+    dev = shutter()
+    dev.abs_position
+    assert dev.transactions > 0
+    assert dev.bytes_sent > 0 and dev.bytes_received > 0
+    assert 'galil_transactions_total{kind="MG"}' in dev.metrics
+    dev.ResetMetrics()
+    assert dev.transaction_errors == 0 and dev.reconnects == 0
+    assert dev.transactions < 5 # only what the reads since the reset sent
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from tango import DevState
+
+from SoftiGalilShutter import motion
+
+
+def test_trapezoid_reaches_the_slew_speed():
+    t_acc, t_flat, t_dec = motion.trapezoid(10000, 100000, 50000, 10000)
+    assert t_acc == pytest.approx(0.1)
+    assert t_dec == pytest.approx(0.2)
+    # 500 counts accelerating, 1000 decelerating, the rest at 10000 counts/s
+    assert t_flat == pytest.approx(0.85)
+
+
+def test_short_moves_are_triangular():
+    t_acc, t_flat, t_dec = motion.trapezoid(-100, 100000, 100000, 10000)
+    assert t_flat == 0.0
+    assert t_acc == pytest.approx(t_dec)
+    assert 100000 * t_acc ** 2 == pytest.approx(100) # two ramps of 50 counts
+
+
+def test_zero_distance():
+    assert motion.trapezoid(0, 1, 1, 1) == (0.0, 0.0, 0.0)
+
+
+def test_time_at_follows_the_profile():
+    distance, acc, dec, speed = 10000, 100000, 50000, 10000
+    total = sum(motion.trapezoid(distance, acc, dec, speed))
+    assert motion.time_at(0, distance, acc, dec, speed) == 0.0
+    assert motion.time_at(500, distance, acc, dec, speed) == pytest.approx(0.1)
+    assert motion.time_at(5000, distance, acc, dec, speed) == pytest.approx(0.55)
+    assert motion.time_at(distance, distance, acc, dec, speed) == pytest.approx(total)
+    assert motion.time_at(2 * distance, distance, acc, dec, speed) == pytest.approx(total)
+
+
+def _wait_request(dev, request_id, wait_until):
+    wait_until(lambda: dev.RequestState(request_id) in ('done', 'failed'))
+
+
+def test_wait_until_open_does_not_block_the_device(shutter, wait_until):
+    dev = shutter()
+    dev.SoftCtrl()
+    _wait_request(dev, dev.Close(), wait_until)
+    dev.Open()
+    start = time.monotonic()
+    assert dev.WaitUntilOpen(3)
+    assert time.monotonic() - start < 1
+    assert dev.State() in (DevState.OPEN, DevState.MOVING) # settling
+    dev.Close()
+    assert not dev.WaitUntilOpen(0.2) # the opening before Close does not count
+    assert dev.abs_position != 7000
+
+
+def test_the_opening_is_confirmed_past_the_query_cache(shutter):
+    dev = shutter(query_cache_ttl=60000, enable_interrupts=False) # nothing else drops the cache
+    dev.SoftCtrl()
+    dev.Open()
+    assert dev.WaitUntilOpen(3) # a cached status would still show the shutter closed
+    assert dev.open_ready
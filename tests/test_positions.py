@@ -0,0 +1,53 @@
+import pytest
+import tango
+
+from SoftiGalilShutter import positions
+
+
+def _table(entries):
+    return positions.PositionTable(entries, lambda target: f'PA{target};BG A')
+
+
+def test_parse_uses_the_default_tolerance():
+    assert positions.parse(['half:7250', 'slit:7100:5'], 40) == [('half', 7250, 40), ('slit', 7100, 5)]
+
+
+@pytest.mark.parametrize('entry', ['half', ':7250', 'half:7250:5:1'])
+def test_parse_rejects_malformed_entries(entry):
+    with pytest.raises(ValueError):
+        positions.parse([entry], 40)
+
+
+def test_lookup_finds_the_window():
+    table = _table([('close', 7500, 40), ('open', 7000, 40), ('half', 7250, 10)])
+    assert table.names == ['open', 'half', 'close']
+    assert table.lookup(7000) == 'open'
+    assert table.lookup(7039) == 'open'
+    assert table.lookup(7040) is None # the windows are open intervals
+    assert table.lookup(7255) == 'half'
+    assert table.lookup(7300) is None
+    assert table.lookup(6000) is None
+    assert table.commands['half'] == 'PA7250;BG A'
+
+
+def test_overlapping_windows_are_refused():
+    with pytest.raises(ValueError):
+        _table([('open', 7000, 40), ('half', 7050, 20)])
+
+
+def test_duplicate_names_are_refused():
+    with pytest.raises(ValueError):
+        _table([('open', 7000, 40), ('open', 7500, 40)])
+
+
+def test_move_to_a_named_position(shutter, wait_until):
+    dev = shutter(positions=['half:7250:10'])
+    assert sorted(dev.position_names) == ['close', 'half', 'open']
+    assert dev.position_name == 'close'
+    dev.SoftCtrl()
+    request_id = dev.MoveTo('half')
+    wait_until(lambda: dev.RequestState(request_id) == 'done')
+    assert dev.position_name == 'half'
+    assert abs(dev.abs_position - 7250) <= 10
+    with pytest.raises(tango.DevFailed):
+        dev.MoveTo('nowhere')
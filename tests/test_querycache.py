@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from SoftiGalilShutter.querycache import QueryCache
+
+
+class Fetcher:
+    """Answers queries with a counter; a query can be held until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, query):
+        self.calls += 1
+        self.started.set()
+        self.release.wait()
+        return f'{query} {self.calls}'
+
+
+def test_responses_are_reused_within_the_ttl():
+    fetch = Fetcher()
+    cache = QueryCache(fetch, ttl=0.05)
+    assert cache.get('MG _TPA') == 'MG _TPA 1'
+    assert cache.get('MG _TPA') == 'MG _TPA 1'
+    time.sleep(0.06)
+    assert cache.get('MG _TPA') == 'MG _TPA 2'
+
+
+def test_invalidate_drops_the_cached_responses():
+    fetch = Fetcher()
+    cache = QueryCache(fetch, ttl=10)
+    cache.get('TP')
+    cache.invalidate()
+    assert cache.get('TP') == 'TP 2'
+
+
+def test_concurrent_requests_are_coalesced():
+    fetch = Fetcher()
+    fetch.release.clear()
+    cache = QueryCache(fetch, ttl=10)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('TP'))) for _ in range(4)]
+    threads[0].start()
+    fetch.started.wait(1)
+    for t in threads[1:]:
+        t.start()
+    time.sleep(0.05)
+    fetch.release.set()
+    for t in threads:
+        t.join(1)
+    assert results == ['TP 1'] * 4
+    assert fetch.calls == 1
+
+
+def test_a_response_sent_before_invalidate_is_not_cached():
+    fetch = Fetcher()
+    fetch.release.clear()
+    cache = QueryCache(fetch, ttl=10)
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get('TP')))
+    leader.start()
+    fetch.started.wait(1)
+    cache.invalidate() # e.g. a move command went out meanwhile
+    fetch.release.set()
+    leader.join(1)
+    assert results == ['TP 1'] # its caller still gets it
+    assert cache.get('TP') == 'TP 2'
+
+
+def test_errors_reach_every_waiting_caller_and_are_not_cached():
+    calls = []
+
+    def fetch(query):
+        calls.append(query)
+        if len(calls) == 1:
+            raise RuntimeError('timeout')
+        return 'ok'
+
+    cache = QueryCache(fetch, ttl=10)
+    with pytest.raises(RuntimeError):
+        cache.get('TP')
+    assert cache.get('TP') == 'ok'
+
+
+@pytest.mark.parametrize('ttl, fetched', [(60000, lambda n: n < 5), (0, lambda n: n >= 20)])
+def test_device_state_reads_share_the_status_query(shutter, ttl, fetched):
+    dev = shutter(query_cache_ttl=ttl)
+    dev.State()
+    dev.ResetMetrics()
+    for _ in range(20):
+        dev.State()
+    assert fetched(dev.transactions)
@@ -0,0 +1,31 @@
+import numpy
+
+from SoftiGalilShutter.recording import Trajectories
+
+
+def test_rows_are_nan_padded_to_the_record_length():
+    trajectories = Trajectories(samples=4, history=2)
+    trajectories.append('position', [1.0, 2.0])
+    row = trajectories.last('position')
+    assert list(row[:2]) == [1.0, 2.0] and numpy.isnan(row[2:]).all()
+
+
+def test_images_keep_the_last_moves():
+    trajectories = Trajectories(samples=2, history=2)
+    for value in (1.0, 2.0, 3.0):
+        trajectories.append('position', [value, value])
+    assert trajectories.image('position').tolist() == [[2.0, 2.0], [3.0, 3.0]]
+    assert trajectories.image('velocity').shape == (0, 2)
+    assert len(trajectories.last('error')) == 0
+
+
+def test_each_move_adds_a_recorded_row(shutter, wait_until):
+    dev = shutter(record_moves=True, record_velocity=True, record_samples=64, record_rate=2)
+    dev.SoftCtrl()
+    dev.Open()
+    wait_until(lambda: len(dev.trajectories) == 1)
+    assert dev.trajectories.shape == (1, 64)
+    assert dev.trajectory_velocities.shape == (1, 64)
+    assert dev.trajectory_errors.size == 0 # record_error is not set
+    assert len(dev.last_trajectory) == 64
+    assert numpy.allclose(numpy.diff(dev.trajectory_time), 0.004) # 2^2 samples of 1 ms
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+
+import pytest
+import tango
+from tango import DevState
+
+from SoftiGalilShutter import scheduler
+
+
+class Moves:
+    """execute() of a queue; each move is held until released."""
+
+    def __init__(self):
+        self.done = []
+        self.running = threading.Event()
+        self.release = threading.Semaphore(0)
+
+    def __call__(self, name):
+        self.running.set()
+        self.release.acquire()
+        self.done.append(name)
+        return name != 'fail'
+
+
+def _wait_done(queue, request_id):
+    for _ in range(200):
+        if queue.state(request_id) in (scheduler.DONE, scheduler.FAILED):
+            return queue.state(request_id)
+        time.sleep(0.005)
+    raise AssertionError(f'request {request_id} is still {queue.state(request_id)}')
+
+
+def _busy_queue(mode, size=4):
+    """Returns a queue whose first request is running, and the moves."""
+    moves = Moves()
+    changes = []
+    queue = scheduler.CommandQueue(moves, size, mode, on_change=lambda *change: changes.append(change))
+    first = queue.submit('close')
+    moves.running.wait(1)
+    return queue, moves, first, changes
+
+
+def test_unknown_mode_is_refused():
+    with pytest.raises(ValueError):
+        scheduler.CommandQueue(lambda name: True, 4, 'lifo')
+
+
+def test_fifo_runs_every_request_in_order():
+    queue, moves, first, changes = _busy_queue(scheduler.FIFO)
+    ids = [queue.submit(name) for name in ('open', 'close', 'open')]
+    assert queue.depth == 4
+    for _ in range(4):
+        moves.release.release()
+    assert _wait_done(queue, ids[-1]) == scheduler.DONE
+    assert moves.done == ['close', 'open', 'close', 'open']
+    assert queue.completed == 4
+    assert (first, 'close', scheduler.RUNNING) in changes
+    queue.stop()
+
+
+def test_fifo_drops_requests_beyond_the_size():
+    queue, moves, _, _ = _busy_queue(scheduler.FIFO, size=1)
+    kept = queue.submit('open')
+    dropped = queue.submit('close')
+    assert queue.state(dropped) == scheduler.DROPPED
+    assert queue.drops == 1
+    moves.release.release()
+    moves.release.release()
+    assert _wait_done(queue, kept) == scheduler.DONE
+    queue.stop()
+
+
+def test_latest_coalesces_the_pending_requests():
+    queue, moves, _, _ = _busy_queue(scheduler.LATEST)
+    replaced = queue.submit('open')
+    last = queue.submit('half')
+    assert queue.state(replaced) == scheduler.COALESCED
+    assert queue.coalesced == 1
+    moves.release.release()
+    moves.release.release()
+    assert _wait_done(queue, last) == scheduler.DONE
+    assert moves.done == ['close', 'half']
+    queue.stop()
+
+
+def test_cancel_keeps_the_running_request():
+    queue, moves, first, _ = _busy_queue(scheduler.FIFO)
+    pending = queue.submit('open')
+    queue.cancel()
+    assert queue.state(pending) == scheduler.CANCELLED
+    moves.release.release()
+    assert _wait_done(queue, first) == scheduler.DONE
+    queue.stop()
+
+
+def test_failures_are_reported():
+    moves = Moves()
+    queue = scheduler.CommandQueue(moves, 4, scheduler.FIFO)
+    request_id = queue.submit('fail')
+    moves.release.release()
+    assert _wait_done(queue, request_id) == scheduler.FAILED
+    assert queue.state(12345) == scheduler.UNKNOWN
+    queue.stop()
+
+
+def test_soft_control_queues_the_close(shutter, wait_until):
+    dev = shutter()
+    dev.SoftCtrl()
+    wait_until(lambda: json.loads(dev.last_request)['name'] == 'close')
+    request = json.loads(dev.last_request)
+    wait_until(lambda: dev.RequestState(request['id']) == 'done')
+
+
+def test_external_control_is_refused_while_moving(shutter, wait_until):
+    dev = shutter()
+    dev.SoftCtrl()
+    dev.speed = 2000 # the move takes about a quarter of a second
+    dev.Open()
+    wait_until(lambda: dev.State() == DevState.MOVING)
+    with pytest.raises(tango.DevFailed):
+        dev.ExternalControl()
+
+
+def test_a_device_without_queue_refuses_moves(shutter, tmp_path):
+    dev = shutter(host=f'replay:{tmp_path / "missing.gcl"}')
+    for move in (dev.Open, dev.Close, lambda: dev.MoveTo('open'), dev.SoftCtrl):
+        with pytest.raises(tango.DevFailed):
+            move()
+    assert dev.RequestState(1) == 'unknown'
+    assert (dev.queue_depth, dev.queue_drops, dev.queue_coalesced) == (0, 0, 0)
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import numpy
+
+from SoftiGalilShutter import shmstatus
+
+
+def _publish(writer, i):
+    writer.publish(timestamp=1000.0 + i, position=7000 + i, state=3, switches=12, inputs=1, moving=0, motor_off=0)
+
+
+def test_snapshot_and_history_round_trip(tmp_path):
+    path = str(tmp_path / 'status')
+    writer = shmstatus.StatusWriter(path, 4)
+    reader = shmstatus.StatusReader(path)
+    for i in range(6):
+        _publish(writer, i)
+    snapshot = reader.read()
+    assert snapshot['seq'] == 12
+    assert snapshot['position'] == 7005
+    assert snapshot['state_name'] == 'OPEN'
+    times, positions = reader.history()
+    assert list(positions) == [7002, 7003, 7004, 7005] # oldest first, the ring holds 4
+    assert list(times) == [1002.0, 1003.0, 1004.0, 1005.0]
+    writer.close()
+
+
+def test_reader_retries_while_the_writer_is_updating(tmp_path):
+    path = str(tmp_path / 'status')
+    writer = shmstatus.StatusWriter(path, 2)
+    _publish(writer, 0)
+    reader = shmstatus.StatusReader(path)
+    writer._seq[0] += 1 # odd, as in the middle of publish()
+    result = []
+    t = threading.Thread(target=lambda: result.append(reader.read(timeout=1)))
+    t.start()
+    t.join(0.05)
+    assert t.is_alive()
+    writer._record['position'] = 7100
+    writer._seq[0] += 1
+    t.join(1)
+    assert result[0]['position'] == 7100
+    writer.close()
+
+
+def test_reopen_keeps_the_file_readers_have_mapped(tmp_path):
+    path = str(tmp_path / 'status')
+    writer = shmstatus.StatusWriter(path, 4)
+    reader = shmstatus.StatusReader(path)
+    for i in range(3):
+        _publish(writer, i)
+    writer._seq[0] += 1 # stopped in the middle of an update
+    writer.close()
+    writer = shmstatus.StatusWriter(path, 4) # e.g. Init of the device
+    _publish(writer, 3)
+    assert reader.read()['position'] == 7003
+    assert list(reader.history()[1]) == [7000, 7001, 7002, 7003]
+    writer.close()
+
+
+def test_a_file_of_another_layout_is_replaced(tmp_path):
+    path = str(tmp_path / 'status')
+    writer = shmstatus.StatusWriter(path, 4)
+    _publish(writer, 0)
+    writer.close()
+    writer = shmstatus.StatusWriter(path, 8)
+    _publish(writer, 1)
+    reader = shmstatus.StatusReader(path)
+    times, positions = reader.history()
+    assert list(positions) == [7001]
+    assert isinstance(times, numpy.ndarray)
+    writer.close()
+
+
+def test_the_publisher_is_not_held_by_the_query_cache(shutter, tmp_path):
+    path = str(tmp_path / 'status')
+    shutter(shm_path=path, shm_period=10, query_cache_ttl=60000)
+    reader = shmstatus.StatusReader(path)
+    first = reader.read()['seq']
+    time.sleep(0.3)
+    assert reader.read()['seq'] - first >= 10 # about one update per 10 ms
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+import tango
+
+from SoftiGalilShutter.SoftiGalilShutter import SoftiGalilShutter
+
+PYTANGO_MAJOR = int(tango.__version__.split('.')[0])
+
+
+def test_snapshot_json_holds_one_status_read(shutter):
+    dev = shutter()
+    fmt, data = dev.snapshot_json
+    snapshot = json.loads(data)
+    assert fmt == 'json'
+    assert snapshot['state'] == str(dev.State())
+    assert snapshot['abs_position'] == dev.abs_position == 7500
+    assert snapshot['external_control'] is True
+    assert (snapshot['open_value'], snapshot['close_value']) == (7000, 7500)
+    assert snapshot['moving'] is False and snapshot['stop_code'] == 0
+
+
+@pytest.mark.skipif(PYTANGO_MAJOR < 10, reason='PyTango 9 serves the pipe')
+def test_pytango_10_has_no_snapshot_pipe():
+    assert not hasattr(SoftiGalilShutter, 'snapshot')
+
+
+@pytest.mark.skipif(PYTANGO_MAJOR >= 10, reason='PyTango 10 removed pipes')
+def test_the_snapshot_pipe_matches_snapshot_json(shutter):
+    dev = shutter()
+    name, blob = dev.read_pipe('snapshot')
+    assert name == 'snapshot'
+    assert {item['name'] for item in blob} >= {'state', 'abs_position', 'stop_code'}
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from tango.test_context import DeviceTestContext
+
+from SoftiGalilShutter import gclib
+from SoftiGalilShutter.SoftiGalilShutter import SoftiGalilShutter
+
+
+@pytest.mark.parametrize('function, command, timeout_class', [
+    ('GOpen', '', None),
+    ('GProgramDownload', '', 'program'),
+    ('GCommand', 'MG _TPA,_TSA', 'status'),
+    ('GCommand', 'PA7000;BG A', 'command'),
+    ('GCommand', 'mode=0;AM A;SH A', 'blocking'),
+    ('GCommand', 'XQ#INIT,0', 'program'),
+])
+def test_timeout_classes(function, command, timeout_class):
+    assert gclib._timeout_class(function, command) == timeout_class
+
+
+def test_timeouts_follow_the_measured_round_trips():
+    timeouts = gclib.AdaptiveTimeouts(min_samples=4)
+    assert timeouts.timeout('status') == 1000 # the ceiling until enough samples
+    for elapsed in (0.010, 0.010, 0.010, 0.012):
+        timeouts.record('status', elapsed)
+    assert timeouts.percentiles('status') == (10.0, 12.0)
+    assert timeouts.timeout('status') == 4 * 12 + 5
+
+
+def test_timeouts_stay_within_the_class_limits():
+    timeouts = gclib.AdaptiveTimeouts(min_samples=1)
+    timeouts.record('status', 0.0001)
+    timeouts.record('blocking', 60.0)
+    assert timeouts.timeout('status') == 20
+    assert timeouts.timeout('blocking') == 30000
+
+
+def test_device_reports_the_status_round_trips(shutter, wait_until):
+    dev = shutter(probe_period=20, query_cache_ttl=0)
+    for _ in range(40):
+        dev.read_attribute('abs_position')
+    wait_until(lambda: dev.rtt == dev.rtt and dev.rtt_p50 == dev.rtt_p50) # NaN until measured
+    assert dev.rtt_p50 >= 0 and dev.rtt_p99 >= dev.rtt_p50
+    assert json.loads(dev.command_timeouts)['status']['timeout'] <= 1000
+
+
+def _log_with_a_probe_failure(recorded, path):
+    """The recorded transactions, with a failed then a successful probe."""
+    recorder = gclib.TransactionRecorder(path)
+    for _, latency, function, command, response, return_code in gclib.read_transactions(recorded):
+        recorder.write(function, command, response, 0.0, latency, return_code)
+    recorder.write('GCommand', 'MG TIME', b'', 0.0, 0.001, gclib.G_BAD_RESPONSE_QUESTION_MARK)
+    recorder.write('GCommand', 'MG TIME', b' 1234.0000\r\n:', 0.0, 0.001, gclib.G_NO_ERROR)
+    recorder.close()
+
+
+def test_the_status_recovers_with_the_probe(shutter, tmp_path, wait_until):
+    recorded = str(tmp_path / 'session.gcl')
+    properties = {'host': 'emulator', 'traffic_log': recorded, 'probe_period': 0, 'enable_interrupts': False}
+    with DeviceTestContext(SoftiGalilShutter, properties=properties, process=True) as dev:
+        dev.State()
+    replayed = str(tmp_path / 'probe.gcl')
+    _log_with_a_probe_failure(recorded, replayed)
+    dev = shutter(host=f'replay:{replayed}', replay_time_scale=0, probe_period=50, enable_interrupts=False)
+    wait_until(lambda: 'does not answer' in dev.Status())
+    wait_until(lambda: 'does not answer' not in dev.Status())
+    assert dev.Status() == f'The device is in {dev.State()} state.'
@@ -0,0 +1,51 @@
+import json
+
+from SoftiGalilShutter import tracing
+
+
+def test_ring_buffer_keeps_the_latest_spans_in_start_order():
+    buffer = tracing.TraceBuffer(3)
+    for i in (4, 0, 3, 1, 2):
+        buffer.add('gclib', f'span{i}', float(i), i + 0.5)
+    assert [event[1] for event in buffer.events()] == ['span1', 'span2', 'span3']
+    buffer.clear()
+    assert buffer.events() == []
+
+
+def test_chrome_trace_format():
+    buffer = tracing.TraceBuffer(4)
+    buffer.add('gclib', 'GCommand', 1.0, 1.002, {'command': 'MG _TPA'})
+    trace = json.loads(buffer.to_chrome())
+    spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert spans == [{'name': 'GCommand', 'cat': 'gclib', 'ph': 'X', 'ts': 1e6, 'dur': spans[0]['dur'],
+                      'pid': spans[0]['pid'], 'tid': spans[0]['tid'], 'args': {'command': 'MG _TPA'}}]
+    assert abs(spans[0]['dur'] - 2000) < 1e-6 # microseconds
+    assert any(event['ph'] == 'M' for event in trace['traceEvents']) # thread names
+
+
+def test_traced_records_only_with_a_tracer():
+    class Device:
+        _tracer = None
+
+        @tracing.traced
+        def read_position(self):
+            return 7000
+
+    device = Device()
+    assert device.read_position() == 7000
+    device._tracer = tracing.TraceBuffer(2)
+    assert device.read_position() == 7000
+    assert [event[:2] for event in device._tracer.events()] == [('tango', 'read_position')]
+
+
+def test_device_traces_tango_calls_and_transactions(shutter):
+    dev = shutter(query_cache_ttl=0) # every read talks to the controller
+    assert [e for e in json.loads(dev.DumpTrace())['traceEvents'] if e['ph'] == 'X'] == []
+    dev.trace_enabled = True
+    dev.abs_position
+    spans = [e for e in json.loads(dev.DumpTrace())['traceEvents'] if e['ph'] == 'X']
+    categories = {e['cat'] for e in spans}
+    assert {'tango', 'gclib'} <= categories
+    assert 'read_abs_position' in {e['name'] for e in spans}
+    names = {e['name'] for e in json.loads(dev.DumpTrace())['traceEvents'] if e['ph'] == 'X'}
+    assert 'read_abs_position' not in names # cleared by the previous dump